@@ -6,10 +6,11 @@ from app.db.database import get_db
 from app.db.repositories import ApprovalRepository, RunRepository
 from app.models.schemas import ExecutionResponse, ApprovalStatus, Run
 from app.tools.powershell_tool import PowerShellTool
+from app.tools.shell_pool import shell_pool
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
-powershell_tool = PowerShellTool()
+powershell_tool = PowerShellTool(pool=shell_pool if shell_pool.enabled else None)
 
 @router.post("/approvals/{approval_id}/execute", tags=["Approvals"], response_model=ExecutionResponse)
 def execute_approved_task(approval_id: str, db: Session = Depends(get_db)):
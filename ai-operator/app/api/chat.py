@@ -1,76 +1,115 @@
+import json
 import logging
+from typing import AsyncIterator
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from app.core.fast_path import IDENTITY_RESPONSE, is_identity_query
 from app.core.router import IntentRouter
-from app.core.policy import PolicyEnforcer
+from app.core.streaming import FieldDelta
+from app.core.policy import get_policy_enforcer
 from app.core.memory import ConversationMemory
-from app.db.database import get_db
+from app.core.memory_backends import SQLiteMemoryBackend
+from app.core.settings import get_settings
+from app.db.database import SessionLocal, get_db
 from app.db.repositories import ApprovalRepository
 from app.models.schemas import ChatRequest, ChatResponse, Approval, Intent
-from app.llm.client import OllamaConnectionError, OllamaModelUnavailableError
+from app.llm.client import OllamaConnectionError, OllamaModelUnavailableError, OllamaOverloadedError
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+
+def _build_default_memory() -> ConversationMemory:
+    settings = get_settings()
+    backend = None
+    if settings.memory_backend == "sqlite":
+        backend = SQLiteMemoryBackend(max_messages_per_session=settings.memory_max_messages)
+    return ConversationMemory(
+        max_messages_per_session=settings.memory_max_messages,
+        max_sessions=settings.memory_max_sessions,
+        idle_ttl_sec=settings.memory_session_ttl_sec,
+        max_bytes=settings.memory_max_bytes,
+        backend=backend,
+        flush_interval_sec=settings.memory_flush_interval_sec,
+        flush_batch_size=settings.memory_flush_batch_size,
+        refresh_sec=settings.memory_refresh_sec,
+        stripes=settings.memory_lock_stripes,
+        compress_min_bytes=settings.memory_compress_min_bytes,
+    )
+
+
 intent_router = IntentRouter()
-policy_enforcer = PolicyEnforcer()
-conversation_memory = ConversationMemory()
+conversation_memory = _build_default_memory()
 
 
 def _enforce_identity_response(user_message: str, response_text: str) -> str:
     """
     Keeps creator identity consistent for direct identity questions.
     """
-    message = user_message.lower()
-    identity_query_tokens = [
-        "누가 만들",
-        "누가 개발",
-        "who made",
-        "who created",
-        "who built",
-    ]
-    if any(token in message for token in identity_query_tokens):
-        return "저는 김가빈님이 만든 로컬 AI 운영자 IRIS입니다."
+    if is_identity_query(user_message):
+        return IDENTITY_RESPONSE
     return response_text
 
 
-@router.post("/chat", tags=["Chat"], response_model=ChatResponse)
-async def post_chat_message(request: ChatRequest, db: Session = Depends(get_db)):
-    """
-    Receives a natural language message, determines intent, and responds using Ollama.
-    If the intent is a system task, it creates an approval request.
-    """
-    session_id = request.session_id or "default"
-    history = conversation_memory.get_history(session_id)
+def _overloaded_http_error(e: OllamaOverloadedError) -> HTTPException:
+    logger.warning(f"Rejecting chat request, Ollama is overloaded: {e}")
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(e),
+        headers={"Retry-After": e.retry_after_header},
+    )
 
-    try:
-        intent, plan, proposed_command, llm_response_text = intent_router.classify_intent(
-            request,
-            history=history,
+
+def _classification_error_response(e: Exception) -> ChatResponse:
+    if isinstance(e, OllamaOverloadedError):
+        logger.warning(f"Ollama admission rejected a request after streaming had started: {e}")
+        return ChatResponse(
+            intent=Intent.CHAT,
+            plan=["LLM is busy."],
+            response=(
+                "I'm sorry, the local LLM is busy right now. "
+                f"Please try again in {e.retry_after_header} seconds."
+            ),
         )
-    except OllamaConnectionError as e:
+    if isinstance(e, OllamaConnectionError):
         logger.error(f"Failed to connect to Ollama: {e}")
         return ChatResponse(
             intent=Intent.CHAT, # Default to chat for safety
             plan=["Failed to connect to LLM."],
             response="I'm sorry, I cannot connect to the local LLM at the moment. Please ensure Ollama is running and the model is pulled."
         )
-    except OllamaModelUnavailableError as e:
+    if isinstance(e, OllamaModelUnavailableError):
         logger.error(f"Ollama model unavailable: {e}")
         return ChatResponse(
             intent=Intent.CHAT,
             plan=["LLM model is unavailable."],
             response="I'm sorry, the required Ollama model is not installed. Please run: ollama pull gpt-oss:20b"
         )
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during intent classification: {e}")
-        return ChatResponse(
-            intent=Intent.CHAT,
-            plan=["An unexpected error occurred."],
-            response="I'm sorry, an unexpected error occurred while processing your request."
-        )
+    logger.error(f"An unexpected error occurred during intent classification: {e}")
+    return ChatResponse(
+        intent=Intent.CHAT,
+        plan=["An unexpected error occurred."],
+        response="I'm sorry, an unexpected error occurred while processing your request."
+    )
 
+
+def _build_chat_response(
+    request: ChatRequest,
+    session_id: str,
+    intent: Intent,
+    plan: list[str],
+    proposed_command: str | None,
+    llm_response_text: str | None,
+    db: Session,
+) -> ChatResponse:
+    """
+    Turns a classification into the final ChatResponse: policy checks and approval
+    creation for system tasks, conversation memory updates for chat/code help.
+    """
     # --- Handle System Task Intent ---
     if intent == Intent.SYSTEM_TASK:
         if not proposed_command:
@@ -81,6 +120,7 @@ async def post_chat_message(request: ChatRequest, db: Session = Depends(get_db))
             )
 
         # Policy enforcement is crucial
+        policy_enforcer = get_policy_enforcer()
         is_allowed, reason = policy_enforcer.check_all(proposed_command, request.cwd)
         if not is_allowed:
             return ChatResponse(
@@ -142,3 +182,116 @@ async def post_chat_message(request: ChatRequest, db: Session = Depends(get_db))
     conversation_memory.add_message(session_id, "user", request.message)
     conversation_memory.add_message(session_id, "assistant", response_obj.response)
     return response_obj
+
+
+@router.post("/chat", tags=["Chat"], response_model=ChatResponse)
+async def post_chat_message(request: ChatRequest, db: Session = Depends(get_db)):
+    """
+    Receives a natural language message, determines intent, and responds using Ollama.
+    If the intent is a system task, it creates an approval request.
+    """
+    session_id = request.session_id or "default"
+    history = await conversation_memory.aget_history(session_id)
+
+    try:
+        intent, plan, proposed_command, llm_response_text = await intent_router.classify_intent_async(
+            request,
+            history=history,
+        )
+    except OllamaOverloadedError as e:
+        raise _overloaded_http_error(e)
+    except Exception as e:
+        return _classification_error_response(e)
+
+    return _build_chat_response(
+        request, session_id, intent, plan, proposed_command, llm_response_text, db
+    )
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def _stream_chat_events(request: ChatRequest) -> AsyncIterator[bytes]:
+    session_id = request.session_id or "default"
+    history = await conversation_memory.aget_history(session_id)
+    # Identity answers are replaced after generation, so the LLM text is not streamed for them.
+    stream_response_text = _enforce_identity_response(request.message, "") == ""
+    intent: Intent | None = None
+    intent_text: list[str] = []
+    buffered_text: list[str] = []
+    classification = None
+    # After the first event the response is already a 200, so errors must end the stream with "done".
+    started = False
+
+    try:
+        async for item in intent_router.classify_intent_stream(request, history=history):
+            if not isinstance(item, FieldDelta):
+                classification = item
+                continue
+            if item.field == "intent":
+                intent_text.append(item.text)
+                if not item.complete:
+                    continue
+                try:
+                    intent = Intent("".join(intent_text).strip())
+                except ValueError:
+                    continue
+                started = True
+                yield _ndjson({"event": "intent", "intent": intent.value})
+                if intent != Intent.SYSTEM_TASK and stream_response_text and buffered_text:
+                    yield _ndjson({"event": "response", "delta": "".join(buffered_text)})
+                buffered_text = []
+            elif item.field == "response" and stream_response_text:
+                # Hold text back until we know it will not be replaced by a system-task message.
+                if intent is None:
+                    buffered_text.append(item.text)
+                elif intent != Intent.SYSTEM_TASK:
+                    yield _ndjson({"event": "response", "delta": item.text})
+    except OllamaOverloadedError as e:
+        if not started:
+            # post_chat_message_stream turns this into a 429.
+            raise
+        final = _classification_error_response(e)
+        yield _ndjson({"event": "done", "result": jsonable_encoder(final)})
+        return
+    except Exception as e:
+        final = _classification_error_response(e)
+        yield _ndjson({"event": "done", "result": jsonable_encoder(final)})
+        return
+
+    intent, plan, proposed_command, llm_response_text = classification
+    db = SessionLocal()
+    try:
+        final = _build_chat_response(
+            request, session_id, intent, plan, proposed_command, llm_response_text, db
+        )
+    finally:
+        db.close()
+    yield _ndjson({"event": "done", "result": jsonable_encoder(final)})
+
+
+@router.post("/chat/stream", tags=["Chat"])
+async def post_chat_message_stream(request: ChatRequest):
+    """
+    Streaming variant of /chat. Emits newline-delimited JSON events:
+    {"event": "intent"} as soon as the intent is known, {"event": "response"} text
+    deltas for chat/code help answers, and a final {"event": "done"} carrying the
+    full ChatResponse (including approval_id for system tasks).
+    """
+    events = _stream_chat_events(request)
+    # Pull the first event before committing to a 200 so admission rejections become a 429.
+    try:
+        first_event = await events.__anext__()
+    except OllamaOverloadedError as e:
+        raise _overloaded_http_error(e)
+    except StopAsyncIteration:
+        first_event = None
+
+    async def body() -> AsyncIterator[bytes]:
+        if first_event is not None:
+            yield first_event
+        async for event in events:
+            yield event
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
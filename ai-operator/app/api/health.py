@@ -1,5 +1,5 @@
-from fastapi import APIRouter
-from app.models.schemas import LLMHealthResponse
+from fastapi import APIRouter, Response, status
+from app.models.schemas import HealthResponse, LLMHealthResponse, ReadinessResponse
 from app.llm.client import ollama_client
 
 router = APIRouter()
@@ -8,8 +8,9 @@ router = APIRouter()
 def health_check():
     """
     Performs a health check of the application, including LLM connectivity.
+    Ollama state comes from the background detection refresher; no request is made to Ollama.
     """
-    detection = ollama_client.get_detection_status(refresh=True)
+    detection = ollama_client.get_detection_status()
     ollama_state = "up" if detection.ollama_up else "down"
     return LLMHealthResponse(
         status="ok",
@@ -18,3 +19,30 @@ def health_check():
         model_available=detection.model_available,
         fallback_used=detection.fallback_used,
     )
+
+@router.get("/health/live", tags=["System"], response_model=HealthResponse)
+def liveness_check():
+    """
+    Liveness probe: the process is up and serving requests.
+    """
+    return HealthResponse(status="ok")
+
+@router.get("/health/ready", tags=["System"], response_model=ReadinessResponse)
+def readiness_check(response: Response):
+    """
+    Readiness probe: 200 when Ollama is up with a usable model (per cached detection), otherwise 503.
+    """
+    detection = ollama_client.get_detection_status()
+    ready = detection.ollama_up and detection.model_available
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return ReadinessResponse(
+        status="ok" if ready else "unavailable",
+        ollama="up" if detection.ollama_up else "down",
+        model=detection.selected_model,
+        model_available=detection.model_available,
+        fallback_used=detection.fallback_used,
+        ready=ready,
+        reason=detection.reason,
+        detection_age_sec=ollama_client.detection_age_sec(),
+    )
@@ -0,0 +1,37 @@
+from fastapi import APIRouter
+
+from app.api.chat import conversation_memory, intent_router
+from app.core.policy import policy_check_stats, policy_rules_stats
+from app.core.summarizer import conversation_summarizer
+from app.llm.cache import llm_response_cache
+from app.llm.client import ollama_client
+from app.llm.refresher import detection_refresher
+from app.llm.warmup import model_keep_warm
+from app.tools.shell_pool import shell_pool
+
+router = APIRouter()
+
+@router.get("/metrics", tags=["System"])
+def get_metrics():
+    """
+    Returns in-process performance counters (cache hit rates, etc.).
+    """
+    return {
+        "fast_path": intent_router.fast_path.stats(),
+        "embedding_classifier": intent_router.embeddings.stats(),
+        "llm_output": intent_router.output_stats(),
+        "session_prompting": intent_router.session_stats(),
+        "conversation_memory": conversation_memory.stats(),
+        "conversation_summarizer": conversation_summarizer.stats(),
+        "policy_rules": policy_rules_stats(),
+        "policy_checks": policy_check_stats(),
+        "llm_cache": llm_response_cache.stats(),
+        "semantic_cache": intent_router.semantic_cache.stats(),
+        "single_flight": ollama_client.single_flight_stats(),
+        "admission": ollama_client.admission.stats(),
+        "endpoints": ollama_client.pool.stats(),
+        "detection_refresher": detection_refresher.stats(),
+        "model_load": ollama_client.model_load_stats(),
+        "model_keep_warm": model_keep_warm.stats(),
+        "shell_pool": shell_pool.stats(),
+    }
@@ -0,0 +1,51 @@
+import logging
+from fastapi import APIRouter, HTTPException, status
+
+from app.core.policy import get_policy_enforcer
+from app.core.settings import get_settings
+from app.models.schemas import PolicyCheckRequest, PolicyCheckResponse, PolicyCheckResult, PolicyRuleMatch
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.post("/policy/check", tags=["Policy"], response_model=PolicyCheckResponse)
+def check_commands(request: PolicyCheckRequest):
+    """
+    Evaluates a batch of commands against the policy without calling the LLM or creating approvals.
+    All items are checked against the same rules version.
+    """
+    max_items = get_settings().policy_check_max_items
+    if len(request.items) > max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {max_items} commands can be checked per request; got {len(request.items)}.",
+        )
+
+    policy_enforcer = get_policy_enforcer()
+    rules = policy_enforcer.rules
+    checks = [(item.command, item.cwd if item.cwd is not None else request.cwd) for item in request.items]
+    decisions = policy_enforcer.evaluate_many(checks, rules)
+
+    results = [
+        PolicyCheckResult(
+            command=command,
+            cwd=cwd,
+            allowed=decision.allowed,
+            reason=decision.reason,
+            rule=PolicyRuleMatch(kind=decision.rule.kind, rule=decision.rule.rule, index=decision.rule.index)
+            if decision.rule is not None
+            else None,
+        )
+        for (command, cwd), decision in zip(checks, decisions)
+    ]
+    allowed_count = sum(result.allowed for result in results)
+    logger.info(f"Policy check: {allowed_count}/{len(results)} commands allowed (rules version {rules.version}).")
+    return PolicyCheckResponse(
+        allowed=allowed_count == len(results),
+        allowed_count=allowed_count,
+        denied_count=len(results) - allowed_count,
+        rules_version=rules.version,
+        policy_mode=policy_enforcer.policy_mode,
+        results=results,
+    )
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import Counter
+from pathlib import Path
+from threading import Lock
+from typing import Optional, Sequence
+
+from app.core.settings import get_settings
+from app.core.vector_index import VectorIndex
+from app.llm.client import OllamaClient, ollama_client
+from app.models.schemas import Intent
+
+logger = logging.getLogger(__name__)
+
+# Labelled examples the nearest-neighbour vote runs over. Changing them rebuilds the index.
+INTENT_EXEMPLARS: tuple[tuple[str, Intent], ...] = (
+    ("hi, how are you today?", Intent.CHAT),
+    ("tell me a joke", Intent.CHAT),
+    ("what is the capital of France?", Intent.CHAT),
+    ("thanks, that helped a lot", Intent.CHAT),
+    ("can you recommend a good book?", Intent.CHAT),
+    ("what's the weather usually like in spring?", Intent.CHAT),
+    ("summarize the history of the internet", Intent.CHAT),
+    ("안녕, 오늘 기분 어때?", Intent.CHAT),
+    ("재미있는 이야기 해줘", Intent.CHAT),
+    ("고마워, 도움이 됐어", Intent.CHAT),
+    ("explain this python function", Intent.CODE_HELP),
+    ("why does my code raise a KeyError?", Intent.CODE_HELP),
+    ("how do I reverse a list in python?", Intent.CODE_HELP),
+    ("what is a python virtual environment?", Intent.CODE_HELP),
+    ("refactor this class to use dataclasses", Intent.CODE_HELP),
+    ("what does this stack trace mean?", Intent.CODE_HELP),
+    ("how do async and await work in javascript?", Intent.CODE_HELP),
+    ("write a regex that matches email addresses", Intent.CODE_HELP),
+    ("이 파이썬 코드 설명해줘", Intent.CODE_HELP),
+    ("이 에러가 왜 나는지 알려줘", Intent.CODE_HELP),
+    ("run git status", Intent.SYSTEM_TASK),
+    ("list the files in this directory", Intent.SYSTEM_TASK),
+    ("show me the git diff", Intent.SYSTEM_TASK),
+    ("execute the test suite with pytest", Intent.SYSTEM_TASK),
+    ("show running docker containers", Intent.SYSTEM_TASK),
+    ("create a file named notes.txt", Intent.SYSTEM_TASK),
+    ("git status 실행해줘", Intent.SYSTEM_TASK),
+    ("현재 폴더의 파일 목록 보여줘", Intent.SYSTEM_TASK),
+)
+# Share of the neighbours' similarity mass the winning intent needs.
+MIN_VOTE_SHARE = 0.6
+# After a failed index build (Ollama down, embed model missing) wait this long before trying again.
+INDEX_RETRY_SEC = 30.0
+
+
+class EmbeddingIntentClassifier:
+    """
+    Classifies a message by its nearest labelled exemplars in embedding space.
+
+    One embedding call replaces a full generation when the vote is confident.
+    Only chat and code help are returned: system tasks still need the LLM to
+    extract the command, and anything below the thresholds goes to the LLM too.
+    The exemplar index is built once through Ollama, saved under `index_dir`
+    and memory-mapped on later startups.
+    """
+
+    def __init__(
+        self,
+        client: OllamaClient,
+        enabled: bool = False,
+        index_dir: str | Path = "./vector_index",
+        k: int = 5,
+        threshold: float = 0.8,
+        exemplars: Sequence[tuple[str, Intent]] = INTENT_EXEMPLARS,
+    ):
+        self.client = client
+        self.enabled = enabled
+        self.index_dir = Path(index_dir) / "intents"
+        self.k = k
+        self.threshold = threshold
+        self.exemplars = tuple(exemplars)
+        self.index: Optional[VectorIndex] = None
+        self._lock = Lock()
+        self._building = False
+        self._retry_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"checked": 0, "hits": 0, "low_confidence": 0, "needs_command": 0, "errors": 0}
+        self._hits_by_intent: Counter[str] = Counter()
+        self._index_source: Optional[str] = None
+        self._disk_checked = False
+
+    def _fingerprint(self) -> str:
+        # Vectors from another embed model or exemplar set are not comparable; rebuild then.
+        data = json.dumps([self.client.embed_model, [(text, intent.value) for text, intent in self.exemplars]])
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _load_saved(self) -> Optional[VectorIndex]:
+        index = VectorIndex.load(self.index_dir)
+        if index is None or index.meta.get("fingerprint") != self._fingerprint():
+            return None
+        return index
+
+    def _begin_build(self) -> bool:
+        with self._lock:
+            if self.index is not None or self._building or time.monotonic() < self._retry_at:
+                return False
+            self._building = True
+            return True
+
+    def _finish_build(self, vectors: Optional[list[list[float]]]) -> Optional[VectorIndex]:
+        index = None
+        if vectors is not None:
+            index = VectorIndex.build(
+                vectors,
+                [intent.value for _, intent in self.exemplars],
+                meta={"fingerprint": self._fingerprint(), "embed_model": self.client.embed_model},
+            )
+            try:
+                index.save(self.index_dir)
+            except OSError as e:
+                logger.warning(f"Could not save the intent index to '{self.index_dir}': {e}")
+        with self._lock:
+            self._building = False
+            if index is None:
+                self._retry_at = time.monotonic() + INDEX_RETRY_SEC
+            else:
+                self.index = index
+                self._index_source = "built"
+                logger.info(f"Built intent index from {len(index)} exemplars ({index.dim} dimensions).")
+        return index
+
+    def _use_saved(self) -> Optional[VectorIndex]:
+        if self._disk_checked:
+            return None
+        self._disk_checked = True
+        index = self._load_saved()
+        if index is not None:
+            with self._lock:
+                self.index = index
+                self._index_source = "disk"
+            logger.info(f"Loaded intent index from '{self.index_dir}' ({len(index)} exemplars).")
+        return index
+
+    def ensure_index(self) -> Optional[VectorIndex]:
+        if self.index is not None:
+            return self.index
+        if self._use_saved() is not None or not self._begin_build():
+            return self.index
+        vectors = None
+        try:
+            vectors = self.client.embed([text for text, _ in self.exemplars])
+        except Exception as e:
+            logger.warning(f"Building the intent index failed: {e}")
+        return self._finish_build(vectors)
+
+    async def aensure_index(self) -> Optional[VectorIndex]:
+        if self.index is not None:
+            return self.index
+        if await asyncio.to_thread(self._use_saved) is not None or not self._begin_build():
+            return self.index
+        vectors = None
+        try:
+            vectors = await self.client.aembed([text for text, _ in self.exemplars])
+        except Exception as e:
+            logger.warning(f"Building the intent index failed: {e}")
+        return self._finish_build(vectors)
+
+    def start(self) -> None:
+        """Loads or builds the index in the background so startup stays fast."""
+        if self.enabled and self.index is None and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.aensure_index(), name="intent-index")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _count(self, key: str, intent: Optional[Intent] = None) -> None:
+        with self._lock:
+            self._stats[key] += 1
+            if intent is not None:
+                self._hits_by_intent[intent.value] += 1
+
+    def _decide(self, index: VectorIndex, vector: list[float]) -> Optional[Intent]:
+        neighbours = index.search(vector, self.k)
+        votes: Counter[str] = Counter()
+        for label, similarity in neighbours:
+            votes[label] += max(similarity, 0.0)
+        total = sum(votes.values())
+        if not neighbours or total <= 0:
+            self._count("low_confidence")
+            return None
+        label, score = votes.most_common(1)[0]
+        best_similarity = max(similarity for neighbour, similarity in neighbours if neighbour == label)
+        if best_similarity < self.threshold or score / total < MIN_VOTE_SHARE:
+            self._count("low_confidence")
+            return None
+        intent = Intent(label)
+        if intent == Intent.SYSTEM_TASK:
+            self._count("needs_command")
+            return None
+        self._count("hits", intent)
+        return intent
+
+    def classify(self, message: str, vector: Optional[list[float]] = None) -> Optional[Intent]:
+        """
+        A confidently matched chat or code help intent, or None to let the LLM decide.
+        `vector` is the message's embedding if the caller already has one.
+        """
+        if not self.enabled:
+            return None
+        self._count("checked")
+        index = self.ensure_index()
+        if index is None:
+            return None
+        if vector is not None:
+            return self._decide(index, vector)
+        try:
+            vector = self.client.embed([message])[0]
+        except Exception as e:
+            logger.warning(f"Embedding classification failed, using the LLM: {e}")
+            self._count("errors")
+            return None
+        return self._decide(index, vector)
+
+    async def aclassify(self, message: str, vector: Optional[list[float]] = None) -> Optional[Intent]:
+        if not self.enabled:
+            return None
+        self._count("checked")
+        index = await self.aensure_index()
+        if index is None:
+            return None
+        if vector is not None:
+            return self._decide(index, vector)
+        try:
+            vector = (await self.client.aembed([message]))[0]
+        except Exception as e:
+            logger.warning(f"Embedding classification failed, using the LLM: {e}")
+            self._count("errors")
+            return None
+        return self._decide(index, vector)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["hits_by_intent"] = dict(self._hits_by_intent)
+        stats["enabled"] = self.enabled
+        stats["hit_rate"] = stats["hits"] / stats["checked"] if stats["checked"] else 0.0
+        stats["index_size"] = len(self.index) if self.index is not None else 0
+        stats["index_source"] = self._index_source
+        stats["embed_model"] = self.client.embed_model
+        stats["threshold"] = self.threshold
+        return stats
+
+
+def _build_default_classifier() -> EmbeddingIntentClassifier:
+    settings = get_settings()
+    return EmbeddingIntentClassifier(
+        ollama_client,
+        enabled=settings.embedding_classifier_enabled,
+        index_dir=settings.vector_index_dir,
+        k=settings.embedding_classifier_k,
+        threshold=settings.embedding_classifier_threshold,
+    )
+
+
+embedding_classifier = _build_default_classifier()
@@ -0,0 +1,153 @@
+import logging
+import re
+from threading import Lock
+
+from app.core.policy import get_policy_enforcer
+from app.core.policy_rules import PolicyRules
+from app.models.schemas import Intent
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_QUERY_TOKENS = [
+    "누가 만들",
+    "누가 개발",
+    "who made",
+    "who created",
+    "who built",
+]
+IDENTITY_RESPONSE = "저는 김가빈님이 만든 로컬 AI 운영자 IRIS입니다."
+
+# Wrappers around an explicit command: "please run git status", "git status 실행해줘", ...
+_COMMAND_REQUEST_PATTERN = re.compile(
+    r"^(?:(?:please|can you|could you|would you)\s+)?"
+    r"(?P<verb>(?:run|execute|exec)\s+)?"
+    r"(?P<command>.+?)"
+    r"(?P<suffix>\s+(?:for me|please|now))?"
+    r"(?P<verb_ko>\s*(?:실행해\s*줘|실행해\s*주세요|실행해|실행|해\s*줘|해\s*주세요))?"
+    r"[\s.!?]*$",
+    re.IGNORECASE,
+)
+# Arguments the fast path will pass through after an explicit "run"; anything else (quotes, pipes, ~, $...)
+# goes to the LLM.
+_SAFE_ARGUMENTS_PATTERN = re.compile(r"^[\w\-./=:]+(?:\s+[\w\-./=:]+)*$")
+# Without "run", only flags (-x, --foo=bar) and paths (./dir, a/b.py, setup.py) count as arguments, so
+# "pytest keeps failing" stays a chat message.
+_COMMAND_LIKE_ARGUMENT_PATTERN = re.compile(
+    r"^(?:-{1,2}\w[\w\-./=:]*|\.{1,2}/[\w\-./]*|[\w\-.]+/[\w\-./]*|[\w\-]+\.\w+)$"
+)
+MAX_FAST_PATH_MESSAGE_CHARS = 200
+
+Classification = tuple[Intent, list[str], str | None, str | None]
+
+
+def is_identity_query(message: str) -> bool:
+    lowered = message.lower()
+    return any(token in lowered for token in IDENTITY_QUERY_TOKENS)
+
+
+class FastPathClassifier:
+    """
+    Rule-based pre-classifier that answers obvious messages without calling the LLM:
+    explicit requests for read-only allowlisted commands ("run git status", "dir")
+    and direct identity questions. Anything ambiguous returns None.
+    """
+
+    def __init__(self, allowed_prefixes: list[str] | None = None, enabled: bool = True):
+        # Without explicit prefixes, the policy enforcer's current rules are used, so hot reloads apply here too.
+        self._fixed_commands = self._commands_for(allowed_prefixes) if allowed_prefixes is not None else None
+        self._rules_commands: tuple[PolicyRules | None, list[str]] = (None, [])
+        self.enabled = enabled
+        self._lock = Lock()
+        self._stats = {"checked": 0, "command_hits": 0, "identity_hits": 0, "misses": 0}
+
+    @staticmethod
+    def _commands_for(prefixes) -> list[str]:
+        # Prefixes ending in a space take free-form arguments (echo, set-content, ...); leave those to the LLM.
+        return sorted(
+            (prefix.lower() for prefix in prefixes if not prefix.endswith(" ")),
+            key=len,
+            reverse=True,
+        )
+
+    @property
+    def commands(self) -> list[str]:
+        if self._fixed_commands is not None:
+            return self._fixed_commands
+        rules = get_policy_enforcer().rules
+        cached_rules, commands = self._rules_commands
+        if rules is not cached_rules:
+            # Rebuilt once per rules snapshot; the pair is swapped as one tuple.
+            commands = self._commands_for(rules.allowed_prefixes)
+            self._rules_commands = (rules, commands)
+        return commands
+
+    @staticmethod
+    def _arguments_allowed(arguments: str, explicit: bool) -> bool:
+        if explicit:
+            return bool(_SAFE_ARGUMENTS_PATTERN.match(arguments))
+        return all(_COMMAND_LIKE_ARGUMENT_PATTERN.match(token) for token in arguments.split())
+
+    def _match_candidate(self, candidate: str, explicit: bool) -> str | None:
+        candidate = " ".join(candidate.split())
+        lowered = candidate.lower()
+        commands = self.commands
+        for command in commands:
+            if lowered == command:
+                return command
+            if lowered.startswith(command + " ") and self._arguments_allowed(candidate[len(command) + 1:], explicit):
+                return command + candidate[len(command):]
+        return None
+
+    def _match_command(self, message: str) -> str | None:
+        match = _COMMAND_REQUEST_PATTERN.match(message)
+        if not match:
+            return None
+        explicit = bool(match.group("verb") or match.group("verb_ko"))
+        command, suffix = match.group("command"), match.group("suffix")
+        matched = self._match_candidate(command, explicit)
+        if suffix and matched is not None and matched.split()[-1].startswith("-"):
+            # After a flag the word is its value ("pytest -k now"); keep it, or let the LLM decide.
+            return self._match_candidate(command + suffix, explicit)
+        return matched
+
+    def classify(self, message: str) -> Classification | None:
+        """Returns (intent, plan, proposed_command, response_text), or None when the LLM should decide."""
+        if not self.enabled:
+            return None
+        text = message.strip()
+        result: Classification | None = None
+        stat = "misses"
+        if text and len(text) <= MAX_FAST_PATH_MESSAGE_CHARS and "\n" not in text:
+            if is_identity_query(text):
+                result = (Intent.CHAT, ["Answer the identity question."], None, IDENTITY_RESPONSE)
+                stat = "identity_hits"
+            else:
+                command = self._match_command(text)
+                if command is not None:
+                    result = (
+                        Intent.SYSTEM_TASK,
+                        [
+                            "Acknowledge request for system task.",
+                            f"Propose executing the command: '{command}'.",
+                            "Await user approval.",
+                            "Execute command upon approval.",
+                        ],
+                        command,
+                        f"I can run '{command}'. Please approve execution.",
+                    )
+                    stat = "command_hits"
+        with self._lock:
+            self._stats["checked"] += 1
+            self._stats[stat] += 1
+        if result is not None:
+            logger.info(f"Fast path classified message as {result[0]}, proposed command: {result[2]}")
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        hits = stats["command_hits"] + stats["identity_hits"]
+        stats["enabled"] = self.enabled
+        stats["hits"] = hits
+        stats["hit_rate"] = hits / stats["checked"] if stats["checked"] else 0.0
+        return stats
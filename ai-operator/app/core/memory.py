@@ -1,39 +1,469 @@
 from __future__ import annotations
 
-from collections import defaultdict, deque
+import asyncio
+import logging
+import math
+import sys
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
 from dataclasses import dataclass
 from threading import Lock
-from typing import Deque
+from typing import Optional, Sequence
 
+logger = logging.getLogger(__name__)
 
-@dataclass(frozen=True)
+# Unwritten messages kept while the backend is failing; the oldest are dropped past this.
+MAX_PENDING_WRITES = 10000
+# Stored entries keep a small int instead of the role string.
+ROLE_CODES = {"user": 0, "assistant": 1, "system": 2}
+ROLE_NAMES = tuple(ROLE_CODES)
+# Compressed content is only kept when it saves at least this share of the size.
+MIN_COMPRESSION_SAVING = 0.1
+# Lock-free cold loads that overlap a batch write are retried this often before waiting for the writer.
+COLD_LOAD_ATTEMPTS = 2
+
+
+@dataclass(frozen=True, slots=True)
 class MemoryEntry:
     role: str
     content: str
 
 
+class _StoredEntry:
+    """
+    Compact in-memory form of a MemoryEntry: a role code, and the content
+    either as str or, above the compression threshold, as zlib bytes.
+    """
+
+    __slots__ = ("role", "data", "size")
+
+    def __init__(self, entry: MemoryEntry, compress_min_bytes: int | None):
+        self.role: int | str = ROLE_CODES.get(entry.role, sys.intern(entry.role))
+        encoded = entry.content.encode("utf-8")
+        self.data: str | bytes = entry.content
+        if compress_min_bytes is not None and len(encoded) >= compress_min_bytes:
+            compressed = zlib.compress(encoded)
+            if len(compressed) <= len(encoded) * (1 - MIN_COMPRESSION_SAVING):
+                self.data = compressed
+                encoded = compressed
+        # Bytes counted against the memory budget: UTF-8 text, or the compressed size.
+        self.size = len(encoded)
+
+    def entry(self) -> MemoryEntry:
+        role = ROLE_NAMES[self.role] if isinstance(self.role, int) else self.role
+        data = self.data
+        content = zlib.decompress(data).decode("utf-8") if isinstance(data, bytes) else data
+        return MemoryEntry(role=role, content=content)
+
+
+@dataclass(slots=True)
+class _Session:
+    # Replaced, never mutated, so readers can use it without a lock.
+    history: tuple[_StoredEntry, ...]
+    last_used: float
+    # When the session was last moved to the end of its stripe's LRU order.
+    ordered_at: float
+    size: int = 0
+    # When the history was last read from the backend; sessions started in memory have not been.
+    loaded_at: float = -math.inf
+
+
+class _Stripe:
+    """One shard of the session map with its own lock, LRU order and counters."""
+
+    def __init__(self):
+        self.lock = Lock()
+        # Least recently ordered first, so eviction and expiry only look at the front.
+        self.sessions: OrderedDict[str, _Session] = OrderedDict()
+        self.bytes = 0
+        self.stats = {"evictions": 0, "byte_evictions": 0, "expirations": 0, "cold_loads": 0, "refreshes": 0}
+
+
+class MemoryBackend(ABC):
+    """Durable storage behind ConversationMemory. Methods are blocking and run off the event loop."""
+
+    name = "none"
+
+    @abstractmethod
+    def load(self, session_id: str, limit: int) -> list[MemoryEntry]:
+        """The newest `limit` messages of a session, oldest first."""
+
+    @abstractmethod
+    def write(self, rows: Sequence[tuple[str, MemoryEntry]]) -> None:
+        """Appends a batch of (session_id, entry) rows in one transaction."""
+
+    def prune(self, idle_ttl_sec: float) -> int:
+        """Deletes sessions idle for longer than `idle_ttl_sec`; returns the number of rows removed."""
+        return 0
+
+
 class ConversationMemory:
     """
     In-memory session conversation store.
-    Keeps a bounded number of recent messages per session.
+    Keeps a bounded number of recent messages per session, and a bounded number
+    of sessions: the least recently used session is evicted past `max_sessions`
+    or `max_bytes` (stored message text), and sessions idle for `idle_ttl_sec`
+    are dropped. Content of at least `compress_min_bytes` (UTF-8) is kept
+    zlib-compressed and only decompressed when the history is read.
+
+    Sessions are spread over `stripes` shards, each with its own lock, so
+    unrelated sessions do not contend. The session and byte limits are split
+    evenly between the stripes and LRU order is kept per stripe. A session's
+    history is an immutable tuple that writers replace, so get_history() reads
+    it without taking a lock.
+
+    With a `backend`, the in-memory sessions are a warm tail in front of
+    durable storage. New messages are buffered and written in batches by a
+    background writer (start()/stop()), so requests never wait on the disk;
+    a session that is not in memory is loaded from the backend on first read.
+    Other workers write to the same backend, so a session read from it more
+    than `refresh_sec` ago is read again (None: never). A session with no
+    stored rows is kept as an empty session within that window too.
     """
 
-    def __init__(self, max_messages_per_session: int = 20):
-        self.max_messages_per_session = max_messages_per_session
-        self._store: dict[str, Deque[MemoryEntry]] = defaultdict(
-            lambda: deque(maxlen=self.max_messages_per_session)
+    def __init__(
+        self,
+        max_messages_per_session: int = 20,
+        max_sessions: int = 10000,
+        idle_ttl_sec: float | None = 86400,
+        max_bytes: int | None = None,
+        backend: MemoryBackend | None = None,
+        flush_interval_sec: float = 0.5,
+        flush_batch_size: int = 256,
+        stripes: int = 16,
+        compress_min_bytes: int | None = None,
+        refresh_sec: float | None = 2.0,
+    ):
+        self.max_messages_per_session = max(1, max_messages_per_session)
+        self.max_sessions = max(1, max_sessions)
+        self.idle_ttl_sec = idle_ttl_sec or None
+        self.max_bytes = max_bytes or None
+        self.backend = backend
+        self.flush_interval_sec = flush_interval_sec
+        self.flush_batch_size = max(1, flush_batch_size)
+        self.compress_min_bytes = compress_min_bytes or None
+        self.refresh_sec = refresh_sec
+        self._stripes = [_Stripe() for _ in range(max(1, min(stripes, self.max_sessions)))]
+        self._stripe_max_sessions = math.ceil(self.max_sessions / len(self._stripes))
+        self._stripe_max_bytes = (
+            max(1, self.max_bytes // len(self._stripes)) if self.max_bytes is not None else None
         )
-        self._lock = Lock()
+        # Held while batches are written; cold loads take it only after racing a write (see _load).
+        self._flush_lock = Lock()
+        self._pending_lock = Lock()
+        self._pending: deque[tuple[str, MemoryEntry]] = deque()
+        # Sessions in the batch being written, and how many batches have been taken from _pending.
+        self._in_flight: frozenset[str] = frozenset()
+        self._batches_taken = 0
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stats = {"flushed_messages": 0, "flush_batches": 0, "flush_errors": 0, "dropped_writes": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _stripe(self, session_id: str) -> _Stripe:
+        return self._stripes[hash(session_id) % len(self._stripes)]
+
+    # --- Per-stripe bookkeeping (callers hold stripe.lock) ---
+
+    @staticmethod
+    def _drop(stripe: _Stripe, session_id: str, reason: str) -> None:
+        session = stripe.sessions.pop(session_id)
+        stripe.bytes -= session.size
+        stripe.stats[reason] += 1
+
+    @staticmethod
+    def _reorder_front(stripe: _Stripe) -> Optional[tuple[str, _Session]]:
+        """
+        The least recently used session at the front of the stripe. Lock-free
+        reads only update `last_used`, so sessions read since they were last
+        ordered are moved to the end first.
+        """
+        while stripe.sessions:
+            session_id, session = next(iter(stripe.sessions.items()))
+            if session.last_used <= session.ordered_at:
+                return session_id, session
+            session.ordered_at = session.last_used
+            stripe.sessions.move_to_end(session_id)
+        return None
+
+    def _expire(self, stripe: _Stripe, now: float) -> None:
+        if self.idle_ttl_sec is None:
+            return
+        while (front := self._reorder_front(stripe)) is not None:
+            session_id, session = front
+            if now - session.last_used <= self.idle_ttl_sec:
+                break
+            self._drop(stripe, session_id, "expirations")
+
+    def _enforce_limits(self, stripe: _Stripe) -> None:
+        while len(stripe.sessions) > self._stripe_max_sessions:
+            self._drop(stripe, self._reorder_front(stripe)[0], "evictions")
+        if self._stripe_max_bytes is not None:
+            # The session just written is last and is kept even if it alone exceeds the budget.
+            while stripe.bytes > self._stripe_max_bytes and len(stripe.sessions) > 1:
+                self._drop(stripe, self._reorder_front(stripe)[0], "byte_evictions")
+
+    def _append(self, stripe: _Stripe, session: _Session, stored: tuple[_StoredEntry, ...]) -> None:
+        combined = session.history + stored
+        overflow = len(combined) - self.max_messages_per_session
+        delta = sum(entry.size for entry in stored)
+        if overflow > 0:
+            delta -= sum(entry.size for entry in combined[:overflow])
+            combined = combined[overflow:]
+        stripe.bytes += delta
+        session.size += delta
+        session.history = combined
+
+    def _touch(self, stripe: _Stripe, session_id: str, session: _Session, now: float) -> None:
+        session.last_used = now
+        session.ordered_at = now
+        stripe.sessions.move_to_end(session_id)
 
     def add_message(self, session_id: str, role: str, content: str) -> None:
         if not session_id or not content:
             return
-        with self._lock:
-            self._store[session_id].append(MemoryEntry(role=role, content=content))
+        entry = MemoryEntry(role=role, content=content)
+        # Compression happens before taking the stripe lock.
+        stored = _StoredEntry(entry, self.compress_min_bytes)
+        stripe = self._stripe(session_id)
+        now = time.monotonic()
+        with stripe.lock:
+            self._expire(stripe, now)
+            session = stripe.sessions.get(session_id)
+            if session is None:
+                session = _Session((), now, now)
+                stripe.sessions[session_id] = session
+            else:
+                self._touch(stripe, session_id, session, now)
+            self._append(stripe, session, (stored,))
+            self._enforce_limits(stripe)
+        if self.backend is None:
+            return
+        with self._pending_lock:
+            self._pending.append((session_id, entry))
+            pending = len(self._pending)
+        if not self.running:
+            # No background writer (scripts, tests): write through.
+            self.flush()
+        elif pending >= self.flush_batch_size:
+            self._request_flush()
+
+    def _snapshot(self, session_id: str) -> Optional[tuple[_StoredEntry, ...]]:
+        """
+        Lock-free read of a live session's history; expiry and LRU order are settled by writers.
+        None when the session has to be read from the backend.
+        """
+        session = self._stripe(session_id).sessions.get(session_id)
+        if session is None:
+            return None
+        now = time.monotonic()
+        if self.idle_ttl_sec is not None and now - session.last_used > self.idle_ttl_sec:
+            return None
+        session.last_used = now
+        if self.backend is not None and self.refresh_sec is not None and now - session.loaded_at > self.refresh_sec:
+            return None
+        return session.history
 
     def get_history(self, session_id: str) -> list[MemoryEntry]:
         if not session_id:
             return []
-        with self._lock:
-            return list(self._store.get(session_id, []))
+        history = self._snapshot(session_id)
+        if history is not None or self.backend is None:
+            return [entry.entry() for entry in history or ()]
+        return self._cold_load(session_id)
+
+    async def aget_history(self, session_id: str) -> list[MemoryEntry]:
+        """Like get_history(), but a backend load runs in a worker thread."""
+        if not session_id:
+            return []
+        history = self._snapshot(session_id)
+        if history is not None or self.backend is None:
+            return [entry.entry() for entry in history or ()]
+        return await asyncio.to_thread(self._cold_load, session_id)
+
+    def _read_backend(self, session_id: str) -> tuple[list[MemoryEntry], bool]:
+        try:
+            return self.backend.load(session_id, self.max_messages_per_session), True
+        except Exception as e:
+            logger.warning(f"Loading conversation history for session '{session_id}' failed: {e}")
+            return [], False
+
+    def _unwritten(self, session_id: str) -> list[MemoryEntry]:
+        # Callers hold _pending_lock.
+        return [entry for pending_id, entry in self._pending if pending_id == session_id]
+
+    def _load(self, session_id: str) -> tuple[list[MemoryEntry], bool]:
+        """
+        Stored rows plus the session's unwritten messages. Rows taken for a batch write are
+        in neither place until the batch commits, so a read that overlaps a batch is retried
+        and, after COLD_LOAD_ATTEMPTS, repeated under the flush lock.
+        """
+        for _ in range(COLD_LOAD_ATTEMPTS):
+            with self._pending_lock:
+                if session_id in self._in_flight:
+                    break
+                taken = self._batches_taken
+            entries, ok = self._read_backend(session_id)
+            with self._pending_lock:
+                if self._batches_taken == taken:
+                    return entries + self._unwritten(session_id), ok
+        with self._flush_lock:
+            entries, ok = self._read_backend(session_id)
+            with self._pending_lock:
+                return entries + self._unwritten(session_id), ok
+
+    def _cold_load(self, session_id: str) -> list[MemoryEntry]:
+        stripe = self._stripe(session_id)
+        cached = stripe.sessions.get(session_id)
+        seen = cached.history if cached is not None else None
+        entries, ok = self._load(session_id)
+        stored = tuple(
+            _StoredEntry(entry, self.compress_min_bytes) for entry in entries[-self.max_messages_per_session:]
+        )
+        now = time.monotonic()
+        with stripe.lock:
+            stripe.stats["refreshes" if cached is not None else "cold_loads"] += 1
+            self._expire(stripe, now)
+            session = stripe.sessions.get(session_id)
+            if session is not None:
+                self._touch(stripe, session_id, session, now)
+                if not ok or seen is None or session.history is not seen:
+                    # The read failed, or a message arrived while loading: keep what is in memory
+                    # and read the backend again next time.
+                    return [entry.entry() for entry in session.history]
+                # The backend has the session's messages from every worker, plus our unwritten ones.
+                stripe.bytes -= session.size
+                session.size = 0
+                session.history = ()
+            elif not stored and not ok:
+                # Retry the backend on the next read.
+                return []
+            else:
+                session = _Session((), now, now)
+                stripe.sessions[session_id] = session
+            self._append(stripe, session, stored)
+            session.loaded_at = now
+            self._enforce_limits(stripe)
+            return [entry.entry() for entry in session.history]
+
+    # --- Write-behind ---
+
+    def flush(self) -> int:
+        """Writes all buffered messages to the backend in batches; returns how many were written."""
+        if self.backend is None:
+            return 0
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._pending_lock:
+                    batch = [self._pending.popleft() for _ in range(min(self.flush_batch_size, len(self._pending)))]
+                    if not batch:
+                        return written
+                    self._in_flight = frozenset(session_id for session_id, _ in batch)
+                    self._batches_taken += 1
+                try:
+                    self.backend.write(batch)
+                except Exception as e:
+                    logger.warning(f"Writing {len(batch)} conversation messages failed, will retry: {e}")
+                    self._requeue(batch)
+                    return written
+                written += len(batch)
+                with self._pending_lock:
+                    self._in_flight = frozenset()
+                    self._stats["flushed_messages"] += len(batch)
+                    self._stats["flush_batches"] += 1
+
+    def _requeue(self, batch: list[tuple[str, MemoryEntry]]) -> None:
+        with self._pending_lock:
+            self._in_flight = frozenset()
+            self._stats["flush_errors"] += 1
+            self._pending.extendleft(reversed(batch))
+            while len(self._pending) > MAX_PENDING_WRITES:
+                self._pending.popleft()
+                self._stats["dropped_writes"] += 1
+
+    def _request_flush(self) -> None:
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None or loop.is_closed():
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is loop:
+            wake.set()
+        else:
+            loop.call_soon_threadsafe(wake.set)
+
+    async def _run(self) -> None:
+        if self.idle_ttl_sec is not None:
+            try:
+                pruned = await asyncio.to_thread(self.backend.prune, self.idle_ttl_sec)
+                if pruned:
+                    logger.info(f"Pruned {pruned} stored messages from idle conversation sessions.")
+            except Exception as e:
+                logger.warning(f"Pruning stored conversation sessions failed: {e}")
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval_sec)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._pending:
+                await asyncio.to_thread(self.flush)
+
+    def start(self) -> None:
+        """Starts the background writer when a backend is configured."""
+        if self.backend is None or self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run(), name="conversation-memory-writer")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._pending:
+            await asyncio.to_thread(self.flush)
+
+    def __len__(self) -> int:
+        return sum(len(stripe.sessions) for stripe in self._stripes)
 
+    def stats(self) -> dict:
+        now = time.monotonic()
+        stats = {
+            "evictions": 0,
+            "byte_evictions": 0,
+            "expirations": 0,
+            "cold_loads": 0,
+            "refreshes": 0,
+            "sessions": 0,
+            "bytes": 0,
+        }
+        for stripe in self._stripes:
+            with stripe.lock:
+                self._expire(stripe, now)
+                for key, value in stripe.stats.items():
+                    stats[key] += value
+                stats["sessions"] += len(stripe.sessions)
+                stats["bytes"] += stripe.bytes
+        with self._pending_lock:
+            stats.update(self._stats)
+            stats["pending_writes"] = len(self._pending)
+        stats["stripes"] = len(self._stripes)
+        stats["max_sessions"] = self.max_sessions
+        stats["max_bytes"] = self.max_bytes
+        stats["idle_ttl_sec"] = self.idle_ttl_sec
+        stats["backend"] = self.backend.name if self.backend is not None else "memory"
+        return stats
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Callable, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.core.memory import MemoryBackend, MemoryEntry
+from app.db.database import ConversationMessageORM, SessionLocal
+from app.db.repositories import ConversationMessageRepository
+
+
+class SQLiteMemoryBackend(MemoryBackend):
+    """
+    Stores conversation messages in the `conversation_messages` table of the
+    application database, trimmed to the newest `max_messages_per_session`
+    rows per session. Survives restarts and is visible to every worker.
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        max_messages_per_session: int = 20,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.max_messages_per_session = max_messages_per_session
+        self._session_factory = session_factory
+        self._table_ready = False
+
+    def _open_session(self) -> Session:
+        db = self._session_factory()
+        if not self._table_ready:
+            ConversationMessageORM.__table__.create(bind=db.get_bind(), checkfirst=True)
+            self._table_ready = True
+        return db
+
+    def load(self, session_id: str, limit: int) -> list[MemoryEntry]:
+        db = self._open_session()
+        try:
+            rows = ConversationMessageRepository(db).get_recent(session_id, limit)
+            return [MemoryEntry(role=row.role, content=row.content) for row in rows]
+        finally:
+            db.close()
+
+    def write(self, rows: Sequence[tuple[str, MemoryEntry]]) -> None:
+        db = self._open_session()
+        try:
+            ConversationMessageRepository(db).add_messages(
+                [(session_id, entry.role, entry.content) for session_id, entry in rows],
+                keep_per_session=self.max_messages_per_session,
+            )
+        finally:
+            db.close()
+
+    def prune(self, idle_ttl_sec: float) -> int:
+        db = self._open_session()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=idle_ttl_sec)
+            return ConversationMessageRepository(db).delete_idle_sessions(cutoff)
+        finally:
+            db.close()
@@ -1,17 +1,28 @@
 import os
 import re
+import time
+from collections import OrderedDict
 from pathlib import Path
-from dotenv import load_dotenv
 import logging
-from typing import Literal
+from dataclasses import dataclass
+from threading import Lock
+from typing import Iterable, Literal
 
-load_dotenv()
+from app.core.policy_matcher import RuleMatch, RuleMatcher
+from app.core.policy_rules import PolicyRules, PolicyRulesWatcher, compile_rules, file_signature, load_rules_file
+from app.core.sandbox_paths import SandboxPathChecker
+from app.core.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
 # --- Safety Configuration ---
-SANDBOX_ROOT = os.getenv("SANDBOX_ROOT", "C:\ai-sandbox")
-DEFAULT_POLICY_MODE = os.getenv("AI_OPERATOR_POLICY_MODE", "strict").strip().lower()
+_settings = get_settings()
+SANDBOX_ROOT = _settings.sandbox_root
+DEFAULT_POLICY_MODE = _settings.policy_mode
+DEFAULT_POLICY_RULES_FILE = _settings.policy_rules_file
+DEFAULT_RESOLVE_SYMLINKS = _settings.policy_resolve_symlinks
+DEFAULT_DECISION_CACHE_SIZE = _settings.policy_decision_cache_size
+DEFAULT_CACHE_TTL_SEC = _settings.policy_cache_ttl_sec
 ALLOWED_COMMAND_PREFIXES = [
     "git status",
     "git diff",
@@ -33,6 +44,18 @@ DISALLOWED_COMMAND_PATTERNS = [
     re.compile(r"\.\."),
 ]
 WINDOWS_ABSOLUTE_PATH_PATTERN = re.compile(r"[a-zA-Z]:\\[^\s\"'|><;]*")
+POLICY_STAGES = ("sandbox_cwd", "allow_prefix", "deny_pattern", "command_paths", "total")
+# Stands in for the signature of a rules file that cannot be stat'ed.
+_MISSING_FILE = (-1, -1)
+
+
+@dataclass(frozen=True)
+class PolicyDecision:
+    """Outcome of PolicyEnforcer.evaluate(): the verdict, a human-readable reason and the deciding rule."""
+    allowed: bool
+    reason: str
+    rule: RuleMatch | None = None
+
 
 class PolicyEnforcer:
     """
@@ -44,6 +67,11 @@ class PolicyEnforcer:
         sandbox_root: str = SANDBOX_ROOT,
         allowed_prefixes: list = None,
         policy_mode: Literal["strict", "dev"] | None = None,
+        deny_patterns: list | None = None,
+        rules_file: str | Path | None = None,
+        resolve_symlinks: bool | None = None,
+        decision_cache_size: int | None = None,
+        cache_ttl_sec: float | None = None,
     ):
         try:
             self.sandbox_root = Path(sandbox_root).resolve()
@@ -53,15 +81,48 @@ class PolicyEnforcer:
         except Exception as e:
             logger.error(f"Invalid SANDBOX_ROOT path: {sandbox_root}. Error: {e}")
             raise ValueError(f"Invalid SANDBOX_ROOT path: {sandbox_root}") from e
-        
-        self.allowed_prefixes = allowed_prefixes if allowed_prefixes is not None else ALLOWED_COMMAND_PREFIXES
+        cache_ttl_sec = cache_ttl_sec if cache_ttl_sec is not None else DEFAULT_CACHE_TTL_SEC
+        self.paths = SandboxPathChecker(
+            self.sandbox_root,
+            resolve_symlinks=resolve_symlinks if resolve_symlinks is not None else DEFAULT_RESOLVE_SYMLINKS,
+            ttl_sec=cache_ttl_sec,
+        )
+        # LRU of decisions keyed by (command, cwd, rules version); entries expire so symlink changes are noticed.
+        self.decision_cache_size = (
+            decision_cache_size if decision_cache_size is not None else DEFAULT_DECISION_CACHE_SIZE
+        )
+        self.cache_ttl_sec = cache_ttl_sec
+        self._decisions: OrderedDict[tuple, tuple[PolicyDecision, float]] = OrderedDict()
+        self._decisions_lock = Lock()
+        self._cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+        # Per stage: [checks, total seconds, slowest seconds].
+        self._timings = {stage: [0, 0.0, 0.0] for stage in POLICY_STAGES}
+        self._timings_lock = Lock()
+
+        # Explicit rule lists win over a rules file; the file wins over the built-in lists.
+        if allowed_prefixes is None and deny_patterns is None:
+            self.rules_file = rules_file if rules_file is not None else DEFAULT_POLICY_RULES_FILE
+        else:
+            self.rules_file = None
+        self._reload_lock = Lock()
+        self._reload_stats = {"reloads": 0, "reload_errors": 0, "last_error": None}
+        self._rejected_signature: tuple[int, int] | None = None
+        if self.rules_file:
+            self._rules = load_rules_file(self.rules_file)
+        else:
+            self._rules = compile_rules(
+                allowed_prefixes if allowed_prefixes is not None else ALLOWED_COMMAND_PREFIXES,
+                deny_patterns if deny_patterns is not None else DISALLOWED_COMMAND_PATTERNS,
+            )
         resolved_mode = (policy_mode or DEFAULT_POLICY_MODE).strip().lower()
         self.policy_mode: Literal["strict", "dev"] = "dev" if resolved_mode == "dev" else "strict"
         logger.info(
             "PolicyEnforcer initialized. "
             f"mode='{self.policy_mode}' "
             f"sandbox='{self.sandbox_root}' "
-            f"allowed_prefixes={self.allowed_prefixes}"
+            f"rules='{self.rules_file or 'built-in'}' "
+            f"allowed_prefixes={len(self.allowed_prefixes)} "
+            f"deny_patterns={len(self.deny_patterns)}"
         )
         if self.policy_mode == "dev":
             logger.warning(
@@ -69,66 +130,307 @@ class PolicyEnforcer:
                 "Sandbox/path/allowlist checks are relaxed for local development."
             )
 
+    @property
+    def rules(self) -> PolicyRules:
+        """The current compiled rules. Read it once per check; a reload replaces the whole object."""
+        return self._rules
+
+    @property
+    def allowed_prefixes(self) -> tuple[str, ...]:
+        return self._rules.allowed_prefixes
+
+    @property
+    def deny_patterns(self) -> tuple:
+        return self._rules.deny_patterns
+
+    @property
+    def matcher(self) -> RuleMatcher:
+        return self._rules.matcher
+
+    def reload_rules(self, force: bool = False) -> bool:
+        """
+        Re-reads the rules file if it changed since the last load and swaps in
+        the new rules. Parsing and compiling happen before the swap, so checks
+        keep using the previous rules until the new ones are complete; a file
+        that fails to load is logged and the previous rules stay in effect.
+        Returns True when new rules were installed.
+        """
+        if not self.rules_file:
+            return False
+        with self._reload_lock:
+            try:
+                signature = file_signature(self.rules_file)
+            except OSError as e:
+                return self._reject(_MISSING_FILE, f"Cannot read policy rules file '{self.rules_file}': {e}")
+            if not force and signature in (self._rules.signature, self._rejected_signature):
+                return False
+            try:
+                rules = load_rules_file(self.rules_file, version=self._rules.version + 1)
+            except ValueError as e:
+                return self._reject(signature, str(e))
+            self._rules = rules
+            self._rejected_signature = None
+            with self._decisions_lock:
+                self._decisions.clear()
+            self._reload_stats["reloads"] += 1
+            logger.info(
+                f"Policy rules reloaded from '{self.rules_file}': version={rules.version} "
+                f"allowed_prefixes={len(rules.allowed_prefixes)} deny_patterns={len(rules.deny_patterns)}"
+            )
+            return True
+
+    def _reject(self, signature: tuple[int, int], error: str) -> bool:
+        # A broken file is reported once per change, not on every poll.
+        if signature != self._rejected_signature:
+            logger.error(f"{error}. Keeping policy rules version {self._rules.version}.")
+            self._reload_stats["reload_errors"] += 1
+            self._reload_stats["last_error"] = error
+        self._rejected_signature = signature
+        return False
+
+    def rules_stats(self) -> dict:
+        rules = self._rules
+        stats = dict(self._reload_stats)
+        stats.update(
+            source=rules.source or "built-in",
+            version=rules.version,
+            loaded_at=rules.loaded_at,
+            **rules.matcher.stats(),
+        )
+        return stats
+
+    def match_allowed_prefix(self, command: str, rules: PolicyRules | None = None) -> RuleMatch | None:
+        """The most specific allowed prefix the command starts with, or None."""
+        return (rules or self._rules).matcher.match_allow(command)
 
     def is_command_allowed(self, command: str) -> bool:
         """Checks if the command matches any of the allowed prefixes."""
-        normalized_command = command.strip().lower()
-        for prefix in self.allowed_prefixes:
-            if normalized_command.startswith(prefix.lower()):
-                return True
+        if self.match_allowed_prefix(command) is not None:
+            return True
         logger.warning(f"Command denied by policy (not in whitelist): '{command}'")
         return False
 
-    def has_disallowed_command_pattern(self, command: str) -> bool:
-        """
-        Checks command string for absolute/traversal path patterns that could escape sandbox.
-        """
-        normalized_command = os.path.expandvars(command.strip())
-        for pattern in DISALLOWED_COMMAND_PATTERNS:
-            if pattern.search(normalized_command):
-                logger.warning(
-                    "Command denied by policy (disallowed path pattern): "
-                    f"pattern='{pattern.pattern}' command='{command}'"
-                )
-                return True
+    @staticmethod
+    def _expand(command: str) -> str:
+        command = command.strip()
+        # expandvars scans the whole string; most commands have nothing to expand.
+        return os.path.expandvars(command) if "$" in command or "%" in command else command
 
-        for path_str in WINDOWS_ABSOLUTE_PATH_PATTERN.findall(normalized_command):
+    def _match_deny_pattern(self, rules: PolicyRules, expanded: str, command: str) -> RuleMatch | None:
+        match = rules.matcher.match_deny(expanded)
+        if match is not None:
+            logger.warning(
+                "Command denied by policy (disallowed path pattern): "
+                f"pattern='{match.rule}' command='{command}'"
+            )
+        return match
+
+    def _match_outside_path(self, expanded: str, command: str) -> RuleMatch | None:
+        for path_str in WINDOWS_ABSOLUTE_PATH_PATTERN.findall(expanded):
             if not self.is_path_in_sandbox(path_str):
                 logger.warning(
                     "Command denied by policy (absolute path outside sandbox): "
                     f"path='{path_str}' command='{command}'"
                 )
-                return True
-        return False
+                return RuleMatch("outside_sandbox_path", path_str, -1)
+        return None
+
+    def match_disallowed_pattern(self, command: str, rules: PolicyRules | None = None) -> RuleMatch | None:
+        """
+        The deny pattern or outside-sandbox absolute path found in the command, or None.
+        """
+        expanded = self._expand(command)
+        return self._match_deny_pattern(rules or self._rules, expanded, command) or self._match_outside_path(
+            expanded, command
+        )
+
+    def has_disallowed_command_pattern(self, command: str) -> bool:
+        """
+        Checks command string for absolute/traversal path patterns that could escape sandbox.
+        """
+        return self.match_disallowed_pattern(command) is not None
 
     def is_path_in_sandbox(self, cwd: str | Path) -> bool:
         """Checks if the given path is within the configured sandbox directory."""
         try:
-            target_path = Path(cwd).resolve()
-            is_safe = target_path.is_relative_to(self.sandbox_root)
+            is_safe = self.paths.contains(cwd)
             if not is_safe:
-                 logger.warning(f"Path check failed: '{target_path}' is not in sandbox '{self.sandbox_root}'")
+                 logger.warning(f"Path check failed: '{cwd}' is not in sandbox '{self.sandbox_root}'")
             return is_safe
         except Exception as e:
             # This can happen for invalid path strings
             logger.error(f"Path validation error for cwd='{cwd}': {e}")
             return False
 
-    def check_all(self, command: str, cwd: str | Path | None) -> (bool, str):
-        """Runs all checks and returns a tuple (is_ok, reason)."""
+    def evaluate(self, command: str, cwd: str | Path | None) -> PolicyDecision:
+        """Runs all checks and reports the verdict together with the rule that decided it."""
+        # One snapshot for the whole check, even if a reload swaps the rules meanwhile.
+        return self._evaluate_with(self._rules, command, cwd)
+
+    def evaluate_many(
+        self, checks: Iterable[tuple[str, str | Path | None]], rules: PolicyRules | None = None
+    ) -> list[PolicyDecision]:
+        """
+        Evaluates a batch of (command, cwd) pairs against one rules snapshot, so
+        a reload in the middle cannot split the batch between two versions.
+        Repeated pairs are evaluated once.
+        """
+        rules = rules or self._rules
+        decisions: dict[tuple[str, str | None], PolicyDecision] = {}
+        results = []
+        for command, cwd in checks:
+            key = (command, None if cwd is None else os.fspath(cwd))
+            decision = decisions.get(key)
+            if decision is None:
+                decision = decisions[key] = self._evaluate_with(rules, command, cwd)
+            results.append(decision)
+        return results
+
+    def _evaluate_with(self, rules: PolicyRules, command: str, cwd: str | Path | None) -> PolicyDecision:
         if cwd is None:
-            return False, "Execution path (cwd) must be provided."
+            return PolicyDecision(False, "Execution path (cwd) must be provided.")
 
         if self.policy_mode == "dev":
-            return True, "Command is allowed (dev mode)."
+            return PolicyDecision(True, "Command is allowed (dev mode).")
+
+        key = (command, os.fspath(cwd), rules.version)
+        decision = self._cached_decision(key)
+        if decision is not None:
+            if not decision.allowed:
+                logger.warning(f"Command denied by policy (cached decision): '{command}' reason='{decision.reason}'")
+            return decision
+
+        timings: list[tuple[str, float]] = []
+        started = time.perf_counter()
+        decision = self._evaluate(rules, command, cwd, timings)
+        timings.append(("total", time.perf_counter() - started))
+        self._record_timings(timings)
+        self._store_decision(key, decision)
+        return decision
+
+    def _evaluate(
+        self, rules: PolicyRules, command: str, cwd: str | Path, timings: list[tuple[str, float]]
+    ) -> PolicyDecision:
+        started = time.perf_counter()
+        in_sandbox = self.is_path_in_sandbox(cwd)
+        timings.append(("sandbox_cwd", time.perf_counter() - started))
+        if not in_sandbox:
+            return PolicyDecision(
+                False, f"Execution path is outside the security sandbox. Allowed root: {self.sandbox_root}"
+            )
+
+        started = time.perf_counter()
+        allowed_by = self.match_allowed_prefix(command, rules)
+        timings.append(("allow_prefix", time.perf_counter() - started))
+        if allowed_by is None:
+            logger.warning(f"Command denied by policy (not in whitelist): '{command}'")
+            return PolicyDecision(False, "Command is not in the allowed list.")
+
+        started = time.perf_counter()
+        expanded = self._expand(command)
+        denied_by = self._match_deny_pattern(rules, expanded, command)
+        timings.append(("deny_pattern", time.perf_counter() - started))
+        if denied_by is None:
+            started = time.perf_counter()
+            denied_by = self._match_outside_path(expanded, command)
+            timings.append(("command_paths", time.perf_counter() - started))
+        if denied_by is not None:
+            return PolicyDecision(
+                False, "Command contains a disallowed path pattern (outside-sandbox risk).", denied_by
+            )
+
+        return PolicyDecision(True, "Command is allowed.", allowed_by)
+
+    def _cached_decision(self, key: tuple) -> PolicyDecision | None:
+        if self.decision_cache_size <= 0:
+            return None
+        with self._decisions_lock:
+            cached = self._decisions.get(key)
+            if cached is not None and cached[1] > time.monotonic():
+                self._decisions.move_to_end(key)
+                self._cache_stats["hits"] += 1
+                return cached[0]
+            self._cache_stats["misses"] += 1
+            return None
+
+    def _store_decision(self, key: tuple, decision: PolicyDecision) -> None:
+        if self.decision_cache_size <= 0:
+            return
+        with self._decisions_lock:
+            self._decisions[key] = (decision, time.monotonic() + self.cache_ttl_sec)
+            self._decisions.move_to_end(key)
+            while len(self._decisions) > self.decision_cache_size:
+                self._decisions.popitem(last=False)
+                self._cache_stats["evictions"] += 1
+
+    def _record_timings(self, timings: list[tuple[str, float]]) -> None:
+        with self._timings_lock:
+            for stage, elapsed in timings:
+                totals = self._timings[stage]
+                totals[0] += 1
+                totals[1] += elapsed
+                totals[2] = max(totals[2], elapsed)
+
+    def check_stats(self) -> dict:
+        """Decision cache counters, path resolution cache and per-stage timings of uncached checks."""
+        with self._decisions_lock:
+            cache = dict(self._cache_stats)
+            cache["entries"] = len(self._decisions)
+        cache["max_entries"] = self.decision_cache_size
+        with self._timings_lock:
+            stages = {
+                stage: {
+                    "checks": count,
+                    "avg_us": total / count * 1e6 if count else 0.0,
+                    "max_us": slowest * 1e6,
+                }
+                for stage, (count, total, slowest) in self._timings.items()
+            }
+        return {"decision_cache": cache, "paths": self.paths.stats(), "stages": stages}
+
+    def check_all(self, command: str, cwd: str | Path | None) -> (bool, str):
+        """Runs all checks and returns a tuple (is_ok, reason)."""
+        decision = self.evaluate(command, cwd)
+        return decision.allowed, decision.reason
+
+
+_policy_enforcer: PolicyEnforcer | None = None
+_policy_enforcer_lock = Lock()
+
+
+def get_policy_enforcer() -> PolicyEnforcer:
+    """
+    Returns the shared PolicyEnforcer, creating it on first use.
+    Construction touches the filesystem (sandbox resolve/mkdir), so it is kept out of import time.
+    """
+    global _policy_enforcer
+    if _policy_enforcer is None:
+        with _policy_enforcer_lock:
+            if _policy_enforcer is None:
+                _policy_enforcer = PolicyEnforcer()
+    return _policy_enforcer
+
+
+def _build_default_rules_watcher() -> PolicyRulesWatcher:
+    settings = get_settings()
+    return PolicyRulesWatcher(
+        lambda: get_policy_enforcer().reload_rules(),
+        settings.policy_rules_file,
+        interval_sec=settings.policy_reload_interval_sec,
+    )
+
+
+policy_rules_watcher = _build_default_rules_watcher()
 
-        if not self.is_path_in_sandbox(cwd):
-            return False, f"Execution path is outside the security sandbox. Allowed root: {self.sandbox_root}"
 
-        if not self.is_command_allowed(command):
-            return False, "Command is not in the allowed list."
+def policy_rules_stats() -> dict:
+    """Rules version and reload counters for /metrics; does not create the enforcer."""
+    stats = policy_rules_watcher.stats()
+    if _policy_enforcer is not None:
+        stats.update(_policy_enforcer.rules_stats())
+    return stats
 
-        if self.has_disallowed_command_pattern(command):
-            return False, "Command contains a disallowed path pattern (outside-sandbox risk)."
 
-        return True, "Command is allowed."
+def policy_check_stats() -> dict:
+    """Decision cache and stage timings for /metrics; empty until the enforcer exists."""
+    return _policy_enforcer.check_stats() if _policy_enforcer is not None else {}
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+# Flags that can be scoped to one alternative of the combined regex with (?flags:...).
+_SCOPED_FLAGS = {re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s", re.VERBOSE: "x"}
+# Flags every compiled str pattern carries; they need no scoping.
+_IMPLICIT_FLAGS = re.UNICODE
+# Numbered or named backreferences break once patterns are joined; those are searched on their own.
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+_META = set(".^$*+?{}[]()|")
+# Trie key for "a pattern's literal prefix ends here"; never a single character.
+_END = ""
+
+
+@dataclass(frozen=True)
+class RuleMatch:
+    """The rule that decided a command: its kind, source text and position in its rule list."""
+    kind: str
+    rule: str
+    index: int
+
+
+class PrefixTrie:
+    """
+    Case-insensitive prefix set built once. A lookup walks the command one
+    character at a time, so its cost depends on the command length, not on
+    the number of prefixes.
+    """
+
+    def __init__(self, prefixes: Sequence[str]):
+        self._root: dict = {}
+        self.size = 0
+        for index, prefix in enumerate(prefixes):
+            node = self._root
+            for char in prefix.lower():
+                node = node.setdefault(char, {})
+            if _END not in node:
+                node[_END] = index
+                self.size += 1
+
+    def longest_match(self, text: str) -> Optional[int]:
+        """Index of the longest prefix of `text` (already lowercased), or None."""
+        node = self._root
+        found = node.get(_END)
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(_END, found)
+        return found
+
+
+def _has_top_level_alternation(source: str) -> bool:
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+def _split_literal(source: str) -> tuple[str, str]:
+    """Splits a pattern into its leading literal text and the regex source that follows it."""
+    if _has_top_level_alternation(source):
+        return "", source
+    chars: list[tuple[str, int]] = []
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            if i + 1 >= len(source) or source[i + 1].isalnum():
+                break  # \b, \d, \1, \u00e9 ... are not plain characters
+            chars.append((source[i + 1], i))
+            i += 2
+        elif char in _META:
+            break
+        else:
+            chars.append((char, i))
+            i += 1
+    # A quantifier after the literal applies to its last character only.
+    if chars and i < len(source) and source[i] in "*+?{":
+        i = chars.pop()[1]
+    return "".join(char for char, _ in chars), source[i:]
+
+
+def _trie_source(node: dict) -> str:
+    """Regex for a trie of literal prefixes; each end holds the rest of a pattern."""
+    parts = []
+    while True:
+        rests = node.get(_END, [])
+        children = [(char, child) for char, child in node.items() if char != _END]
+        if not rests and len(children) == 1:
+            char, node = children[0]
+            parts.append(re.escape(char))
+            continue
+        branches = [re.escape(char) + _trie_source(child) for char, child in children]
+        branches += [f"(?:{rest})" if rest else "" for rest in dict.fromkeys(rests)]
+        parts.append(branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")")
+        return "".join(parts)
+
+
+class PatternSet:
+    """
+    Deny patterns joined into one regex, so a clean command costs one search
+    however many patterns there are. Leading literal text is merged into a
+    trie, so patterns sharing a prefix are not tried one after another. After
+    a hit, only the patterns whose literal prefix starts at the hit are tried
+    to report which one matched.
+    """
+
+    def __init__(self, patterns: Sequence[str | re.Pattern]):
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self._flags = [self._scoped_flags(pattern) for pattern in self.patterns]
+        self._joined = [index for index, flags in enumerate(self._flags) if flags is not None]
+        try:
+            self._combined = self._compile(self._joined)
+        except re.error:
+            # Some pattern cannot be nested (a leading global flag such as (?i)); search those on their own.
+            self._joined = [index for index in self._joined if self._nests(index)]
+            self._combined = self._compile(self._joined)
+        self._candidates = self._index_literals(self._joined)
+        joined = set(self._joined)
+        self._separate = [index for index in range(len(self.patterns)) if index not in joined]
+
+    @staticmethod
+    def _scoped_flags(pattern: re.Pattern) -> Optional[str]:
+        """Inline flag letters that reproduce the pattern's flags, or None if it cannot be joined."""
+        if not isinstance(pattern.pattern, str) or _BACKREFERENCE.search(pattern.pattern):
+            return None
+        flags = pattern.flags & ~_IMPLICIT_FLAGS
+        letters = ""
+        for flag, letter in _SCOPED_FLAGS.items():
+            if flags & flag:
+                letters += letter
+                flags &= ~flag
+        return None if flags else letters
+
+    def _alternative(self, index: int) -> str:
+        letters, source = self._flags[index], self.patterns[index].pattern
+        # A newline ends a trailing verbose-mode comment before the group closes.
+        suffix = "\n" if "x" in letters else ""
+        return f"(?{letters}:{source}{suffix})"
+
+    def _nests(self, index: int) -> bool:
+        try:
+            re.compile(self._alternative(index))
+            return True
+        except re.error:
+            return False
+
+    def _compile(self, indices: list[int]) -> Optional[re.Pattern]:
+        trie: dict = {}
+        branches = []
+        for index in indices:
+            if self._flags[index]:
+                branches.append(self._alternative(index))
+                continue
+            literal, rest = _split_literal(self.patterns[index].pattern)
+            node = trie
+            for char in literal:
+                node = node.setdefault(char, {})
+            node.setdefault(_END, []).append(rest)
+        if trie:
+            branches.insert(0, _trie_source(trie))
+        return re.compile("|".join(branches)) if branches else None
+
+    def _index_literals(self, indices: list[int]) -> dict:
+        """Trie of the joined patterns' literal prefixes; each end lists the patterns it starts."""
+        root: dict = {_END: []}
+        for index in indices:
+            literal = "" if self._flags[index] else _split_literal(self.patterns[index].pattern)[0]
+            node = root
+            for char in literal:
+                node = node.setdefault(char, {})
+            node.setdefault(_END, []).append(index)
+        return root
+
+    def _identify(self, text: str, start: int) -> Optional[int]:
+        candidates = list(self._candidates[_END])
+        node = self._candidates
+        for char in text[start:]:
+            node = node.get(char)
+            if node is None:
+                break
+            candidates.extend(node.get(_END, ()))
+        for index in sorted(candidates):
+            if self.patterns[index].match(text, start):
+                return index
+        return None
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def search(self, text: str) -> Optional[int]:
+        """Index of a pattern found in `text`, or None."""
+        if self._combined is not None:
+            hit = self._combined.search(text)
+            if hit is not None:
+                index = self._identify(text, hit.start())
+                if index is not None:
+                    return index
+                # Not reachable unless the joined patterns interact; fall back to a full scan.
+                for index in self._joined:
+                    if self.patterns[index].search(text):
+                        return index
+        for index in self._separate:
+            if self.patterns[index].search(text):
+                return index
+        return None
+
+
+class RuleMatcher:
+    """Compiled allow prefixes and deny patterns for PolicyEnforcer."""
+
+    def __init__(self, allowed_prefixes: Sequence[str], deny_patterns: Sequence[str | re.Pattern]):
+        self.allowed_prefixes = list(allowed_prefixes)
+        self._trie = PrefixTrie(self.allowed_prefixes)
+        self._patterns = PatternSet(deny_patterns)
+
+    def match_allow(self, command: str) -> Optional[RuleMatch]:
+        """The most specific allowed prefix of the command (case-insensitive, surrounding spaces ignored)."""
+        index = self._trie.longest_match(command.strip().lower())
+        if index is None:
+            return None
+        return RuleMatch("allow_prefix", self.allowed_prefixes[index], index)
+
+    def match_deny(self, command: str) -> Optional[RuleMatch]:
+        index = self._patterns.search(command)
+        if index is None:
+            return None
+        return RuleMatch("deny_pattern", self._patterns.patterns[index].pattern, index)
+
+    def stats(self) -> dict:
+        return {"allowed_prefixes": self._trie.size, "deny_patterns": len(self._patterns)}
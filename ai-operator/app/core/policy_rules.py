@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+from app.core.policy_matcher import RuleMatcher
+
+logger = logging.getLogger(__name__)
+
+RULES_FILE_KEYS = ("allowed_prefixes", "deny_patterns")
+
+
+@dataclass(frozen=True)
+class PolicyRules:
+    """
+    One compiled, immutable set of policy rules. PolicyEnforcer swaps whole
+    snapshots, so a check always sees the prefixes and patterns of one version.
+    """
+    allowed_prefixes: tuple[str, ...]
+    deny_patterns: tuple
+    matcher: RuleMatcher = field(repr=False)
+    source: Optional[str] = None
+    # (mtime_ns, size) of the file the rules came from; None for built-in rules.
+    signature: Optional[tuple[int, int]] = None
+    version: int = 0
+    loaded_at: float = field(default_factory=time.time)
+
+
+def compile_rules(
+    allowed_prefixes: Sequence[str],
+    deny_patterns: Sequence,
+    source: Optional[str] = None,
+    signature: Optional[tuple[int, int]] = None,
+    version: int = 0,
+) -> PolicyRules:
+    allowed_prefixes = tuple(allowed_prefixes)
+    deny_patterns = tuple(deny_patterns)
+    return PolicyRules(
+        allowed_prefixes=allowed_prefixes,
+        deny_patterns=deny_patterns,
+        matcher=RuleMatcher(allowed_prefixes, deny_patterns),
+        source=source,
+        signature=signature,
+        version=version,
+    )
+
+
+def file_signature(path: str | Path) -> tuple[int, int]:
+    """(mtime_ns, size); a change in either means the file has to be read again."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _parse(path: Path, text: str):
+    if path.suffix.lower() in {".yaml", ".yml"}:
+        try:
+            import yaml
+        except ImportError as e:
+            raise ValueError(f"Policy rules file '{path}' is YAML but PyYAML is not installed.") from e
+        try:
+            return yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Cannot parse policy rules file '{path}': {e}") from e
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Cannot parse policy rules file '{path}': {e}") from e
+
+
+def load_rules_file(path: str | Path, version: int = 0) -> PolicyRules:
+    """
+    Reads and compiles a JSON or YAML rules file:
+
+        {"allowed_prefixes": ["git status", ...], "deny_patterns": ["--no-verify", ...]}
+
+    Raises ValueError when the file cannot be read, parsed or compiled.
+    """
+    path = Path(path)
+    try:
+        signature = file_signature(path)
+        text = path.read_text(encoding="utf-8")
+    except OSError as e:
+        raise ValueError(f"Cannot read policy rules file '{path}': {e}") from e
+    data = _parse(path, text)
+
+    if not isinstance(data, dict):
+        raise ValueError(f"Policy rules file '{path}' must contain a mapping with {', '.join(RULES_FILE_KEYS)}.")
+    unknown = set(data) - set(RULES_FILE_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown keys in policy rules file '{path}': {', '.join(sorted(unknown))}")
+    rules = {}
+    for key in RULES_FILE_KEYS:
+        values = data.get(key) or []
+        if not isinstance(values, list) or not all(isinstance(value, str) and value for value in values):
+            raise ValueError(f"'{key}' in policy rules file '{path}' must be a list of non-empty strings.")
+        rules[key] = values
+    try:
+        return compile_rules(rules["allowed_prefixes"], rules["deny_patterns"], str(path), signature, version)
+    except re.error as e:
+        raise ValueError(f"Invalid deny pattern in policy rules file '{path}': {e}") from e
+
+
+class PolicyRulesWatcher:
+    """
+    Background task that polls the policy rules file every `interval_sec`.
+    A changed file is parsed and compiled in a worker thread and then swapped
+    in by `reload`, so request handlers never wait on file I/O or compilation.
+    """
+
+    def __init__(self, reload: Callable[[], bool], path: Optional[str], interval_sec: float = 2.0):
+        self.reload = reload
+        self.path = path
+        self.interval_sec = interval_sec
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Starts polling when a rules file is configured."""
+        if not self.path or self.interval_sec <= 0 or self.running:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="policy-rules-watcher")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_sec)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception as e:
+                # reload reports bad files itself; this is a safety net.
+                logger.error(f"Policy rules reload failed: {e}")
+
+    def stats(self) -> dict:
+        return {"running": self.running, "path": self.path, "interval_sec": self.interval_sec}
@@ -1,13 +1,45 @@
 import logging
 import json
 import re
+from threading import Lock
+from typing import AsyncIterator
+from app.core.embedding_classifier import EmbeddingIntentClassifier, embedding_classifier
+from app.core.fast_path import FastPathClassifier
 from app.core.memory import MemoryEntry
+from app.core.session_prompts import (
+    PromptEvalStats,
+    SessionPromptCache,
+    format_user_turn,
+    split_messages_to_budget,
+)
+from app.core.settings import get_settings
+from app.core.streaming import FieldDelta, JsonFieldStreamParser
+from app.core.summarizer import ConversationSummarizer, conversation_summarizer
+from app.core.tokens import DEFAULT_NUM_CTX, ContextBudget, estimate_message_tokens, estimate_tokens
 from app.models.schemas import Intent, ChatRequest, ChatResponse
-from app.llm.client import ollama_client, OllamaConnectionError, OllamaModelUnavailableError
-from app.llm.prompts import SYSTEM_PROMPT
+from app.llm.cache import LLMResponseCache, llm_response_cache
+from app.llm.semantic_cache import SemanticLookup, SemanticResponseCache, semantic_response_cache
+from app.llm.client import (
+    ollama_client,
+    OllamaChatResult,
+    OllamaConnectionError,
+    OllamaModelUnavailableError,
+    OllamaOverloadedError,
+)
+from app.llm.prompts import (
+    ANSWER_SYSTEM_PROMPT,
+    CLASSIFICATION_SCHEMA,
+    CLASSIFY_SCHEMA,
+    CLASSIFY_SYSTEM_PROMPT,
+    SYSTEM_PROMPT,
+)
 
 logger = logging.getLogger(__name__)
 
+# Top-level fields forwarded to streaming clients while the JSON is still being generated.
+STREAMED_FIELDS = ("intent", "proposed_command", "response")
+SUMMARY_PREFIX = "Summary of earlier conversation:\n"
+
 
 def _parse_llm_json_payload(raw_text: str) -> dict:
     """
@@ -19,8 +51,14 @@ def _parse_llm_json_payload(raw_text: str) -> dict:
     try:
         return json.loads(text)
     except json.JSONDecodeError:
-        pass
+        return _recover_llm_json_payload(text)
+
 
+def _recover_llm_json_payload(text: str) -> dict:
+    """
+    Slow path for output that is not a bare JSON object (only expected
+    when Ollama's `format` constraint is off or unsupported).
+    """
     # Remove fenced block markers and parse inner content.
     fence_match = re.search(r"```(?:json)?\s*(.*?)\s*```", text, flags=re.DOTALL | re.IGNORECASE)
     if fence_match:
@@ -42,58 +80,694 @@ def _parse_llm_json_payload(raw_text: str) -> dict:
 class IntentRouter:
     """
     Determines the user's intent from their message using an LLM.
+    Obvious messages are answered by a rule-based fast path without calling the LLM.
+
+    In two-phase mode a short, token-capped call classifies the message first,
+    and a full answer is generated only for chat and code help. A confident
+    embedding match skips the classification call in either mode.
     """
-    def classify_intent(
+    def __init__(
+        self,
+        fast_path: FastPathClassifier | None = None,
+        session_prompting: bool | None = None,
+        context_budget: ContextBudget | None = None,
+        summarizer: ConversationSummarizer | None = None,
+        two_phase: bool | None = None,
+        embeddings: EmbeddingIntentClassifier | None = None,
+        semantic_cache: SemanticResponseCache | None = None,
+    ):
+        settings = get_settings()
+        self.fast_path = fast_path or FastPathClassifier(enabled=settings.fast_path_enabled)
+        # Confident chat/code help matches skip the classification generation and go straight to the answer.
+        self.embeddings = embeddings or embedding_classifier
+        # Near-duplicate chat/code help questions are answered from earlier answers.
+        self.semantic_cache = semantic_cache or semantic_response_cache
+        self.two_phase = settings.llm_two_phase if two_phase is None else two_phase
+        if self.semantic_cache.enabled and not self._semantic_servable:
+            logger.warning(
+                "SEMANTIC_CACHE_ENABLED has no effect in single-phase mode; "
+                "set LLM_TWO_PHASE=true or EMBEDDING_CLASSIFIER_ENABLED=true to use it"
+            )
+        self.classify_model = settings.llm_classify_model
+        self.classify_num_predict = settings.llm_classify_num_predict
+        self.answer_model = settings.llm_answer_model
+        self.answer_num_predict = settings.llm_answer_num_predict
+        # Each phase has its own system prompt, so two-phase mode sends the flattened history.
+        self.session_prompting = not self.two_phase and (
+            settings.llm_session_prompting if session_prompting is None else session_prompting
+        )
+        self.context_budget = context_budget or ContextBudget(
+            num_ctx=settings.ollama_num_ctx or DEFAULT_NUM_CTX,
+            history_tokens=settings.llm_history_tokens,
+        )
+        # Turns that no longer fit in the history budget are folded into a rolling summary.
+        self.summarizer = summarizer or conversation_summarizer
+        system_tokens = estimate_message_tokens([{"role": "system", "content": SYSTEM_PROMPT}])
+        self.session_prompts = SessionPromptCache(max_tokens=self.context_budget.history_budget(system_tokens))
+        self.prompt_eval_stats = PromptEvalStats()
+        self.output_format = settings.llm_output_format
+        self._output_lock = Lock()
+        self._output_stats = {"parsed": 0, "strict": 0, "recovered": 0, "fallbacks": 0}
+
+    def _ollama_format(self, schema: dict = CLASSIFICATION_SCHEMA) -> str | dict | None:
+        if self.output_format == "schema":
+            return schema
+        if self.output_format == "json":
+            return "json"
+        return None
+
+    @staticmethod
+    def _session_id(request: ChatRequest) -> str:
+        return request.session_id or "default"
+
+    def _build_messages(
         self,
         request: ChatRequest,
         history: list[MemoryEntry] | None = None,
-    ) -> tuple[Intent, list[str], str | None, str | None]:
-        """
-        Classifies intent, generates a plan, and extracts structured response fields using Ollama.
-        Returns: (intent, plan, proposed_command, response_text)
-        """
+        system_prompt: str = SYSTEM_PROMPT,
+    ) -> list[dict[str, str]]:
+        if self.session_prompting and system_prompt is SYSTEM_PROMPT:
+            return self._build_session_messages(request, history)
+
+        session_id = self._session_id(request)
+        current_content = f"User: {request.message}"
+        if request.cwd:
+            current_content += f"\nCurrent Working Directory: {request.cwd}"
+
         user_message_content = ""
         if history:
-            history_lines = []
-            for entry in history[-10:]:
-                role = "User" if entry.role.lower() == "user" else "Assistant"
-                history_lines.append(f"{role}: {entry.content}")
-            user_message_content += "Conversation history:\n" + "\n".join(history_lines) + "\n\n"
+            summary = self.summarizer.get(session_id)
+            if summary:
+                user_message_content += f"{SUMMARY_PREFIX}{summary}\n\n"
+            fixed_tokens = estimate_message_tokens(
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_message_content + current_content},
+                ]
+            )
+            # Newest entries first, as many as fit; everything older goes to the summary.
+            older, recent = ContextBudget.split_recent(
+                history,
+                self.context_budget.history_budget(fixed_tokens),
+                lambda entry: estimate_tokens(self._history_line(entry)) + 1,
+            )
+            self.summarizer.fold(session_id, [(entry.role.lower(), entry.content) for entry in older])
+            if recent:
+                history_lines = [self._history_line(entry) for entry in recent]
+                user_message_content += "Conversation history:\n" + "\n".join(history_lines) + "\n\n"
+        else:
+            self.summarizer.clear(session_id)
 
-        user_message_content += f"User: {request.message}"
-        if request.cwd:
-            user_message_content += f"\nCurrent Working Directory: {request.cwd}"
+        user_message_content += current_content
 
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
+        return [
+            {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_message_content}
         ]
 
+    @staticmethod
+    def _history_line(entry: MemoryEntry) -> str:
+        role = "User" if entry.role.lower() == "user" else "Assistant"
+        return f"{role}: {entry.content}"
+
+    def _build_session_messages(
+        self,
+        request: ChatRequest,
+        history: list[MemoryEntry] | None,
+    ) -> list[dict[str, str]]:
+        """
+        Session prompting: the byte-stable system prompt, then the session's earlier
+        turns as real chat messages, then the new user turn. Each prompt extends the
+        previous one, so Ollama only evaluates the new tokens.
+        """
+        session_id = self._session_id(request)
+        if not history:
+            # ConversationMemory has nothing for this session (new or reset); start over.
+            self.session_prompts.clear(session_id)
+            self.summarizer.clear(session_id)
+            session_history = []
+        else:
+            session_history = self.session_prompts.get(session_id)
+            if session_history is None:
+                session_history, dropped = self.session_prompts.seed(session_id, history)
+                self._fold_session_messages(session_id, dropped)
+
+        # The summary sits right after the system prompt; it changes only after a truncation,
+        # which rewrites the prefix anyway.
+        head = [{"role": "system", "content": SYSTEM_PROMPT}]
+        summary = self.summarizer.get(session_id)
+        if summary:
+            head.append({"role": "system", "content": f"{SUMMARY_PREFIX}{summary}"})
+        user_turn = {"role": "user", "content": format_user_turn(request.message, request.cwd)}
+
+        budget = self.context_budget.history_budget(estimate_message_tokens([*head, user_turn]))
+        if estimate_message_tokens(session_history) > budget:
+            # An unusually long message: send fewer turns this time, keep the cached history as is.
+            session_history = split_messages_to_budget(session_history, budget)[1]
+        return [*head, *session_history, user_turn]
+
+    def _fold_session_messages(self, session_id: str, messages: list[dict[str, str]]) -> None:
+        turns = []
+        for message in messages:
+            content = message["content"]
+            if message["role"] == "user":
+                content = content.removeprefix("User: ")
+            else:
+                # Assistant turns are the model's raw JSON; only its reply text is worth summarizing.
+                try:
+                    content = _parse_llm_json_payload(content).get("response") or content
+                except (json.JSONDecodeError, AttributeError):
+                    pass
+            turns.append((message["role"], content))
+        self.summarizer.fold(session_id, turns)
+
+    def _remember_turn(self, request: ChatRequest, intent: Intent, assistant_content: str) -> None:
+        # Only turns that ConversationMemory also stores; otherwise a session reseeded from memory
+        # would no longer match the prompts sent so far.
+        if self.session_prompting and intent in (Intent.CHAT, Intent.CODE_HELP):
+            session_id = self._session_id(request)
+            dropped = self.session_prompts.append_turn(
+                session_id,
+                format_user_turn(request.message, request.cwd),
+                assistant_content,
+            )
+            self._fold_session_messages(session_id, dropped)
+
+    def _prompt_eval_recorder(self, request: ChatRequest, messages: list[dict[str, str]]):
+        session_id = self._session_id(request)
+        history_messages = sum(1 for message in messages[:-1] if message["role"] != "system")
+
+        def record(result: OllamaChatResult) -> None:
+            turn = self.prompt_eval_stats.record(session_id, history_messages, result)
+            logger.info(
+                f"Prompt eval for session '{session_id}': history_messages={history_messages} "
+                f"prompt_eval_count={turn['prompt_eval_count']} prompt_eval_ms={turn['prompt_eval_ms']} "
+                f"eval_count={turn['eval_count']}"
+            )
+
+        return record
+
+    @staticmethod
+    def _classification_content(classification: tuple[Intent, list[str], str | None, str | None]) -> str:
+        intent, plan, proposed_command, response_text = classification
+        return json.dumps(
+            {"intent": intent.value, "plan": plan, "proposed_command": proposed_command, "response": response_text},
+            ensure_ascii=False,
+        )
+
+    def _record_parse(self, outcome: str) -> None:
+        with self._output_lock:
+            self._output_stats["parsed"] += 1
+            self._output_stats[outcome] += 1
+
+    def output_stats(self) -> dict:
+        """Parse outcomes for fresh LLM generations; fallbacks are generations the user had to repeat."""
+        with self._output_lock:
+            stats = dict(self._output_stats)
+        parsed = stats["parsed"]
+        stats["format"] = self.output_format
+        stats["two_phase"] = self.two_phase
+        stats["parse_failures"] = parsed - stats["strict"]
+        stats["wasted_generation_rate"] = stats["fallbacks"] / parsed if parsed else 0.0
+        return stats
+
+    def session_stats(self) -> dict:
+        stats = self.session_prompts.stats()
+        stats["enabled"] = self.session_prompting
+        stats["num_ctx"] = self.context_budget.num_ctx
+        stats["history_tokens"] = self.context_budget.history_tokens
+        stats["prompt_eval"] = self.prompt_eval_stats.stats()
+        return stats
+
+    def _build_prompts(
+        self,
+        request: ChatRequest,
+        history: list[MemoryEntry] | None,
+    ) -> list[list[dict[str, str]]]:
+        """The message lists this mode sends: one, or the phase-one and phase-two lists in two-phase mode."""
+        if self.two_phase:
+            return [
+                self._build_messages(request, history, CLASSIFY_SYSTEM_PROMPT),
+                self._build_messages(request, history, ANSWER_SYSTEM_PROMPT),
+            ]
+        return [self._build_messages(request, history)]
+
+    def _cache_key(self, prompts: list[list[dict[str, str]]]) -> str | None:
+        # Without a selected model the chat call refreshes detection first; skip caching then.
+        if not llm_response_cache.enabled or not ollama_client.model:
+            return None
+        variant = f"{self.classify_model}\n{self.answer_model}" if self.two_phase else ""
+        return LLMResponseCache.build_key(ollama_client.model, prompts, variant)
+
+    def _parse_classification(
+        self,
+        llm_response_content: str,
+        record: bool = True,
+    ) -> tuple[tuple[Intent, list[str], str | None, str | None], bool]:
+        """
+        Returns (classification, parsed_ok). parsed_ok is False when the generic
+        CHAT fallback had to be used; such output must not be cached.
+        `record` counts the outcome in output_stats(); cached content is not counted.
+        """
+        logger.debug(f"LLM raw response: {llm_response_content}")
+        outcome = "strict"
         try:
-            llm_response_content = ollama_client.chat(messages)
-            logger.debug(f"LLM raw response: {llm_response_content}")
+            # Strict parse first: with Ollama's `format` constraint the reply is a bare JSON object.
+            try:
+                llm_output = json.loads(llm_response_content)
+            except json.JSONDecodeError:
+                outcome = "recovered"
+                llm_output = _recover_llm_json_payload(llm_response_content.strip())
 
-            # Attempt to parse the JSON response from the LLM
-            llm_output = _parse_llm_json_payload(llm_response_content)
-            
             intent = Intent(llm_output.get("intent"))
             plan = llm_output.get("plan", [])
             proposed_command = llm_output.get("proposed_command")
             response_text = llm_output.get("response")
 
             logger.info(f"LLM classified intent as {intent}, proposed command: {proposed_command}")
-            return intent, plan, proposed_command, response_text
+            if record:
+                self._record_parse(outcome)
+            return (intent, plan, proposed_command, response_text), True
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse LLM response as JSON: {llm_response_content}. Error: {e}")
+            if record:
+                self._record_parse("fallbacks")
+            return (Intent.CHAT, ["Failed to parse LLM response. Please try again or rephrase your request."], None, None), False
+        except Exception as e:
+            logger.error(f"An unexpected error occurred during intent classification: {e}")
+            if record:
+                self._record_parse("fallbacks")
+            return (Intent.CHAT, ["An internal error occurred during intent classification."], None, None), False
+
+    def _parse_phase_one(self, content: str) -> tuple[Intent, str | None]:
+        """Phase-one reply -> (intent, proposed_command). Unparseable replies are answered as chat."""
+        outcome = "strict"
+        try:
+            try:
+                llm_output = json.loads(content)
+            except json.JSONDecodeError:
+                outcome = "recovered"
+                llm_output = _recover_llm_json_payload(content.strip())
+            intent = Intent(llm_output.get("intent"))
+            proposed_command = llm_output.get("proposed_command") if intent == Intent.SYSTEM_TASK else None
+        except Exception as e:
+            logger.error(f"Failed to parse phase-one classification: {content}. Error: {e}")
+            self._record_parse("fallbacks")
+            return Intent.CHAT, None
+        self._record_parse(outcome)
+        logger.info(f"LLM classified intent as {intent}, proposed command: {proposed_command}")
+        return intent, proposed_command
+
+    @staticmethod
+    def _two_phase_plan(intent: Intent, proposed_command: str | None) -> list[str]:
+        if intent == Intent.SYSTEM_TASK:
+            return [
+                f"Propose executing the command: '{proposed_command}'.",
+                "Await user approval.",
+                "Execute command upon approval.",
+            ]
+        if intent == Intent.CODE_HELP:
+            return ["Analyze the request.", "Provide an explanation."]
+        return ["Answer the message."]
+
+    def _classify_kwargs(self, request: ChatRequest, messages: list[dict[str, str]]) -> dict:
+        return {
+            "temperature": 0.0,
+            "on_complete": self._prompt_eval_recorder(request, messages),
+            "output_format": self._ollama_format(CLASSIFY_SCHEMA),
+            "model": self.classify_model,
+            "num_predict": self.classify_num_predict,
+        }
+
+    def _answer_kwargs(self, request: ChatRequest, messages: list[dict[str, str]]) -> dict:
+        return {
+            "on_complete": self._prompt_eval_recorder(request, messages),
+            "model": self.answer_model,
+            "num_predict": self.answer_num_predict,
+        }
+
+    def _answer_messages(
+        self,
+        request: ChatRequest,
+        history: list[MemoryEntry] | None,
+        prompts: list[list[dict[str, str]]],
+    ) -> list[dict[str, str]]:
+        # Single-phase mode gets here only after an embedding classifier match and has no answer prompt yet.
+        if self.two_phase:
+            return prompts[1]
+        return self._build_messages(request, history, ANSWER_SYSTEM_PROMPT)
+
+    def _classify_two_phase(
+        self,
+        request: ChatRequest,
+        history: list[MemoryEntry] | None,
+        prompts: list[list[dict[str, str]]],
+        cache_key: str | None,
+        intent: Intent | None = None,
+        semantic: SemanticLookup | None = None,
+    ) -> tuple[Intent, list[str], str | None, str | None]:
+        semantic = semantic or SemanticLookup()
+        proposed_command = None
+        if intent is None:
+            messages = prompts[0]
+            intent, proposed_command = self._parse_phase_one(
+                ollama_client.chat(messages, **self._classify_kwargs(request, messages))
+            )
+            semantic = self._semantic_match(request, history, semantic, intent)
+            if self._semantic_hit(request, semantic):
+                return semantic.classification
+        response_text = None
+        if intent != Intent.SYSTEM_TASK:
+            answer_messages = self._answer_messages(request, history, prompts)
+            response_text = ollama_client.chat(answer_messages, **self._answer_kwargs(request, answer_messages))
+        classification = (intent, self._two_phase_plan(intent, proposed_command), proposed_command, response_text)
+        self._remember_turn(request, classification[0], self._classification_content(classification))
+        if cache_key:
+            llm_response_cache.put(cache_key, ollama_client.model, self._classification_content(classification))
+        self._semantic_put(request, history, semantic, classification)
+        return classification
+
+    async def _aclassify_two_phase(
+        self,
+        request: ChatRequest,
+        history: list[MemoryEntry] | None,
+        prompts: list[list[dict[str, str]]],
+        cache_key: str | None,
+        intent: Intent | None = None,
+        semantic: SemanticLookup | None = None,
+    ) -> tuple[Intent, list[str], str | None, str | None]:
+        semantic = semantic or SemanticLookup()
+        proposed_command = None
+        if intent is None:
+            messages = prompts[0]
+            intent, proposed_command = self._parse_phase_one(
+                await ollama_client.achat(messages, **self._classify_kwargs(request, messages))
+            )
+            semantic = self._semantic_match(request, history, semantic, intent)
+            if self._semantic_hit(request, semantic):
+                return semantic.classification
+        response_text = None
+        if intent != Intent.SYSTEM_TASK:
+            answer_messages = self._answer_messages(request, history, prompts)
+            response_text = await ollama_client.achat(
+                answer_messages, **self._answer_kwargs(request, answer_messages)
+            )
+        classification = (intent, self._two_phase_plan(intent, proposed_command), proposed_command, response_text)
+        self._remember_turn(request, classification[0], self._classification_content(classification))
+        if cache_key:
+            await llm_response_cache.aput(cache_key, ollama_client.model, self._classification_content(classification))
+        self._semantic_put(request, history, semantic, classification)
+        return classification
+
+    async def _classify_two_phase_stream(
+        self,
+        request: ChatRequest,
+        history: list[MemoryEntry] | None,
+        prompts: list[list[dict[str, str]]],
+        cache_key: str | None,
+        intent: Intent | None = None,
+        semantic: SemanticLookup | None = None,
+    ) -> AsyncIterator[FieldDelta | tuple[Intent, list[str], str | None, str | None]]:
+        """
+        The short phase-one call is not streamed; the phase-two answer is streamed as plain text.
+        A known `intent` (from the embedding classifier) skips phase one.
+        """
+        semantic = semantic or SemanticLookup()
+        proposed_command = None
+        if intent is None:
+            messages = prompts[0]
+            intent, proposed_command = self._parse_phase_one(
+                await ollama_client.achat(messages, **self._classify_kwargs(request, messages))
+            )
+            semantic = self._semantic_match(request, history, semantic, intent)
+            if self._semantic_hit(request, semantic):
+                for delta in JsonFieldStreamParser(STREAMED_FIELDS).feed(
+                    self._classification_content(semantic.classification)
+                ):
+                    yield delta
+                yield semantic.classification
+                return
+        yield FieldDelta("intent", intent.value, complete=True)
+        if proposed_command:
+            yield FieldDelta("proposed_command", proposed_command, complete=True)
+        response_text = None
+        if intent != Intent.SYSTEM_TASK:
+            answer_messages = self._answer_messages(request, history, prompts)
+            chunks: list[str] = []
+            async for chunk in ollama_client.achat_stream(
+                answer_messages, **self._answer_kwargs(request, answer_messages)
+            ):
+                chunks.append(chunk)
+                yield FieldDelta("response", chunk)
+            response_text = "".join(chunks)
+        classification = (intent, self._two_phase_plan(intent, proposed_command), proposed_command, response_text)
+        self._remember_turn(request, classification[0], self._classification_content(classification))
+        if cache_key:
+            await llm_response_cache.aput(cache_key, ollama_client.model, self._classification_content(classification))
+        self._semantic_put(request, history, semantic, classification)
+        yield classification
+
+    @property
+    def _semantic_servable(self) -> bool:
+        # A cached answer is served only once the intent is known to be chat or code help,
+        # which takes the embedding classifier or phase one of two-phase mode.
+        return self.semantic_cache.enabled and (self.two_phase or self.embeddings.enabled)
+
+    def _semantic_embed(self, request: ChatRequest) -> SemanticLookup:
+        return self.semantic_cache.embed(request.message) if self._semantic_servable else SemanticLookup()
+
+    async def _semantic_aembed(self, request: ChatRequest) -> SemanticLookup:
+        return await self.semantic_cache.aembed(request.message) if self._semantic_servable else SemanticLookup()
+
+    def _semantic_match(
+        self,
+        request: ChatRequest,
+        history: list[MemoryEntry] | None,
+        semantic: SemanticLookup,
+        intent: Intent | None,
+    ) -> SemanticLookup:
+        """Looks up a cached answer for a message already classified as something other than a system task."""
+        if intent is None or intent == Intent.SYSTEM_TASK:
+            return semantic
+        context = SemanticResponseCache.history_fingerprint(history, request.cwd)
+        return self.semantic_cache.match(semantic, context, serve=not request.bypass_cache)
+
+    def _semantic_hit(self, request: ChatRequest, lookup: SemanticLookup) -> bool:
+        if lookup.classification is None:
+            return False
+        self._remember_turn(request, lookup.classification[0], self._classification_content(lookup.classification))
+        return True
+
+    def _semantic_put(
+        self,
+        request: ChatRequest,
+        history: list[MemoryEntry] | None,
+        semantic: SemanticLookup,
+        classification: tuple[Intent, list[str], str | None, str | None],
+    ) -> None:
+        context = SemanticResponseCache.history_fingerprint(history, request.cwd)
+        self.semantic_cache.put(request.message, semantic, classification, context)
+
+    def classify_intent(
+        self,
+        request: ChatRequest,
+        history: list[MemoryEntry] | None = None,
+    ) -> tuple[Intent, list[str], str | None, str | None]:
+        """
+        Classifies intent, generates a plan, and extracts structured response fields using Ollama.
+        Returns: (intent, plan, proposed_command, response_text)
+        """
+        fast_result = self.fast_path.classify(request.message)
+        if fast_result is not None:
+            self._remember_turn(request, fast_result[0], self._classification_content(fast_result))
+            return fast_result
+
+        prompts = self._build_prompts(request, history)
+        cache_key = self._cache_key(prompts)
+        if cache_key and not request.bypass_cache:
+            cached_content = llm_response_cache.get(cache_key)
+            if cached_content is not None:
+                logger.info("Serving intent classification from LLM response cache.")
+                classification = self._parse_classification(cached_content, record=False)[0]
+                self._remember_turn(request, classification[0], cached_content)
+                return classification
+
+        semantic = self._semantic_embed(request)
+        embedded_intent = self.embeddings.classify(request.message, vector=semantic.vector)
+        semantic = self._semantic_match(request, history, semantic, embedded_intent)
+        if self._semantic_hit(request, semantic):
+            return semantic.classification
+
+        try:
+            if self.two_phase or embedded_intent is not None:
+                return self._classify_two_phase(
+                    request, history, prompts, cache_key, intent=embedded_intent, semantic=semantic
+                )
+            messages = prompts[0]
+            llm_response_content = ollama_client.chat(
+                messages,
+                on_complete=self._prompt_eval_recorder(request, messages),
+                output_format=self._ollama_format(),
+            )
         except OllamaConnectionError as e:
             logger.error(f"Ollama connection error during intent classification: {e}")
             raise
         except OllamaModelUnavailableError as e:
             logger.error(f"Ollama model unavailable during intent classification: {e}")
             raise
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse LLM response as JSON: {llm_response_content}. Error: {e}")
-            return Intent.CHAT, ["Failed to parse LLM response. Please try again or rephrase your request."], None, None
         except Exception as e:
             logger.error(f"An unexpected error occurred during intent classification: {e}")
             return Intent.CHAT, ["An internal error occurred during intent classification."], None, None
 
+        classification, parsed_ok = self._parse_classification(llm_response_content)
+        if parsed_ok:
+            self._remember_turn(request, classification[0], llm_response_content)
+            if cache_key:
+                llm_response_cache.put(cache_key, ollama_client.model, llm_response_content)
+            self._semantic_put(request, history, semantic, classification)
+        return classification
+
+    async def classify_intent_async(
+        self,
+        request: ChatRequest,
+        history: list[MemoryEntry] | None = None,
+    ) -> tuple[Intent, list[str], str | None, str | None]:
+        """
+        Async counterpart of classify_intent() used by the API so the event loop
+        stays free while Ollama is generating.
+        """
+        fast_result = self.fast_path.classify(request.message)
+        if fast_result is not None:
+            self._remember_turn(request, fast_result[0], self._classification_content(fast_result))
+            return fast_result
+
+        prompts = self._build_prompts(request, history)
+        cache_key = self._cache_key(prompts)
+        if cache_key and not request.bypass_cache:
+            cached_content = await llm_response_cache.aget(cache_key)
+            if cached_content is not None:
+                logger.info("Serving intent classification from LLM response cache.")
+                classification = self._parse_classification(cached_content, record=False)[0]
+                self._remember_turn(request, classification[0], cached_content)
+                return classification
+
+        semantic = await self._semantic_aembed(request)
+        embedded_intent = await self.embeddings.aclassify(request.message, vector=semantic.vector)
+        semantic = self._semantic_match(request, history, semantic, embedded_intent)
+        if self._semantic_hit(request, semantic):
+            return semantic.classification
+
+        try:
+            if self.two_phase or embedded_intent is not None:
+                return await self._aclassify_two_phase(
+                    request, history, prompts, cache_key, intent=embedded_intent, semantic=semantic
+                )
+            messages = prompts[0]
+            llm_response_content = await ollama_client.achat(
+                messages,
+                on_complete=self._prompt_eval_recorder(request, messages),
+                output_format=self._ollama_format(),
+            )
+        except OllamaOverloadedError as e:
+            logger.warning(f"Ollama admission rejected intent classification: {e}")
+            raise
+        except OllamaConnectionError as e:
+            logger.error(f"Ollama connection error during intent classification: {e}")
+            raise
+        except OllamaModelUnavailableError as e:
+            logger.error(f"Ollama model unavailable during intent classification: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"An unexpected error occurred during intent classification: {e}")
+            return Intent.CHAT, ["An internal error occurred during intent classification."], None, None
+
+        classification, parsed_ok = self._parse_classification(llm_response_content)
+        if parsed_ok:
+            self._remember_turn(request, classification[0], llm_response_content)
+            if cache_key:
+                await llm_response_cache.aput(cache_key, ollama_client.model, llm_response_content)
+            self._semantic_put(request, history, semantic, classification)
+        return classification
+
+    async def classify_intent_stream(
+        self,
+        request: ChatRequest,
+        history: list[MemoryEntry] | None = None,
+    ) -> AsyncIterator[FieldDelta | tuple[Intent, list[str], str | None, str | None]]:
+        """
+        Streaming counterpart of classify_intent_async().
+        Yields FieldDelta items for STREAMED_FIELDS as tokens arrive, then the
+        final (intent, plan, proposed_command, response_text) tuple.
+        """
+        parser = JsonFieldStreamParser(STREAMED_FIELDS)
+        fast_result = self.fast_path.classify(request.message)
+        if fast_result is not None:
+            fast_content = self._classification_content(fast_result)
+            for delta in parser.feed(fast_content):
+                yield delta
+            self._remember_turn(request, fast_result[0], fast_content)
+            yield fast_result
+            return
+
+        prompts = self._build_prompts(request, history)
+        cache_key = self._cache_key(prompts)
+        if cache_key and not request.bypass_cache:
+            cached_content = await llm_response_cache.aget(cache_key)
+            if cached_content is not None:
+                logger.info("Serving streamed intent classification from LLM response cache.")
+                for delta in parser.feed(cached_content):
+                    yield delta
+                classification = self._parse_classification(cached_content, record=False)[0]
+                self._remember_turn(request, classification[0], cached_content)
+                yield classification
+                return
+
+        semantic = await self._semantic_aembed(request)
+        embedded_intent = await self.embeddings.aclassify(request.message, vector=semantic.vector)
+        semantic = self._semantic_match(request, history, semantic, embedded_intent)
+        if self._semantic_hit(request, semantic):
+            for delta in parser.feed(self._classification_content(semantic.classification)):
+                yield delta
+            yield semantic.classification
+            return
+
+        chunks: list[str] = []
+        try:
+            if self.two_phase or embedded_intent is not None:
+                stream = self._classify_two_phase_stream(
+                    request, history, prompts, cache_key, intent=embedded_intent, semantic=semantic
+                )
+                async for item in stream:
+                    yield item
+                return
+            messages = prompts[0]
+            async for chunk in ollama_client.achat_stream(
+                messages,
+                on_complete=self._prompt_eval_recorder(request, messages),
+                output_format=self._ollama_format(),
+            ):
+                chunks.append(chunk)
+                for delta in parser.feed(chunk):
+                    yield delta
+        except OllamaOverloadedError as e:
+            logger.warning(f"Ollama admission rejected streaming intent classification: {e}")
+            raise
+        except OllamaConnectionError as e:
+            logger.error(f"Ollama connection error during streaming intent classification: {e}")
+            raise
+        except OllamaModelUnavailableError as e:
+            logger.error(f"Ollama model unavailable during streaming intent classification: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"An unexpected error occurred during streaming intent classification: {e}")
+            yield Intent.CHAT, ["An internal error occurred during intent classification."], None, None
+            return
 
+        llm_response_content = "".join(chunks)
+        classification, parsed_ok = self._parse_classification(llm_response_content)
+        if parsed_ok:
+            self._remember_turn(request, classification[0], llm_response_content)
+            if cache_key:
+                await llm_response_cache.aput(cache_key, ollama_client.model, llm_response_content)
+            self._semantic_put(request, history, semantic, classification)
+        yield classification
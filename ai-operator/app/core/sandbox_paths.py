@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+class SandboxPathChecker:
+    """
+    Decides whether a path lies inside the sandbox root.
+
+    Paths are made absolute and normalized lexically, without touching the
+    filesystem. A path that is lexically outside the root is rejected right
+    away, so it must be spelled under the root, not reached through a symlink
+    or alias. A path lexically inside may still escape through a symlink;
+    with `resolve_symlinks` it is resolved with os.path.realpath and the
+    result is cached per path for `ttl_sec`, so a cwd that shows up in many
+    commands costs one round of syscalls per TTL.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        resolve_symlinks: bool = True,
+        max_entries: int = 4096,
+        ttl_sec: float = 30.0,
+    ):
+        self.root = os.path.normcase(os.fspath(root))
+        self._root_prefix = self.root if self.root.endswith(os.sep) else self.root + os.sep
+        self.resolve_symlinks = resolve_symlinks
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._resolved: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = Lock()
+        self._stats = {"resolve_hits": 0, "resolve_misses": 0}
+
+    def _inside(self, path: str) -> bool:
+        path = os.path.normcase(path)
+        return path == self.root or path.startswith(self._root_prefix)
+
+    def _resolve(self, path: str) -> str:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._resolved.get(path)
+            if cached is not None and cached[1] > now:
+                self._resolved.move_to_end(path)
+                self._stats["resolve_hits"] += 1
+                return cached[0]
+        resolved = os.path.realpath(path)
+        with self._lock:
+            self._stats["resolve_misses"] += 1
+            if self.max_entries > 0:
+                self._resolved[path] = (resolved, now + self.ttl_sec)
+                self._resolved.move_to_end(path)
+                while len(self._resolved) > self.max_entries:
+                    self._resolved.popitem(last=False)
+        return resolved
+
+    def contains(self, path: str | Path) -> bool:
+        """True if `path` (absolute, or relative to the process cwd) is the root or below it."""
+        normalized = os.path.abspath(os.fspath(path))
+        if not self._inside(normalized):
+            return False
+        return not self.resolve_symlinks or self._inside(self._resolve(normalized))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._resolved.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["resolved_paths"] = len(self._resolved)
+        stats["resolve_symlinks"] = self.resolve_symlinks
+        return stats
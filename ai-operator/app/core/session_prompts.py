@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from threading import Lock
+from typing import Any, Deque
+
+from app.core.memory import MemoryEntry
+from app.core.tokens import ContextBudget, estimate_message_tokens
+from app.llm.client import OllamaChatResult
+
+
+def format_user_turn(message: str, cwd: str | None = None) -> str:
+    content = f"User: {message}"
+    if cwd:
+        content += f"\nCurrent Working Directory: {cwd}"
+    return content
+
+
+def split_messages_to_budget(
+    messages: list[dict[str, str]],
+    budget: int,
+) -> tuple[list[dict[str, str]], list[dict[str, str]]]:
+    """
+    Returns (older, recent) where `recent` is the newest messages that fit in
+    `budget` tokens. `recent` always starts with a user turn, so whole
+    user/assistant pairs are kept.
+    """
+    older, recent = ContextBudget.split_recent(messages, budget, lambda message: estimate_message_tokens([message]))
+    while recent and recent[0]["role"] != "user":
+        older.append(recent.pop(0))
+    return older, recent
+
+
+class SessionPromptCache:
+    """
+    Per-session chat history, formatted exactly as it was sent to and produced by
+    the model, so every turn's prompt starts with the previous turn's prompt and
+    Ollama can reuse its KV cache for that prefix.
+
+    History only grows by appending. When a session exceeds `max_tokens`, the
+    oldest turns are dropped in one step until about half the budget is left
+    (instead of sliding a window every turn), so the prefix changes only
+    occasionally. Dropped messages are returned so they can be summarized.
+    """
+
+    def __init__(self, max_tokens: int = 1536, max_sessions: int = 1024):
+        self.max_tokens = max(1, max_tokens)
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, list[dict[str, str]]] = OrderedDict()
+        self._lock = Lock()
+        self._stats = {
+            "seeded": 0,
+            "appended_turns": 0,
+            "truncations": 0,
+            "dropped_messages": 0,
+            "evicted_sessions": 0,
+        }
+
+    def get(self, session_id: str) -> list[dict[str, str]] | None:
+        with self._lock:
+            messages = self._sessions.get(session_id)
+            if messages is None:
+                return None
+            self._sessions.move_to_end(session_id)
+            return list(messages)
+
+    def seed(
+        self,
+        session_id: str,
+        history: list[MemoryEntry],
+    ) -> tuple[list[dict[str, str]], list[dict[str, str]]]:
+        """
+        Builds a session's history from ConversationMemory when nothing is cached yet.
+        Returns (history, dropped): the newest turns that fit in half the budget, and the rest.
+        """
+        messages = [
+            {"role": "user", "content": format_user_turn(entry.content)}
+            if entry.role.lower() == "user"
+            else {"role": "assistant", "content": entry.content}
+            for entry in history
+        ]
+        with self._lock:
+            dropped = self._store(session_id, messages)
+            self._stats["seeded"] += 1
+            return list(self._sessions[session_id]), dropped
+
+    def append_turn(self, session_id: str, user_content: str, assistant_content: str) -> list[dict[str, str]]:
+        """Appends one exchange; returns the messages dropped to stay within the budget."""
+        with self._lock:
+            messages = self._sessions.get(session_id, [])
+            messages = messages + [
+                {"role": "user", "content": user_content},
+                {"role": "assistant", "content": assistant_content},
+            ]
+            self._stats["appended_turns"] += 1
+            return self._store(session_id, messages)
+
+    def clear(self, session_id: str | None = None) -> None:
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def _store(self, session_id: str, messages: list[dict[str, str]]) -> list[dict[str, str]]:
+        dropped: list[dict[str, str]] = []
+        if estimate_message_tokens(messages) > self.max_tokens:
+            dropped, messages = split_messages_to_budget(messages, self.max_tokens // 2)
+            self._stats["truncations"] += 1
+            self._stats["dropped_messages"] += len(dropped)
+        self._sessions[session_id] = messages
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self._stats["evicted_sessions"] += 1
+        return dropped
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sessions"] = len(self._sessions)
+        stats["max_tokens"] = self.max_tokens
+        return stats
+
+
+class PromptEvalStats:
+    """Aggregates Ollama's per-turn prompt evaluation counters."""
+
+    def __init__(self, recent_turns: int = 20):
+        self._lock = Lock()
+        self._recent: Deque[dict[str, Any]] = deque(maxlen=recent_turns)
+        self._totals = {
+            "turns": 0,
+            "prompt_eval_count": 0,
+            "prompt_eval_sec": 0.0,
+            "eval_count": 0,
+            "eval_sec": 0.0,
+        }
+
+    def record(self, session_id: str, history_messages: int, result: OllamaChatResult) -> dict[str, Any]:
+        turn = {
+            "session_id": session_id,
+            "history_messages": history_messages,
+            "prompt_eval_count": result.prompt_eval_count,
+            "prompt_eval_ms": None if result.prompt_eval_duration_sec is None else result.prompt_eval_duration_sec * 1000,
+            "eval_count": result.eval_count,
+            "eval_ms": None if result.eval_duration_sec is None else result.eval_duration_sec * 1000,
+        }
+        with self._lock:
+            self._recent.append(turn)
+            totals = self._totals
+            totals["turns"] += 1
+            totals["prompt_eval_count"] += result.prompt_eval_count or 0
+            totals["prompt_eval_sec"] += result.prompt_eval_duration_sec or 0.0
+            totals["eval_count"] += result.eval_count or 0
+            totals["eval_sec"] += result.eval_duration_sec or 0.0
+        return turn
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self._totals)
+            stats["recent_turns"] = list(self._recent)
+        turns = stats["turns"]
+        stats["avg_prompt_eval_count"] = stats["prompt_eval_count"] / turns if turns else 0.0
+        stats["avg_prompt_eval_ms"] = stats["prompt_eval_sec"] * 1000 / turns if turns else 0.0
+        return stats
@@ -2,30 +2,286 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 
 
+DEFAULT_SANDBOX_ROOT = r"C:\ai-sandbox"
+DEFAULT_POLICY_MODE = "strict"
+DEFAULT_POLICY_RELOAD_INTERVAL_SEC = 2.0
+DEFAULT_POLICY_DECISION_CACHE_SIZE = 4096
+DEFAULT_POLICY_CACHE_TTL_SEC = 30.0
+DEFAULT_POLICY_CHECK_MAX_ITEMS = 1000
+DEFAULT_SHELL_POOL_SIZE = 2
+DEFAULT_SHELL_POOL_MAX_COMMANDS = 100
+SHELL_POOL_SHELLS = ("auto", "powershell", "pwsh", "bash")
+DEFAULT_DATABASE_URL = "sqlite:///./ai_operator.db"
 DEFAULT_OLLAMA_BASE_URL = "http://localhost:11434"
 DEFAULT_OLLAMA_MODEL = "gpt-oss:20b"
 DEFAULT_OLLAMA_TIMEOUT_SEC = 120
 DEFAULT_OLLAMA_FALLBACK_MODEL = "llama3.1:8b"
+DEFAULT_OLLAMA_MAX_CONNECTIONS = 100
+DEFAULT_OLLAMA_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_OLLAMA_KEEPALIVE_EXPIRY_SEC = 30.0
+DEFAULT_OLLAMA_MAX_CONCURRENCY = 4
+DEFAULT_OLLAMA_MAX_QUEUE = 32
+DEFAULT_OLLAMA_INITIAL_SERVICE_TIME_SEC = 5.0
+DEFAULT_OLLAMA_DETECTION_TTL_SEC = 30.0
+DEFAULT_OLLAMA_DETECTION_RETRY_SEC = 5.0
+DEFAULT_STARTUP_DETECTION_TIMEOUT_SEC = 5.0
+DEFAULT_OLLAMA_KEEP_WARM_INTERVAL_SEC = 0.0
+DEFAULT_OLLAMA_EMBED_MODEL = "nomic-embed-text"
+DEFAULT_VECTOR_INDEX_DIR = "./vector_index"
+DEFAULT_EMBEDDING_CLASSIFIER_K = 5
+DEFAULT_EMBEDDING_CLASSIFIER_THRESHOLD = 0.8
+DEFAULT_LLM_HISTORY_TOKENS = 1536
+DEFAULT_LLM_CLASSIFY_NUM_PREDICT = 96
+DEFAULT_LLM_ANSWER_NUM_PREDICT = 1024
+LLM_OUTPUT_FORMATS = ("schema", "json", "off")
+DEFAULT_LLM_SUMMARY_MAX_TOKENS = 256
+DEFAULT_LLM_CACHE_MAX_ENTRIES = 1024
+DEFAULT_LLM_CACHE_TTL_SEC = 3600
+DEFAULT_SEMANTIC_CACHE_THRESHOLD = 0.92
+DEFAULT_SEMANTIC_CACHE_MAX_ENTRIES = 2048
+DEFAULT_SEMANTIC_CACHE_TTL_SEC = 86400
+SEMANTIC_CACHE_INTENTS = ("chat", "code_help")
+DEFAULT_MEMORY_MAX_MESSAGES = 20
+DEFAULT_MEMORY_MAX_SESSIONS = 10000
+DEFAULT_MEMORY_SESSION_TTL_SEC = 86400
+MEMORY_BACKENDS = ("memory", "sqlite")
+DEFAULT_MEMORY_FLUSH_INTERVAL_SEC = 0.5
+DEFAULT_MEMORY_FLUSH_BATCH_SIZE = 256
+DEFAULT_MEMORY_REFRESH_SEC = 2.0
+DEFAULT_MEMORY_LOCK_STRIPES = 16
 
 
 @dataclass(frozen=True)
 class Settings:
+    sandbox_root: str
+    policy_mode: str
+    policy_rules_file: str | None
+    policy_reload_interval_sec: float
+    policy_resolve_symlinks: bool
+    policy_decision_cache_size: int
+    policy_cache_ttl_sec: float
+    policy_check_max_items: int
+    shell_pool_enabled: bool
+    shell_pool_shell: str
+    shell_pool_size: int
+    shell_pool_max_commands: int
+    database_url: str
     ollama_base_url: str
+    ollama_base_urls: tuple[str, ...]
     ollama_model: str | None
     ollama_timeout_sec: int
     ollama_fallback_model: str
+    ollama_max_connections: int
+    ollama_max_keepalive_connections: int
+    ollama_keepalive_expiry_sec: float
+    ollama_single_flight: bool
+    ollama_max_concurrency: int
+    ollama_max_queue: int
+    ollama_initial_service_time_sec: float
+    ollama_detection_ttl_sec: float
+    ollama_detection_retry_sec: float
+    startup_detection_timeout_sec: float
+    ollama_keep_alive: str | None
+    ollama_warmup: bool
+    ollama_keep_warm_interval_sec: float
+    ollama_num_ctx: int | None
+    ollama_embed_model: str
+    fast_path_enabled: bool
+    embedding_classifier_enabled: bool
+    embedding_classifier_k: int
+    embedding_classifier_threshold: float
+    vector_index_dir: str
+    llm_output_format: str
+    llm_two_phase: bool
+    llm_classify_model: str | None
+    llm_classify_num_predict: int
+    llm_answer_model: str | None
+    llm_answer_num_predict: int
+    llm_session_prompting: bool
+    llm_history_tokens: int
+    llm_summary_enabled: bool
+    llm_summary_max_tokens: int
+    llm_cache_enabled: bool
+    llm_cache_persist: bool
+    llm_cache_max_entries: int
+    llm_cache_ttl_sec: int
+    semantic_cache_enabled: bool
+    semantic_cache_threshold: float
+    semantic_cache_max_entries: int
+    semantic_cache_ttl_sec: int
+    semantic_cache_intents: tuple[str, ...]
+    memory_max_messages: int
+    memory_max_sessions: int
+    memory_session_ttl_sec: int
+    memory_max_bytes: int
+    memory_backend: str
+    memory_flush_interval_sec: float
+    memory_flush_batch_size: int
+    memory_refresh_sec: float
+    memory_lock_stripes: int
+    memory_compress_min_bytes: int
 
 
-def get_settings() -> Settings:
+def _get_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+@lru_cache(maxsize=None)
+def load_environment() -> None:
+    """Loads .env into os.environ once per process; existing variables win."""
     load_dotenv()
+
+
+def get_settings() -> Settings:
+    load_environment()
     model_env = os.getenv("OLLAMA_MODEL", DEFAULT_OLLAMA_MODEL)
     model_env = model_env.strip() if model_env else None
+    keep_alive_env = os.getenv("OLLAMA_KEEP_ALIVE", "").strip()
+    num_ctx_env = os.getenv("OLLAMA_NUM_CTX", "").strip()
+    output_format = os.getenv("LLM_OUTPUT_FORMAT", "schema").strip().lower()
+    classify_model_env = os.getenv("LLM_CLASSIFY_MODEL", "").strip()
+    answer_model_env = os.getenv("LLM_ANSWER_MODEL", "").strip()
+    memory_backend = os.getenv("MEMORY_BACKEND", "memory").strip().lower()
+    policy_rules_file = os.getenv("POLICY_RULES_FILE", "").strip()
+    shell_pool_shell = os.getenv("SHELL_POOL_SHELL", "auto").strip().lower()
+    base_url = os.getenv("OLLAMA_BASE_URL", DEFAULT_OLLAMA_BASE_URL)
+    # OLLAMA_BASE_URLS (comma-separated) spreads requests over several Ollama servers.
+    base_urls = tuple(url.strip() for url in os.getenv("OLLAMA_BASE_URLS", "").split(",") if url.strip())
     return Settings(
-        ollama_base_url=os.getenv("OLLAMA_BASE_URL", DEFAULT_OLLAMA_BASE_URL),
+        sandbox_root=os.getenv("SANDBOX_ROOT", DEFAULT_SANDBOX_ROOT),
+        policy_mode=os.getenv("AI_OPERATOR_POLICY_MODE", DEFAULT_POLICY_MODE).strip().lower(),
+        policy_rules_file=policy_rules_file or None,
+        policy_reload_interval_sec=float(
+            os.getenv("POLICY_RELOAD_INTERVAL_SEC", str(DEFAULT_POLICY_RELOAD_INTERVAL_SEC))
+        ),
+        policy_resolve_symlinks=_get_bool("POLICY_RESOLVE_SYMLINKS", True),
+        policy_decision_cache_size=int(
+            os.getenv("POLICY_DECISION_CACHE_SIZE", str(DEFAULT_POLICY_DECISION_CACHE_SIZE))
+        ),
+        policy_cache_ttl_sec=float(os.getenv("POLICY_CACHE_TTL_SEC", str(DEFAULT_POLICY_CACHE_TTL_SEC))),
+        policy_check_max_items=int(
+            os.getenv("POLICY_CHECK_MAX_ITEMS", str(DEFAULT_POLICY_CHECK_MAX_ITEMS))
+        ),
+        shell_pool_enabled=_get_bool("SHELL_POOL_ENABLED", False),
+        shell_pool_shell=shell_pool_shell if shell_pool_shell in SHELL_POOL_SHELLS else "auto",
+        shell_pool_size=int(os.getenv("SHELL_POOL_SIZE", str(DEFAULT_SHELL_POOL_SIZE))),
+        shell_pool_max_commands=int(
+            os.getenv("SHELL_POOL_MAX_COMMANDS", str(DEFAULT_SHELL_POOL_MAX_COMMANDS))
+        ),
+        database_url=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL),
+        ollama_base_url=base_urls[0] if base_urls else base_url,
+        ollama_base_urls=base_urls or (base_url,),
         ollama_model=model_env or None,
         ollama_timeout_sec=int(os.getenv("OLLAMA_TIMEOUT_SEC", str(DEFAULT_OLLAMA_TIMEOUT_SEC))),
         ollama_fallback_model=os.getenv("OLLAMA_FALLBACK_MODEL", DEFAULT_OLLAMA_FALLBACK_MODEL),
+        ollama_max_connections=int(
+            os.getenv("OLLAMA_MAX_CONNECTIONS", str(DEFAULT_OLLAMA_MAX_CONNECTIONS))
+        ),
+        ollama_max_keepalive_connections=int(
+            os.getenv("OLLAMA_MAX_KEEPALIVE_CONNECTIONS", str(DEFAULT_OLLAMA_MAX_KEEPALIVE_CONNECTIONS))
+        ),
+        ollama_keepalive_expiry_sec=float(
+            os.getenv("OLLAMA_KEEPALIVE_EXPIRY_SEC", str(DEFAULT_OLLAMA_KEEPALIVE_EXPIRY_SEC))
+        ),
+        ollama_single_flight=_get_bool("OLLAMA_SINGLE_FLIGHT", True),
+        ollama_max_concurrency=int(
+            os.getenv("OLLAMA_MAX_CONCURRENCY", str(DEFAULT_OLLAMA_MAX_CONCURRENCY))
+        ),
+        ollama_max_queue=int(os.getenv("OLLAMA_MAX_QUEUE", str(DEFAULT_OLLAMA_MAX_QUEUE))),
+        ollama_initial_service_time_sec=float(
+            os.getenv("OLLAMA_INITIAL_SERVICE_TIME_SEC", str(DEFAULT_OLLAMA_INITIAL_SERVICE_TIME_SEC))
+        ),
+        ollama_detection_ttl_sec=float(
+            os.getenv("OLLAMA_DETECTION_TTL_SEC", str(DEFAULT_OLLAMA_DETECTION_TTL_SEC))
+        ),
+        ollama_detection_retry_sec=float(
+            os.getenv("OLLAMA_DETECTION_RETRY_SEC", str(DEFAULT_OLLAMA_DETECTION_RETRY_SEC))
+        ),
+        startup_detection_timeout_sec=float(
+            os.getenv("STARTUP_DETECTION_TIMEOUT_SEC", str(DEFAULT_STARTUP_DETECTION_TIMEOUT_SEC))
+        ),
+        ollama_keep_alive=keep_alive_env or None,
+        ollama_warmup=_get_bool("OLLAMA_WARMUP", False),
+        ollama_keep_warm_interval_sec=float(
+            os.getenv("OLLAMA_KEEP_WARM_INTERVAL_SEC", str(DEFAULT_OLLAMA_KEEP_WARM_INTERVAL_SEC))
+        ),
+        ollama_num_ctx=int(num_ctx_env) if num_ctx_env else None,
+        ollama_embed_model=os.getenv("OLLAMA_EMBED_MODEL", DEFAULT_OLLAMA_EMBED_MODEL),
+        fast_path_enabled=_get_bool("FAST_PATH_ENABLED", True),
+        embedding_classifier_enabled=_get_bool("EMBEDDING_CLASSIFIER_ENABLED", False),
+        embedding_classifier_k=int(
+            os.getenv("EMBEDDING_CLASSIFIER_K", str(DEFAULT_EMBEDDING_CLASSIFIER_K))
+        ),
+        embedding_classifier_threshold=float(
+            os.getenv("EMBEDDING_CLASSIFIER_THRESHOLD", str(DEFAULT_EMBEDDING_CLASSIFIER_THRESHOLD))
+        ),
+        vector_index_dir=os.getenv("VECTOR_INDEX_DIR", DEFAULT_VECTOR_INDEX_DIR),
+        # "schema" constrains replies to the classification schema, "json" to any JSON object (older Ollama).
+        llm_output_format=output_format if output_format in LLM_OUTPUT_FORMATS else "schema",
+        llm_two_phase=_get_bool("LLM_TWO_PHASE", False),
+        llm_classify_model=classify_model_env or None,
+        llm_classify_num_predict=int(
+            os.getenv("LLM_CLASSIFY_NUM_PREDICT", str(DEFAULT_LLM_CLASSIFY_NUM_PREDICT))
+        ),
+        llm_answer_model=answer_model_env or None,
+        llm_answer_num_predict=int(
+            os.getenv("LLM_ANSWER_NUM_PREDICT", str(DEFAULT_LLM_ANSWER_NUM_PREDICT))
+        ),
+        llm_session_prompting=_get_bool("LLM_SESSION_PROMPTING", False),
+        llm_history_tokens=int(os.getenv("LLM_HISTORY_TOKENS", str(DEFAULT_LLM_HISTORY_TOKENS))),
+        llm_summary_enabled=_get_bool("LLM_SUMMARY_ENABLED", True),
+        llm_summary_max_tokens=int(
+            os.getenv("LLM_SUMMARY_MAX_TOKENS", str(DEFAULT_LLM_SUMMARY_MAX_TOKENS))
+        ),
+        llm_cache_enabled=_get_bool("LLM_CACHE_ENABLED", True),
+        llm_cache_persist=_get_bool("LLM_CACHE_PERSIST", True),
+        llm_cache_max_entries=int(
+            os.getenv("LLM_CACHE_MAX_ENTRIES", str(DEFAULT_LLM_CACHE_MAX_ENTRIES))
+        ),
+        llm_cache_ttl_sec=int(os.getenv("LLM_CACHE_TTL_SEC", str(DEFAULT_LLM_CACHE_TTL_SEC))),
+        semantic_cache_enabled=_get_bool("SEMANTIC_CACHE_ENABLED", False),
+        semantic_cache_threshold=float(
+            os.getenv("SEMANTIC_CACHE_THRESHOLD", str(DEFAULT_SEMANTIC_CACHE_THRESHOLD))
+        ),
+        semantic_cache_max_entries=int(
+            os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", str(DEFAULT_SEMANTIC_CACHE_MAX_ENTRIES))
+        ),
+        semantic_cache_ttl_sec=int(
+            os.getenv("SEMANTIC_CACHE_TTL_SEC", str(DEFAULT_SEMANTIC_CACHE_TTL_SEC))
+        ),
+        # system_task is never cached, so only chat and code_help are accepted here.
+        semantic_cache_intents=tuple(
+            intent
+            for intent in (
+                value.strip().lower()
+                for value in os.getenv("SEMANTIC_CACHE_INTENTS", ",".join(SEMANTIC_CACHE_INTENTS)).split(",")
+            )
+            if intent in SEMANTIC_CACHE_INTENTS
+        ),
+        memory_max_messages=int(os.getenv("MEMORY_MAX_MESSAGES", str(DEFAULT_MEMORY_MAX_MESSAGES))),
+        memory_max_sessions=int(os.getenv("MEMORY_MAX_SESSIONS", str(DEFAULT_MEMORY_MAX_SESSIONS))),
+        # 0 disables the idle TTL / the byte budget.
+        memory_session_ttl_sec=int(
+            os.getenv("MEMORY_SESSION_TTL_SEC", str(DEFAULT_MEMORY_SESSION_TTL_SEC))
+        ),
+        memory_max_bytes=int(os.getenv("MEMORY_MAX_BYTES", "0")),
+        memory_backend=memory_backend if memory_backend in MEMORY_BACKENDS else "memory",
+        memory_flush_interval_sec=float(
+            os.getenv("MEMORY_FLUSH_INTERVAL_SEC", str(DEFAULT_MEMORY_FLUSH_INTERVAL_SEC))
+        ),
+        memory_flush_batch_size=int(
+            os.getenv("MEMORY_FLUSH_BATCH_SIZE", str(DEFAULT_MEMORY_FLUSH_BATCH_SIZE))
+        ),
+        # 0 reads a stored session again on every request.
+        memory_refresh_sec=float(os.getenv("MEMORY_REFRESH_SEC", str(DEFAULT_MEMORY_REFRESH_SEC))),
+        memory_lock_stripes=int(os.getenv("MEMORY_LOCK_STRIPES", str(DEFAULT_MEMORY_LOCK_STRIPES))),
+        # 0 keeps every message as plain text.
+        memory_compress_min_bytes=int(os.getenv("MEMORY_COMPRESS_MIN_BYTES", "0")),
     )
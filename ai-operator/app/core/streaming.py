@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable
+
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+@dataclass(frozen=True)
+class FieldDelta:
+    field: str
+    text: str
+    complete: bool = False
+
+
+class JsonFieldStreamParser:
+    """
+    Incrementally extracts top-level string fields from a JSON object that
+    arrives in arbitrary chunks (e.g. streamed LLM tokens).
+
+    Text before the first '{' (such as a Markdown code fence) is ignored.
+    Only string values of the requested fields are decoded; everything else
+    is skipped. Escape sequences split across chunks are handled.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = frozenset(fields)
+        self.values: dict[str, str] = {}
+        self.completed: set[str] = set()
+        self._depth = 0
+        self._finished = False
+        self._in_string = False
+        self._string_is_key = False
+        self._after_colon = False
+        self._escape = False
+        self._unicode_digits: str | None = None
+        self._high_surrogate: int | None = None
+        self._key_chars: list[str] = []
+        self._last_key: str | None = None
+        self._capture_field: str | None = None
+
+    @property
+    def finished(self) -> bool:
+        """True once the top-level object has been closed."""
+        return self._finished
+
+    def feed(self, chunk: str) -> list[FieldDelta]:
+        """Consumes a chunk and returns newly decoded text per captured field."""
+        pending: dict[str, list[str]] = {}
+        completed_before = set(self.completed)
+        for char in chunk:
+            if self._finished:
+                break
+            if self._in_string:
+                field = self._capture_field
+                decoded = self._consume_string_char(char)
+                if field is not None:
+                    parts = pending.setdefault(field, [])
+                    if decoded:
+                        parts.append(decoded)
+            else:
+                self._consume_structural_char(char)
+
+        deltas = []
+        for field, parts in pending.items():
+            text = "".join(parts)
+            complete = field in self.completed and field not in completed_before
+            if not text and not complete:
+                continue
+            self.values[field] = self.values.get(field, "") + text
+            deltas.append(FieldDelta(field=field, text=text, complete=complete))
+        return deltas
+
+    def _consume_structural_char(self, char: str) -> None:
+        if char == '"':
+            if self._depth != 1:
+                self._start_string(is_key=False, capture=None)
+            elif self._after_colon:
+                capture = self._last_key if self._last_key in self.fields else None
+                self._start_string(is_key=False, capture=capture)
+            else:
+                self._start_string(is_key=True, capture=None)
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]":
+            if self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finished = True
+        elif self._depth == 1:
+            if char == ":":
+                self._after_colon = True
+            elif char == ",":
+                self._after_colon = False
+
+    def _start_string(self, is_key: bool, capture: str | None) -> None:
+        self._in_string = True
+        self._string_is_key = is_key
+        self._capture_field = capture
+        self._key_chars = []
+        if capture is not None:
+            self.values.setdefault(capture, "")
+
+    def _end_string(self) -> None:
+        self._in_string = False
+        if self._string_is_key:
+            self._last_key = "".join(self._key_chars)
+        elif self._capture_field is not None:
+            self.completed.add(self._capture_field)
+        self._capture_field = None
+
+    def _consume_string_char(self, char: str) -> str:
+        if self._unicode_digits is not None:
+            self._unicode_digits += char
+            if len(self._unicode_digits) < 4:
+                return ""
+            code_point = int(self._unicode_digits, 16)
+            self._unicode_digits = None
+            return self._emit(self._decode_code_point(code_point))
+
+        if self._escape:
+            self._escape = False
+            if char == "u":
+                self._unicode_digits = ""
+                return ""
+            return self._emit(_SIMPLE_ESCAPES.get(char, char))
+
+        if char == "\\":
+            self._escape = True
+            return ""
+        if char == '"':
+            self._end_string()
+            return ""
+        return self._emit(char)
+
+    def _decode_code_point(self, code_point: int) -> str:
+        if 0xD800 <= code_point <= 0xDBFF:
+            self._high_surrogate = code_point
+            return ""
+        if 0xDC00 <= code_point <= 0xDFFF and self._high_surrogate is not None:
+            combined = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code_point - 0xDC00)
+            self._high_surrogate = None
+            return chr(combined)
+        return chr(code_point)
+
+    def _emit(self, text: str) -> str:
+        if self._string_is_key:
+            self._key_chars.append(text)
+            return ""
+        return text
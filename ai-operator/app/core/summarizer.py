@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from app.core.settings import get_settings
+from app.core.tokens import estimate_tokens
+from app.llm.client import OllamaClient, ollama_client
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and IRIS, a local AI operator. "
+    "Merge the new turns into the current summary. Keep facts, decisions, file names, commands and open "
+    "questions; drop greetings and repetition. Write plain text in the user's language, at most {max_words} words."
+)
+# Turns waiting per session; older ones are dropped if Ollama stays busy or down for long.
+MAX_PENDING_TURNS = 40
+# Wait between checks for free Ollama capacity, and before retrying a failed summary.
+IDLE_POLL_SEC = 0.5
+RETRY_AFTER_FAILURE_SEC = 5.0
+
+Turn = tuple[str, str]
+
+
+def _fingerprint(role: str, content: str) -> str:
+    return hashlib.sha1(f"{role}\0{content}".encode("utf-8")).hexdigest()
+
+
+class ConversationSummarizer:
+    """
+    Rolling per-session summary of the turns that no longer fit in the prompt.
+
+    fold() only queues turns and returns immediately. A background task merges
+    queued turns into the session's summary with one Ollama call per session,
+    and only when admission control has a free slot and nobody waiting, so it
+    never delays user requests.
+    """
+
+    def __init__(
+        self,
+        client: OllamaClient,
+        enabled: bool = True,
+        max_summary_tokens: int = 256,
+        max_sessions: int = 1024,
+    ):
+        self.client = client
+        self.enabled = enabled
+        self.max_summary_tokens = max_summary_tokens
+        self.max_sessions = max_sessions
+        self._lock = Lock()
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+        self._pending: OrderedDict[str, list[Turn]] = OrderedDict()
+        # Turns already summarized or queued, so re-sent overflow is not folded twice.
+        self._seen: dict[str, OrderedDict[str, None]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stats = {"folded_turns": 0, "summaries": 0, "failures": 0, "dropped_turns": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running or not self.enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run(), name="conversation-summarizer")
+        if self._pending:
+            self._wake.set()
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def get(self, session_id: str) -> str | None:
+        with self._lock:
+            return self._summaries.get(session_id)
+
+    def fold(self, session_id: str, turns: list[Turn]) -> None:
+        """Queues turns that dropped out of the prompt for summarization. Safe to call from any thread."""
+        if not self.enabled or not turns:
+            return
+        with self._lock:
+            seen = self._seen.setdefault(session_id, OrderedDict())
+            new_turns = []
+            for role, content in turns:
+                key = _fingerprint(role, content)
+                if key in seen:
+                    continue
+                seen[key] = None
+                new_turns.append((role, content))
+            while len(seen) > MAX_PENDING_TURNS * 4:
+                seen.popitem(last=False)
+            if not new_turns:
+                return
+            pending = self._pending.setdefault(session_id, [])
+            pending.extend(new_turns)
+            if len(pending) > MAX_PENDING_TURNS:
+                self._stats["dropped_turns"] += len(pending) - MAX_PENDING_TURNS
+                del pending[:-MAX_PENDING_TURNS]
+            self._stats["folded_turns"] += len(new_turns)
+        self._request_run()
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._summaries.pop(session_id, None)
+            self._pending.pop(session_id, None)
+            self._seen.pop(session_id, None)
+
+    def _request_run(self) -> None:
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None or loop.is_closed() or not self.running:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is loop:
+            wake.set()
+        else:
+            loop.call_soon_threadsafe(wake.set)
+
+    def _next_job(self) -> tuple[str, list[Turn], str | None] | None:
+        with self._lock:
+            if not self._pending:
+                return None
+            session_id, turns = self._pending.popitem(last=False)
+            return session_id, turns, self._summaries.get(session_id)
+
+    def _requeue(self, session_id: str, turns: list[Turn]) -> None:
+        """Puts the turns of a failed summary back at the front of the queue."""
+        with self._lock:
+            self._stats["failures"] += 1
+            pending = self._pending.setdefault(session_id, [])
+            pending[:0] = turns
+            self._pending.move_to_end(session_id, last=False)
+
+    def build_summary_messages(self, current_summary: str | None, turns: list[Turn]) -> list[dict[str, str]]:
+        lines = "\n".join(f"{'User' if role == 'user' else 'Assistant'}: {content}" for role, content in turns)
+        max_words = max(20, self.max_summary_tokens * 3 // 4)
+        return [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT.format(max_words=max_words)},
+            {
+                "role": "user",
+                "content": f"Current summary:\n{current_summary or '(none)'}\n\nNew turns:\n{lines}",
+            },
+        ]
+
+    def _clip(self, summary: str) -> str:
+        summary = summary.strip()
+        if estimate_tokens(summary) <= self.max_summary_tokens:
+            return summary
+        # Trim on a UTF-8 boundary to the token budget (about 4 bytes per token).
+        return summary.encode("utf-8")[: self.max_summary_tokens * 4].decode("utf-8", errors="ignore").rstrip()
+
+    async def _wait_for_idle_capacity(self) -> None:
+        while not self.client.admission.has_idle_capacity():
+            await asyncio.sleep(IDLE_POLL_SEC)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while (job := self._next_job()) is not None:
+                session_id, turns, current_summary = job
+                await self._wait_for_idle_capacity()
+                try:
+                    summary = await self.client.achat(
+                        self.build_summary_messages(current_summary, turns), temperature=0.0
+                    )
+                except Exception as e:
+                    logger.warning(f"Conversation summary for session '{session_id}' failed: {e}")
+                    self._requeue(session_id, turns)
+                    await asyncio.sleep(RETRY_AFTER_FAILURE_SEC)
+                    continue
+                with self._lock:
+                    self._summaries[session_id] = self._clip(summary)
+                    self._summaries.move_to_end(session_id)
+                    while len(self._summaries) > self.max_sessions:
+                        evicted, _ = self._summaries.popitem(last=False)
+                        self._seen.pop(evicted, None)
+                    self._stats["summaries"] += 1
+                logger.info(f"Updated conversation summary for session '{session_id}' ({len(turns)} turns folded).")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sessions"] = len(self._summaries)
+            stats["pending_turns"] = sum(len(turns) for turns in self._pending.values())
+        stats["enabled"] = self.enabled
+        stats["running"] = self.running
+        return stats
+
+
+def _build_default_summarizer() -> ConversationSummarizer:
+    settings = get_settings()
+    return ConversationSummarizer(
+        ollama_client,
+        enabled=settings.llm_summary_enabled,
+        max_summary_tokens=settings.llm_summary_max_tokens,
+    )
+
+
+conversation_summarizer = _build_default_summarizer()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Callable, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# Rough per-message overhead of the chat template (role markers, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+# Assumed context window when OLLAMA_NUM_CTX is not set (Ollama's default).
+DEFAULT_NUM_CTX = 4096
+# Room kept free for the generated reply.
+RESPONSE_RESERVE_TOKENS = 1024
+
+
+def estimate_tokens(text: str | None) -> int:
+    """
+    Cheap local token estimate: about 4 UTF-8 bytes per token. Close enough for
+    English and code, and it does not undercount Hangul (3 bytes per syllable).
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text.encode("utf-8")) / 4)
+
+
+def estimate_message_tokens(messages: Sequence[dict[str, str]]) -> int:
+    return sum(estimate_tokens(message.get("content")) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+@dataclass(frozen=True)
+class ContextBudget:
+    """
+    Splits the model's context window: the prompt's fixed parts (system prompt,
+    summary, current message) come first, the reply reserve is kept free, and
+    history gets at most `history_tokens` of what is left.
+    """
+    num_ctx: int = DEFAULT_NUM_CTX
+    history_tokens: int = 1536
+    response_reserve_tokens: int = RESPONSE_RESERVE_TOKENS
+
+    def history_budget(self, fixed_tokens: int) -> int:
+        available = self.num_ctx - self.response_reserve_tokens - fixed_tokens
+        return max(0, min(self.history_tokens, available))
+
+    @staticmethod
+    def split_recent(
+        items: Sequence[T],
+        budget: int,
+        cost: Callable[[T], int],
+    ) -> tuple[list[T], list[T]]:
+        """Returns (older, recent): the newest items that fit in `budget`, and everything before them."""
+        used = 0
+        start = len(items)
+        while start > 0:
+            item_cost = cost(items[start - 1])
+            if used + item_cost > budget:
+                break
+            used += item_cost
+            start -= 1
+        return list(items[:start]), list(items[start:])
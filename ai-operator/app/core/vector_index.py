@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+META_FILE = "meta.json"
+
+
+def normalize(vectors: Sequence[Sequence[float]] | np.ndarray) -> np.ndarray:
+    """Row-normalizes to unit length (float32) so a dot product is the cosine similarity."""
+    array = np.asarray(vectors, dtype=np.float32)
+    if array.ndim == 1:
+        array = array[np.newaxis, :]
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return array / norms
+
+
+class VectorIndex:
+    """
+    Exact nearest-neighbour index over unit vectors with one label per row.
+
+    Vectors live in a single float32 matrix; a query is one matrix-vector
+    product. The index is saved as `vectors.npy` plus `meta.json` and loaded
+    with mmap, so startup does not copy the matrix into memory.
+    """
+
+    def __init__(self, vectors: np.ndarray, labels: Sequence[str], meta: dict[str, Any] | None = None):
+        if len(vectors) != len(labels):
+            raise ValueError("Each vector needs exactly one label.")
+        self.vectors = vectors
+        self.labels = list(labels)
+        self.meta = dict(meta or {})
+
+    @classmethod
+    def build(
+        cls,
+        vectors: Sequence[Sequence[float]],
+        labels: Sequence[str],
+        meta: dict[str, Any] | None = None,
+    ) -> VectorIndex:
+        return cls(normalize(vectors), labels, meta)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @property
+    def dim(self) -> int:
+        return int(self.vectors.shape[1]) if len(self) else 0
+
+    def search(self, query: Sequence[float] | np.ndarray, k: int) -> list[tuple[str, float]]:
+        """Returns up to k (label, cosine similarity) pairs, most similar first."""
+        if not len(self):
+            return []
+        scores = self.vectors @ normalize(query)[0]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.labels[i], float(scores[i])) for i in top]
+
+    def save(self, directory: str | Path) -> None:
+        """Writes both files via temporary names and os.replace, so readers never see a partial index."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        vectors_tmp = directory / f"{VECTORS_FILE}.tmp"
+        meta_tmp = directory / f"{META_FILE}.tmp"
+        with open(vectors_tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32))
+        meta_tmp.write_text(json.dumps({**self.meta, "labels": self.labels}, ensure_ascii=False), encoding="utf-8")
+        os.replace(vectors_tmp, directory / VECTORS_FILE)
+        os.replace(meta_tmp, directory / META_FILE)
+
+    @classmethod
+    def load(cls, directory: str | Path) -> VectorIndex | None:
+        """Memory-maps a saved index; returns None if it is missing or unreadable."""
+        directory = Path(directory)
+        try:
+            meta = json.loads((directory / META_FILE).read_text(encoding="utf-8"))
+            vectors = np.load(directory / VECTORS_FILE, mmap_mode="r")
+            labels = meta.pop("labels")
+            return cls(vectors, labels, meta)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable vector index in '{directory}': {e}")
+            return None
+
+
+class BoundedVectorStore:
+    """
+    Fixed-capacity vector store for caches: one preallocated float32 matrix
+    whose rows are reused. When full, the least recently used row is evicted;
+    rows older than `ttl_sec` are skipped and freed on the next search.
+    """
+
+    def __init__(self, capacity: int = 2048, ttl_sec: float | None = None):
+        self.capacity = max(1, capacity)
+        self.ttl_sec = ttl_sec
+        self._vectors: np.ndarray | None = None
+        self._payloads: list[Any] = [None] * self.capacity
+        self._live = np.zeros(self.capacity, dtype=bool)
+        self._stored_at = np.zeros(self.capacity, dtype=np.float64)
+        self._used_at = np.zeros(self.capacity, dtype=np.float64)
+        self._lock = Lock()
+        self._stats = {"evictions": 0, "expirations": 0, "resets": 0}
+
+    def __len__(self) -> int:
+        return int(self._live.sum())
+
+    def _expire(self, now: float) -> None:
+        if self.ttl_sec is None:
+            return
+        expired = self._live & (now - self._stored_at > self.ttl_sec)
+        count = int(expired.sum())
+        if count:
+            self._live[expired] = False
+            for row in np.flatnonzero(expired):
+                self._payloads[row] = None
+            self._stats["expirations"] += count
+
+    def search(
+        self,
+        query: Sequence[float] | np.ndarray,
+        accept: Callable[[Any], bool] | None = None,
+        candidates: int = 5,
+    ) -> tuple[int, float, Any] | None:
+        """
+        Best live row as (row, cosine similarity, payload), considering the
+        `candidates` most similar rows and skipping payloads `accept` rejects.
+        """
+        query = normalize(query)[0]
+        with self._lock:
+            self._expire(time.monotonic())
+            if self._vectors is None or not self._live.any() or self._vectors.shape[1] != len(query):
+                return None
+            scores = np.where(self._live, self._vectors @ query, -np.inf)
+            count = min(candidates, int(self._live.sum()))
+            top = np.argpartition(-scores, count - 1)[:count]
+            for row in top[np.argsort(-scores[top])]:
+                payload = self._payloads[row]
+                if accept is None or accept(payload):
+                    return int(row), float(scores[row]), payload
+        return None
+
+    def touch(self, row: int) -> None:
+        with self._lock:
+            self._used_at[row] = time.monotonic()
+
+    def add(self, vector: Sequence[float] | np.ndarray, payload: Any, row: int | None = None) -> int:
+        """Stores a vector, overwriting `row` if given, else a free or the least recently used row."""
+        vector = normalize(vector)[0]
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(vector):
+                # A different embedding size means a different model; old rows are not comparable.
+                if self._vectors is not None:
+                    self._stats["resets"] += 1
+                self._vectors = np.zeros((self.capacity, len(vector)), dtype=np.float32)
+                self._live[:] = False
+                self._payloads = [None] * self.capacity
+                row = None
+            if row is None:
+                free = np.flatnonzero(~self._live)
+                if len(free):
+                    row = int(free[0])
+                else:
+                    row = int(np.argmin(self._used_at))
+                    self._stats["evictions"] += 1
+            now = time.monotonic()
+            self._vectors[row] = vector
+            self._payloads[row] = payload
+            self._live[row] = True
+            self._stored_at[row] = now
+            self._used_at[row] = now
+            return row
+
+    def clear(self) -> None:
+        with self._lock:
+            self._live[:] = False
+            self._payloads = [None] * self.capacity
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = int(self._live.sum())
+        stats["capacity"] = self.capacity
+        return stats
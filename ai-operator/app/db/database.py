@@ -1,13 +1,11 @@
-import os
 from sqlalchemy import create_engine, Column, String, DateTime, Integer, Boolean, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 from datetime import datetime
 
-load_dotenv()
+from app.core.settings import get_settings
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ai_operator.db")
+DATABASE_URL = get_settings().database_url
 
 engine = create_engine(
     DATABASE_URL, connect_args={"check_same_thread": False}
@@ -40,6 +38,23 @@ class RunORM(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
+class LLMCacheORM(Base):
+    __tablename__ = "llm_cache"
+    key = Column(String, primary_key=True, index=True)
+    model = Column(String, index=True, nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ConversationMessageORM(Base):
+    __tablename__ = "conversation_messages"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String, index=True, nullable=False)
+    role = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 def get_db():
     db = SessionLocal()
     try:
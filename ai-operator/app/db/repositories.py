@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
-from app.db.database import ApprovalORM, RunORM
+from datetime import datetime
+from app.db.database import ApprovalORM, ConversationMessageORM, LLMCacheORM, RunORM
 from app.models.schemas import Approval, Run, ApprovalStatus
 
 class ApprovalRepository:
@@ -37,3 +38,85 @@ class RunRepository:
 
     def get_run(self, run_id: str) -> RunORM | None:
         return self.db.query(RunORM).filter(RunORM.id == run_id).first()
+
+class LLMCacheRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_entry(self, key: str) -> LLMCacheORM | None:
+        return self.db.query(LLMCacheORM).filter(LLMCacheORM.key == key).first()
+
+    def upsert_entry(self, key: str, model: str, content: str) -> LLMCacheORM:
+        db_entry = self.get_entry(key)
+        if db_entry:
+            db_entry.model = model
+            db_entry.content = content
+            db_entry.created_at = datetime.utcnow()
+        else:
+            db_entry = LLMCacheORM(key=key, model=model, content=content)
+            self.db.add(db_entry)
+        self.db.commit()
+        return db_entry
+
+    def delete_entry(self, key: str) -> None:
+        self.db.query(LLMCacheORM).filter(LLMCacheORM.key == key).delete()
+        self.db.commit()
+
+    def delete_other_models(self, model: str) -> int:
+        deleted = self.db.query(LLMCacheORM).filter(LLMCacheORM.model != model).delete()
+        self.db.commit()
+        return deleted
+
+    def delete_all(self) -> int:
+        deleted = self.db.query(LLMCacheORM).delete()
+        self.db.commit()
+        return deleted
+
+class ConversationMessageRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add_messages(self, rows: list[tuple[str, str, str]], keep_per_session: int) -> None:
+        """Inserts (session_id, role, content) rows and trims each touched session, in one transaction."""
+        self.db.add_all(
+            ConversationMessageORM(session_id=session_id, role=role, content=content)
+            for session_id, role, content in rows
+        )
+        self.db.flush()
+        for session_id in {session_id for session_id, _, _ in rows}:
+            keep_ids = (
+                self.db.query(ConversationMessageORM.id)
+                .filter(ConversationMessageORM.session_id == session_id)
+                .order_by(ConversationMessageORM.id.desc())
+                .limit(keep_per_session)
+            )
+            self.db.query(ConversationMessageORM).filter(
+                ConversationMessageORM.session_id == session_id,
+                ConversationMessageORM.id.not_in(keep_ids.scalar_subquery()),
+            ).delete(synchronize_session=False)
+        self.db.commit()
+
+    def get_recent(self, session_id: str, limit: int) -> list[ConversationMessageORM]:
+        rows = (
+            self.db.query(ConversationMessageORM)
+            .filter(ConversationMessageORM.session_id == session_id)
+            .order_by(ConversationMessageORM.id.desc())
+            .limit(limit)
+            .all()
+        )
+        return rows[::-1]
+
+    def delete_idle_sessions(self, cutoff: datetime) -> int:
+        """Deletes every session whose newest message is older than `cutoff`."""
+        active = (
+            self.db.query(ConversationMessageORM.session_id)
+            .filter(ConversationMessageORM.created_at >= cutoff)
+            .distinct()
+        )
+        deleted = (
+            self.db.query(ConversationMessageORM)
+            .filter(ConversationMessageORM.session_id.not_in(active.scalar_subquery()))
+            .delete(synchronize_session=False)
+        )
+        self.db.commit()
+        return deleted
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the moving average of upstream service time.
+SERVICE_TIME_EWMA_ALPHA = 0.2
+
+
+class OllamaOverloadedError(Exception):
+    """Raised when a request is not admitted to Ollama (queue full or deadline unreachable)."""
+
+    def __init__(self, message: str, retry_after_sec: float):
+        super().__init__(message)
+        self.retry_after_sec = retry_after_sec
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after_sec)))
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded FIFO wait queue in front of Ollama.
+
+    At most `max_concurrency` requests run upstream at once; up to `max_queue`
+    more may wait. A request is rejected when the queue is full, or when the
+    estimated queue wait plus one service time would overrun its deadline.
+    Queued requests are dropped once they can no longer finish in time.
+    `max_concurrency <= 0` disables admission control.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_queue: int = 32,
+        initial_service_time_sec: float = 5.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._service_time_sec = initial_service_time_sec
+        self._active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._stats = {
+            "admitted": 0,
+            "queued": 0,
+            "completed": 0,
+            "rejected_queue_full": 0,
+            "rejected_deadline": 0,
+            "dropped_deadline": 0,
+            "max_queue_depth": 0,
+            "total_wait_sec": 0.0,
+            "max_wait_sec": 0.0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def has_idle_capacity(self) -> bool:
+        """True when a new request would start right away without queueing."""
+        return not self.enabled or (self._active < self.max_concurrency and not self._waiters)
+
+    def estimate_wait_sec(self, queue_position: int) -> float:
+        """Rough wait for the request at `queue_position` (1 = next in line)."""
+        if not self.enabled:
+            return 0.0
+        return math.ceil(queue_position / self.max_concurrency) * self._service_time_sec
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Holds one upstream slot for the duration of the block.
+        `deadline` is a time.monotonic() timestamp by which the request must finish.
+        """
+        if not self.enabled:
+            yield
+            return
+        await self.acquire(deadline)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    async def acquire(self, deadline: Optional[float] = None) -> None:
+        arrived = time.monotonic()
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self._record_admitted(0.0)
+            return
+
+        position = len(self._waiters) + 1
+        expected_wait = self.estimate_wait_sec(position)
+        if len(self._waiters) >= self.max_queue:
+            self._stats["rejected_queue_full"] += 1
+            raise OllamaOverloadedError(
+                f"Ollama request queue is full ({self.max_queue} waiting).",
+                retry_after_sec=expected_wait,
+            )
+        if deadline is not None and arrived + expected_wait + self._service_time_sec > deadline:
+            self._stats["rejected_deadline"] += 1
+            raise OllamaOverloadedError(
+                "Ollama is busy and the request cannot finish before its deadline.",
+                retry_after_sec=expected_wait,
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._stats["queued"] += 1
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._waiters))
+        # Stop waiting once there is no longer time left for one full generation.
+        timeout = None
+        if deadline is not None:
+            timeout = max(0.0, deadline - self._service_time_sec - arrived)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self._stats["dropped_deadline"] += 1
+            raise OllamaOverloadedError(
+                "Request was dropped from the Ollama queue because it could no longer finish in time.",
+                retry_after_sec=self.estimate_wait_sec(len(self._waiters) + 1),
+            ) from None
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        self._record_admitted(time.monotonic() - arrived)
+
+    def release(self, service_time_sec: float) -> None:
+        self._stats["completed"] += 1
+        self._service_time_sec = (
+            SERVICE_TIME_EWMA_ALPHA * service_time_sec
+            + (1 - SERVICE_TIME_EWMA_ALPHA) * self._service_time_sec
+        )
+        self._hand_off()
+
+    def _hand_off(self) -> None:
+        # The freed slot passes directly to the oldest live waiter.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over just as we gave up; pass it on.
+            self._hand_off()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _record_admitted(self, wait_sec: float) -> None:
+        self._stats["admitted"] += 1
+        self._stats["total_wait_sec"] += wait_sec
+        self._stats["max_wait_sec"] = max(self._stats["max_wait_sec"], wait_sec)
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["max_concurrency"] = self.max_concurrency
+        stats["max_queue"] = self.max_queue
+        stats["active"] = self._active
+        stats["queue_depth"] = len(self._waiters)
+        stats["avg_wait_sec"] = stats["total_wait_sec"] / stats["admitted"] if stats["admitted"] else 0.0
+        stats["estimated_service_time_sec"] = self._service_time_sec
+        return stats
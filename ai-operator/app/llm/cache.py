@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.settings import get_settings
+from app.db.database import LLMCacheORM, SessionLocal
+from app.db.repositories import LLMCacheRepository
+from app.llm.client import ollama_client
+
+logger = logging.getLogger(__name__)
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for raw LLM classification output.
+
+    Tier 1 is an in-process LRU with a TTL; tier 2 is the `llm_cache` table in the
+    application's SQLite database so entries survive restarts. A tier-2 hit is
+    promoted into tier 1.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_sec: float = 3600,
+        persist: bool = True,
+        enabled: bool = True,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.persist = persist
+        self.enabled = enabled
+        self._session_factory = session_factory
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = Lock()
+        self._table_ready = False
+        # Background SQLite deletes started by invalidate_for_model_change() on the event loop.
+        self._pending_invalidations: set[asyncio.Task] = set()
+        self._stats = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "persistent_errors": 0,
+        }
+
+    @staticmethod
+    def build_key(model: str, prompts: Sequence[Sequence[dict[str, str]]], variant: str = "") -> str:
+        """
+        Key over the exact message lists sent to the model (system prompt, summary, the history
+        that fit in the budget and the user turn). `variant` holds settings that change the output.
+        """
+        digests = [
+            _sha256("\x1e".join(f"{message['role']}\x1f{message['content']}" for message in messages))
+            for messages in prompts
+        ]
+        return _sha256("\x00".join([model, variant, *digests]))
+
+    # --- Tier 1: in-process LRU ---
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            content, stored_at = item
+            if time.monotonic() - stored_at > self.ttl_sec:
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return content
+
+    def _memory_put(self, key: str, content: str, stored_at: float | None = None) -> None:
+        with self._lock:
+            self._entries[key] = (content, stored_at if stored_at is not None else time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    # --- Tier 2: SQLite ---
+
+    def _open_session(self) -> Session:
+        db = self._session_factory()
+        if not self._table_ready:
+            LLMCacheORM.__table__.create(bind=db.get_bind(), checkfirst=True)
+            self._table_ready = True
+        return db
+
+    def _persistent_get(self, key: str) -> Optional[str]:
+        if not self.persist:
+            return None
+        try:
+            db = self._open_session()
+            try:
+                repo = LLMCacheRepository(db)
+                db_entry = repo.get_entry(key)
+                if db_entry is None:
+                    return None
+                age = datetime.utcnow() - db_entry.created_at
+                if age > timedelta(seconds=self.ttl_sec):
+                    repo.delete_entry(key)
+                    with self._lock:
+                        self._stats["expirations"] += 1
+                    return None
+                content = db_entry.content
+            finally:
+                db.close()
+        except SQLAlchemyError as e:
+            logger.warning(f"LLM cache read failed, treating as miss: {e}")
+            with self._lock:
+                self._stats["persistent_errors"] += 1
+            return None
+
+        # Keep the remaining TTL when promoting into the memory tier.
+        self._memory_put(key, content, stored_at=time.monotonic() - age.total_seconds())
+        with self._lock:
+            self._stats["persistent_hits"] += 1
+        return content
+
+    def _persistent_put(self, key: str, model: str, content: str) -> None:
+        if not self.persist:
+            return
+        try:
+            db = self._open_session()
+            try:
+                LLMCacheRepository(db).upsert_entry(key, model, content)
+            finally:
+                db.close()
+        except SQLAlchemyError as e:
+            logger.warning(f"LLM cache write failed: {e}")
+            with self._lock:
+                self._stats["persistent_errors"] += 1
+
+    # --- Public API ---
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        content = self._memory_get(key)
+        if content is None:
+            content = self._persistent_get(key)
+        if content is None:
+            with self._lock:
+                self._stats["misses"] += 1
+        return content
+
+    def put(self, key: str, model: str, content: str) -> None:
+        if not self.enabled:
+            return
+        self._memory_put(key, content)
+        with self._lock:
+            self._stats["stores"] += 1
+        self._persistent_put(key, model, content)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Like get(), but the SQLite lookup runs in a worker thread."""
+        if not self.enabled:
+            return None
+        content = self._memory_get(key)
+        if content is None:
+            content = await asyncio.to_thread(self._persistent_get, key)
+        if content is None:
+            with self._lock:
+                self._stats["misses"] += 1
+        return content
+
+    async def aput(self, key: str, model: str, content: str) -> None:
+        if not self.enabled:
+            return
+        self._memory_put(key, content)
+        with self._lock:
+            self._stats["stores"] += 1
+        await asyncio.to_thread(self._persistent_put, key, model, content)
+
+    def invalidate_for_model_change(self, previous_model: Optional[str], new_model: str) -> None:
+        """
+        Drops everything generated by any model other than `new_model`. The memory tier is
+        cleared at once; when called on the event loop the SQLite DELETE runs in a worker thread.
+        Keys include the model, so rows still waiting to be deleted can never be served.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+        if not self.persist:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._delete_other_models(previous_model, new_model)
+            return
+        task = loop.create_task(asyncio.to_thread(self._delete_other_models, previous_model, new_model))
+        self._pending_invalidations.add(task)
+        task.add_done_callback(self._pending_invalidations.discard)
+
+    def _delete_other_models(self, previous_model: Optional[str], new_model: str) -> None:
+        try:
+            db = self._open_session()
+            try:
+                deleted = LLMCacheRepository(db).delete_other_models(new_model)
+            finally:
+                db.close()
+            logger.info(
+                f"LLM cache invalidated after model change '{previous_model}' -> '{new_model}'. "
+                f"Removed {deleted} persisted entries."
+            )
+        except SQLAlchemyError as e:
+            logger.warning(f"LLM cache invalidation failed: {e}")
+            with self._lock:
+                self._stats["persistent_errors"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if not self.persist:
+            return
+        try:
+            db = self._open_session()
+            try:
+                LLMCacheRepository(db).delete_all()
+            finally:
+                db.close()
+        except SQLAlchemyError as e:
+            logger.warning(f"LLM cache clear failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["persistent_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            (stats["memory_hits"] + stats["persistent_hits"]) / lookups if lookups else 0.0
+        )
+        stats["enabled"] = self.enabled
+        return stats
+
+
+def _build_default_cache() -> LLMResponseCache:
+    settings = get_settings()
+    return LLMResponseCache(
+        max_entries=settings.llm_cache_max_entries,
+        ttl_sec=settings.llm_cache_ttl_sec,
+        persist=settings.llm_cache_persist,
+        enabled=settings.llm_cache_enabled,
+    )
+
+
+llm_response_cache = _build_default_cache()
+ollama_client.add_model_change_listener(llm_response_cache.invalidate_for_model_change)
@@ -1,12 +1,22 @@
+import asyncio
 import httpx
+import json
 import logging
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from threading import Lock
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Union
 
 from app.core.settings import DEFAULT_OLLAMA_MODEL, get_settings
+from app.llm.admission import AdmissionController, OllamaOverloadedError
+from app.llm.endpoints import EndpointPool, OllamaEndpoint
+from app.llm.singleflight import AsyncSingleFlight, SingleFlight, payload_key
 
 logger = logging.getLogger(__name__)
 
+# A load_duration above this means Ollama had to (re)load the model for the request.
+COLD_LOAD_THRESHOLD_SEC = 0.5
+
 
 @dataclass(frozen=True)
 class OllamaModelDetection:
@@ -17,6 +27,34 @@ class OllamaModelDetection:
     fallback_used: bool
 
 
+@dataclass(frozen=True)
+class OllamaChatResult:
+    """Content of one chat generation plus the timing counters Ollama reports with it."""
+    content: str
+    model: Optional[str] = None
+    prompt_eval_count: Optional[int] = None
+    prompt_eval_duration_sec: Optional[float] = None
+    eval_count: Optional[int] = None
+    eval_duration_sec: Optional[float] = None
+    load_duration_sec: Optional[float] = None
+
+    @classmethod
+    def from_response(cls, content: str, response_data: Dict[str, Any]) -> "OllamaChatResult":
+        def seconds(name: str) -> Optional[float]:
+            value = response_data.get(name)
+            return None if value is None else value / 1e9
+
+        return cls(
+            content=content,
+            model=response_data.get("model"),
+            prompt_eval_count=response_data.get("prompt_eval_count"),
+            prompt_eval_duration_sec=seconds("prompt_eval_duration"),
+            eval_count=response_data.get("eval_count"),
+            eval_duration_sec=seconds("eval_duration"),
+            load_duration_sec=seconds("load_duration"),
+        )
+
+
 class OllamaConnectionError(Exception):
     """Custom exception for Ollama connection issues."""
     pass
@@ -30,39 +68,169 @@ class OllamaModelUnavailableError(Exception):
 class OllamaClient:
     def __init__(self):
         settings = get_settings()
-        self.base_url = settings.ollama_base_url
         self.timeout = settings.ollama_timeout_sec
-        self.client = httpx.Client(base_url=self.base_url, timeout=self.timeout)
+        self.limits = httpx.Limits(
+            max_connections=settings.ollama_max_connections,
+            max_keepalive_connections=settings.ollama_max_keepalive_connections,
+            keepalive_expiry=settings.ollama_keepalive_expiry_sec,
+        )
+        # One endpoint per Ollama server. Each creates its HTTP clients on first use: constructing
+        # the client does no I/O, and the async pools bind to the loop that actually serves requests.
+        self.endpoints = [
+            OllamaEndpoint(base_url, self.timeout, self.limits) for base_url in settings.ollama_base_urls
+        ]
+        self.pool = EndpointPool(self.endpoints)
+        self.base_url = self.endpoints[0].base_url
         self._env_model = settings.ollama_model
         self._fallback_model = settings.ollama_fallback_model
-        self._detection = self.detect_ollama_model()
-        self.model = self._detection.selected_model
-        logger.info(
-            "OllamaClient initialized with selection result: "
-            f"ollama_up={self._detection.ollama_up} "
-            f"model_available={self._detection.model_available} "
-            f"selected_model={self._detection.selected_model} "
-            f"fallback_used={self._detection.fallback_used} "
-            f"reason={self._detection.reason}"
+        # Identical concurrent chat payloads share one upstream generation.
+        self.single_flight_enabled = settings.ollama_single_flight
+        self._single_flight = SingleFlight()
+        self._async_single_flight = AsyncSingleFlight()
+        # Bounds how many async generations hit Ollama at once; extra requests queue or get rejected.
+        # OLLAMA_MAX_CONCURRENCY is per server, so the total scales with the number of endpoints.
+        self.admission = AdmissionController(
+            max_concurrency=settings.ollama_max_concurrency * len(self.endpoints),
+            max_queue=settings.ollama_max_queue,
+            initial_service_time_sec=settings.ollama_initial_service_time_sec,
+        )
+        # Sent as keep_alive on every request ("10m", "1h", "-1"); None keeps Ollama's default.
+        self.keep_alive = settings.ollama_keep_alive
+        self.embed_model = settings.ollama_embed_model
+        # Context window requested from Ollama; warm-ups must match it or the model is reloaded.
+        self.num_ctx = settings.ollama_num_ctx
+        self.last_request_at: Optional[float] = None
+        self._load_stats_lock = Lock()
+        self._load_stats: Dict[str, Any] = {
+            "samples": 0,
+            "cold_loads": 0,
+            "warmups": 0,
+            "warmup_failures": 0,
+            "total_load_sec": 0.0,
+            "max_load_sec": 0.0,
+            "last_load_sec": None,
+        }
+        self._model_change_listeners: List[Callable[[Optional[str], str], None]] = []
+        self._connection_error_listeners: List[Callable[[], None]] = []
+        self.detection_checked_at: Optional[float] = None
+        self._last_selected_model: Optional[str] = None
+        self.model: Optional[str] = None
+        # Detection runs at app startup (or on first chat), never at import time.
+        self._detection = OllamaModelDetection(
+            ollama_up=False,
+            model_available=False,
+            selected_model=None,
+            reason="Ollama model detection has not run yet.",
+            fallback_used=False,
         )
+        endpoint_urls = ", ".join(endpoint.base_url for endpoint in self.endpoints)
+        logger.info(f"OllamaClient initialized for {endpoint_urls} (model detection deferred).")
 
-    def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
-        try:
-            response = self.client.request(method, path, timeout=self.timeout, **kwargs)
-            response.raise_for_status()
-            return response.json()
-        except httpx.ConnectError as e:
+    # client/async_client address the first endpoint; routed requests go through the pool.
+    @property
+    def client(self) -> httpx.Client:
+        return self.endpoints[0].client
+
+    @client.setter
+    def client(self, value: httpx.Client) -> None:
+        self.endpoints[0].client = value
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        return self.endpoints[0].async_client
+
+    @async_client.setter
+    def async_client(self, value: httpx.AsyncClient) -> None:
+        self.endpoints[0].async_client = value
+
+    async def aclose(self) -> None:
+        for endpoint in self.endpoints:
+            await endpoint.aclose()
+
+    def add_connection_error_listener(self, listener: Callable[[], None]) -> None:
+        """Registers listener(), called whenever a request fails to connect or times out."""
+        self._connection_error_listeners.append(listener)
+
+    def _notify_connection_error(self) -> None:
+        for listener in list(self._connection_error_listeners):
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Connection error listener failed: {e}")
+
+    def _translate_error(self, e: Exception, endpoint: Optional[OllamaEndpoint] = None) -> OllamaConnectionError:
+        endpoint = endpoint or self.endpoints[0]
+        if isinstance(e, httpx.ConnectError):
             logger.error(f"Ollama connection failed: {e}")
-            raise OllamaConnectionError(f"Could not connect to Ollama server at {self.base_url}. Is it running?") from e
-        except httpx.TimeoutException as e:
+            self.pool.eject(endpoint, f"connection failed: {e}")
+            self._notify_connection_error()
+            return OllamaConnectionError(f"Could not connect to Ollama server at {endpoint.base_url}. Is it running?")
+        if isinstance(e, httpx.TimeoutException):
             logger.error(f"Ollama request timed out: {e}")
-            raise OllamaConnectionError(f"Ollama request timed out after {self.timeout}s.") from e
-        except httpx.HTTPStatusError as e:
+            self.pool.eject(endpoint, f"timed out after {self.timeout}s")
+            self._notify_connection_error()
+            return OllamaConnectionError(f"Ollama request timed out after {self.timeout}s.")
+        if isinstance(e, httpx.HTTPStatusError):
             logger.error(f"Ollama HTTP error: {e.response.status_code} - {e.response.text}")
-            raise OllamaConnectionError(f"Ollama HTTP error: {e.response.status_code} - {e.response.text}") from e
+            return OllamaConnectionError(f"Ollama HTTP error: {e.response.status_code} - {e.response.text}")
+        logger.error(f"An unexpected error occurred during Ollama request: {e}")
+        return OllamaConnectionError(f"Unexpected Ollama error: {e}")
+
+    @staticmethod
+    def _payload_for(endpoint: OllamaEndpoint, payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        # Embedding vectors are only comparable within one model, so embed requests are never redirected.
+        if not payload or "model" not in payload or "input" in payload:
+            return payload
+        model = endpoint.model_for(payload["model"])
+        return payload if model == payload["model"] else {**payload, "model": model}
+
+    @staticmethod
+    def _should_fail_over(e: OllamaConnectionError) -> bool:
+        # Only a refused connection is safe to retry elsewhere: nothing reached the server.
+        return isinstance(e.__cause__, httpx.ConnectError)
+
+    def _send(self, endpoint: OllamaEndpoint, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        if "json" in kwargs:
+            kwargs["json"] = self._payload_for(endpoint, kwargs["json"])
+        try:
+            response = endpoint.client.request(method, path, timeout=self.timeout, **kwargs)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            raise self._translate_error(e, endpoint) from e
+
+    async def _asend(self, endpoint: OllamaEndpoint, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        if "json" in kwargs:
+            kwargs["json"] = self._payload_for(endpoint, kwargs["json"])
+        try:
+            response = await endpoint.async_client.request(method, path, timeout=self.timeout, **kwargs)
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
-            logger.error(f"An unexpected error occurred during Ollama request: {e}")
-            raise OllamaConnectionError(f"Unexpected Ollama error: {e}") from e
+            raise self._translate_error(e, endpoint) from e
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        """Sends to the least loaded endpoint, failing over to the next one if the connection is refused."""
+        tried: List[OllamaEndpoint] = []
+        while True:
+            with self.pool.lease(exclude=tried) as endpoint:
+                try:
+                    return self._send(endpoint, method, path, **kwargs)
+                except OllamaConnectionError as e:
+                    tried.append(endpoint)
+                    if not self._should_fail_over(e) or len(tried) == len(self.pool):
+                        raise
+
+    async def _arequest(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        tried: List[OllamaEndpoint] = []
+        while True:
+            with self.pool.lease(exclude=tried) as endpoint:
+                try:
+                    return await self._asend(endpoint, method, path, **kwargs)
+                except OllamaConnectionError as e:
+                    tried.append(endpoint)
+                    if not self._should_fail_over(e) or len(tried) == len(self.pool):
+                        raise
 
     def _parse_model_names(self, response_data: Dict[str, Any]) -> List[str]:
         models = response_data.get("models", [])
@@ -89,18 +257,7 @@ class OllamaClient:
             "Install 'gpt-oss:20b' or a fallback model."
         )
 
-    def detect_ollama_model(self) -> OllamaModelDetection:
-        try:
-            response_data = self._request("GET", "/api/tags")
-        except OllamaConnectionError as e:
-            return OllamaModelDetection(
-                ollama_up=False,
-                model_available=False,
-                selected_model=None,
-                reason=str(e),
-                fallback_used=False,
-            )
-
+    def _detection_from_tags(self, response_data: Dict[str, Any]) -> OllamaModelDetection:
         available_models = self._parse_model_names(response_data)
         selected_model, model_available, fallback_used, reason = self._select_model(available_models)
         return OllamaModelDetection(
@@ -111,42 +268,435 @@ class OllamaClient:
             fallback_used=fallback_used,
         )
 
+    def _detection_from_error(self, e: OllamaConnectionError) -> OllamaModelDetection:
+        return OllamaModelDetection(
+            ollama_up=False,
+            model_available=False,
+            selected_model=None,
+            reason=str(e),
+            fallback_used=False,
+        )
+
+    def _apply_tags(self, endpoint: OllamaEndpoint, response_data: Dict[str, Any]) -> OllamaModelDetection:
+        endpoint.models = self._parse_model_names(response_data)
+        return self._detection_from_tags(response_data)
+
+    def _probe_endpoint(self, endpoint: OllamaEndpoint) -> OllamaModelDetection:
+        try:
+            return self._apply_tags(endpoint, self._send(endpoint, "GET", "/api/tags"))
+        except OllamaConnectionError as e:
+            return self._detection_from_error(e)
+
+    async def _aprobe_endpoint(self, endpoint: OllamaEndpoint) -> OllamaModelDetection:
+        try:
+            return self._apply_tags(endpoint, await self._asend(endpoint, "GET", "/api/tags"))
+        except OllamaConnectionError as e:
+            return self._detection_from_error(e)
+
+    def _combine_detections(self, detections: List[OllamaModelDetection]) -> OllamaModelDetection:
+        """
+        Records each endpoint's detection in the pool and returns the overall one:
+        the best usable model across endpoints (preferred over fallback), in endpoint order.
+        """
+        for endpoint, detection in zip(self.endpoints, detections):
+            self.pool.apply_detection(endpoint, detection)
+        if len(detections) == 1:
+            return detections[0]
+
+        usable = [detection for detection in detections if detection.model_available]
+        up = [detection for detection in detections if detection.ollama_up]
+        summary = f"{len(usable)}/{len(detections)} Ollama endpoints usable"
+        if usable:
+            best = next((detection for detection in usable if not detection.fallback_used), usable[0])
+            return OllamaModelDetection(
+                ollama_up=True,
+                model_available=True,
+                selected_model=best.selected_model,
+                reason=f"{best.reason} ({summary}.)",
+                fallback_used=best.fallback_used,
+            )
+        if up:
+            return OllamaModelDetection(
+                ollama_up=True,
+                model_available=False,
+                selected_model=None,
+                reason=f"{up[0].reason} ({summary}.)",
+                fallback_used=False,
+            )
+        return OllamaModelDetection(
+            ollama_up=False,
+            model_available=False,
+            selected_model=None,
+            reason=f"All {len(detections)} Ollama endpoints are unreachable: {detections[0].reason}",
+            fallback_used=False,
+        )
+
+    def detect_ollama_model(self) -> OllamaModelDetection:
+        """Probes every endpoint's /api/tags, records per-endpoint results, and returns the overall detection."""
+        return self._combine_detections([self._probe_endpoint(endpoint) for endpoint in self.endpoints])
+
+    async def adetect_ollama_model(self) -> OllamaModelDetection:
+        detections = await asyncio.gather(*[self._aprobe_endpoint(endpoint) for endpoint in self.endpoints])
+        return self._combine_detections(list(detections))
+
+    def add_model_change_listener(self, listener: Callable[[Optional[str], str], None]) -> None:
+        """
+        Registers listener(previous_model, new_model), called when detection
+        selects a different model. Temporary outages (no model) do not count as a change.
+        """
+        self._model_change_listeners.append(listener)
+
+    def _apply_detection(self, detection: OllamaModelDetection) -> OllamaModelDetection:
+        self._detection = detection
+        self.detection_checked_at = time.monotonic()
+        self.model = detection.selected_model
+        previous_model = self._last_selected_model
+        if detection.selected_model and detection.selected_model != previous_model:
+            self._last_selected_model = detection.selected_model
+            logger.info(f"Selected Ollama model changed: '{previous_model}' -> '{detection.selected_model}'")
+            for listener in list(self._model_change_listeners):
+                try:
+                    listener(previous_model, detection.selected_model)
+                except Exception as e:
+                    logger.error(f"Model change listener failed: {e}")
+        return detection
+
     def refresh_detection(self) -> OllamaModelDetection:
-        self._detection = self.detect_ollama_model()
-        self.model = self._detection.selected_model
-        return self._detection
+        return self._apply_detection(self.detect_ollama_model())
 
-    def chat(self, messages: List[Dict[str, str]], temperature: float = 0.2) -> str:
-        if not self.model:
-            logger.info("No selected Ollama model cached. Refreshing model detection before chat.")
-            detection = self.refresh_detection()
-            if not detection.model_available or not detection.selected_model:
-                raise OllamaModelUnavailableError(
-                    "No suitable Ollama model is available. "
-                    "Please pull 'gpt-oss:20b' or configure OLLAMA_MODEL."
-                )
+    async def arefresh_detection(self) -> OllamaModelDetection:
+        return self._apply_detection(await self.adetect_ollama_model())
 
+    def _ensure_model_selected(self) -> None:
         if not self.model:
             raise OllamaModelUnavailableError(
                 "No suitable Ollama model is available. "
                 "Please pull 'gpt-oss:20b' or configure OLLAMA_MODEL."
             )
+
+    def _build_chat_payload(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        stream: bool = False,
+        output_format: Optional[Union[str, Dict[str, Any]]] = None,
+        model: Optional[str] = None,
+        num_predict: Optional[int] = None,
+    ) -> Dict[str, Any]:
         payload = {
-            "model": self.model,
+            "model": model or self.model,
             "messages": messages,
-            "stream": False,
+            "stream": stream,
             "options": {"temperature": temperature}
         }
-        logger.debug(f"Sending chat request to Ollama: {payload}")
+        if num_predict is not None:
+            payload["options"]["num_predict"] = num_predict
+        if output_format is not None:
+            # "json" or a JSON schema; Ollama constrains decoding so the reply always parses.
+            payload["format"] = output_format
+        if self.num_ctx is not None:
+            payload["options"]["num_ctx"] = self.num_ctx
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def _record_model_load(self, response_data: Dict[str, Any], warmup: bool = False) -> None:
+        """Tracks Ollama's reported load_duration (nanoseconds) so cold loads are visible."""
+        self.last_request_at = time.monotonic()
+        load_duration = response_data.get("load_duration")
+        if load_duration is None:
+            return
+        load_sec = load_duration / 1e9
+        with self._load_stats_lock:
+            stats = self._load_stats
+            stats["samples"] += 1
+            stats["total_load_sec"] += load_sec
+            stats["max_load_sec"] = max(stats["max_load_sec"], load_sec)
+            stats["last_load_sec"] = load_sec
+            if warmup:
+                stats["warmups"] += 1
+            if load_sec >= COLD_LOAD_THRESHOLD_SEC:
+                stats["cold_loads"] += 1
+                if not warmup:
+                    logger.warning(f"Ollama loaded model '{response_data.get('model')}' for a request ({load_sec:.2f}s).")
+
+    def _post_chat(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         response_data = self._request("POST", "/api/chat", json=payload)
-        
+        self._record_model_load(response_data)
+        return response_data
+
+    async def _apost_chat(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        response_data = await self._arequest("POST", "/api/chat", json=payload)
+        self._record_model_load(response_data)
+        return response_data
+
+    def _build_warmup_payload(self, model: Optional[str]) -> Dict[str, Any]:
+        # An empty prompt makes Ollama load the model without generating anything.
+        payload = {"model": model or self.model, "prompt": "", "stream": False}
+        if self.num_ctx is not None:
+            payload["options"] = {"num_ctx": self.num_ctx}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def _warmup_targets(self) -> List[OllamaEndpoint]:
+        return [endpoint for endpoint in self.endpoints if not endpoint.ejected] or self.endpoints[:1]
+
+    def _warmup_done(self, model: Optional[str], result: Any) -> Optional[float]:
+        if isinstance(result, OllamaConnectionError):
+            with self._load_stats_lock:
+                self._load_stats["warmup_failures"] += 1
+            logger.warning(f"Ollama warm-up for model '{model}' failed: {result}")
+            return None
+        self._record_model_load(result, warmup=True)
+        return result.get("load_duration", 0) / 1e9
+
+    @staticmethod
+    def _slowest_load(load_times: List[Optional[float]]) -> Optional[float]:
+        succeeded = [load_sec for load_sec in load_times if load_sec is not None]
+        return max(succeeded) if succeeded else None
+
+    def warm_up(self, model: Optional[str] = None) -> Optional[float]:
+        """
+        Loads `model` (default: the selected model) into memory on every reachable endpoint.
+        Returns the slowest reported load time in seconds, or None if every warm-up failed.
+        """
+        payload = self._build_warmup_payload(model)
+        if not payload["model"]:
+            return None
+        load_times = []
+        for endpoint in self._warmup_targets():
+            try:
+                result = self._send(endpoint, "POST", "/api/generate", json=payload)
+            except OllamaConnectionError as e:
+                result = e
+            load_times.append(self._warmup_done(payload["model"], result))
+        return self._slowest_load(load_times)
+
+    async def awarm_up(self, model: Optional[str] = None) -> Optional[float]:
+        payload = self._build_warmup_payload(model)
+        if not payload["model"]:
+            return None
+
+        async def warm(endpoint: OllamaEndpoint) -> Any:
+            try:
+                return await self._asend(endpoint, "POST", "/api/generate", json=payload)
+            except OllamaConnectionError as e:
+                return e
+
+        results = await asyncio.gather(*[warm(endpoint) for endpoint in self._warmup_targets()])
+        return self._slowest_load([self._warmup_done(payload["model"], result) for result in results])
+
+    def model_load_stats(self) -> Dict[str, Any]:
+        with self._load_stats_lock:
+            stats = dict(self._load_stats)
+        stats["avg_load_sec"] = stats["total_load_sec"] / stats["samples"] if stats["samples"] else 0.0
+        stats["keep_alive"] = self.keep_alive
+        stats["idle_sec"] = None if self.last_request_at is None else time.monotonic() - self.last_request_at
+        return stats
+
+    def _extract_chat_content(self, response_data: Dict[str, Any]) -> str:
         # Ollama's chat endpoint response structure
         if "message" in response_data and "content" in response_data["message"]:
             return response_data["message"]["content"]
-        
+
         logger.error(f"Unexpected Ollama chat response format: {response_data}")
         raise OllamaConnectionError("Unexpected response format from Ollama chat endpoint.")
 
+    @staticmethod
+    def _report(
+        on_complete: Optional[Callable[[OllamaChatResult], None]],
+        content: str,
+        response_data: Dict[str, Any],
+    ) -> None:
+        if on_complete is None:
+            return
+        try:
+            on_complete(OllamaChatResult.from_response(content, response_data))
+        except Exception as e:
+            logger.error(f"Chat completion callback failed: {e}")
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.2,
+        on_complete: Optional[Callable[[OllamaChatResult], None]] = None,
+        output_format: Optional[Union[str, Dict[str, Any]]] = None,
+        model: Optional[str] = None,
+        num_predict: Optional[int] = None,
+    ) -> str:
+        """
+        Sends one non-streaming chat request and returns the assistant content.
+        on_complete, if given, receives an OllamaChatResult with Ollama's token and timing counters.
+        output_format is sent as Ollama's `format` ("json" or a JSON schema).
+        model overrides the detected model for this call (endpoints without it use their own);
+        num_predict caps the number of generated tokens.
+
+        Unlike achat(), this call skips admission control: the controller's queue lives on the
+        event loop and cannot be awaited from a blocking caller. The API only uses the async
+        methods; chat() serves sequential callers (the sync router path, scripts and benchmarks).
+        """
+        if not self.model:
+            logger.info("No selected Ollama model cached. Refreshing model detection before chat.")
+            self.refresh_detection()
+        self._ensure_model_selected()
+
+        payload = self._build_chat_payload(
+            messages, temperature, output_format=output_format, model=model, num_predict=num_predict
+        )
+        logger.debug(f"Sending chat request to Ollama: {payload}")
+        if self.single_flight_enabled:
+            response_data = self._single_flight.do(
+                payload_key(payload),
+                lambda: self._post_chat(payload),
+            )
+        else:
+            response_data = self._post_chat(payload)
+        content = self._extract_chat_content(response_data)
+        self._report(on_complete, content, response_data)
+        return content
+
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.2,
+        on_complete: Optional[Callable[[OllamaChatResult], None]] = None,
+        output_format: Optional[Union[str, Dict[str, Any]]] = None,
+        model: Optional[str] = None,
+        num_predict: Optional[int] = None,
+    ) -> str:
+        """
+        Async variant of chat() that runs on the pooled AsyncClient,
+        so a slow generation does not block the event loop.
+        """
+        if not self.model:
+            logger.info("No selected Ollama model cached. Refreshing model detection before chat.")
+            await self.arefresh_detection()
+        self._ensure_model_selected()
+
+        payload = self._build_chat_payload(
+            messages, temperature, output_format=output_format, model=model, num_predict=num_predict
+        )
+        logger.debug(f"Sending async chat request to Ollama: {payload}")
+        deadline = time.monotonic() + self.timeout
+
+        async def admitted_request() -> Dict[str, Any]:
+            async with self.admission.slot(deadline):
+                return await self._apost_chat(payload)
+
+        if self.single_flight_enabled:
+            # Coalesced callers share the leader's admission slot.
+            response_data = await self._async_single_flight.do(payload_key(payload), admitted_request)
+        else:
+            response_data = await admitted_request()
+        content = self._extract_chat_content(response_data)
+        self._report(on_complete, content, response_data)
+        return content
+
+    async def achat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.2,
+        on_complete: Optional[Callable[[OllamaChatResult], None]] = None,
+        output_format: Optional[Union[str, Dict[str, Any]]] = None,
+        model: Optional[str] = None,
+        num_predict: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Streams assistant content chunks as Ollama generates them (stream=True).
+        Ollama sends one JSON object per line; the last one has done=true and
+        carries the counters passed to on_complete.
+        """
+        if not self.model:
+            logger.info("No selected Ollama model cached. Refreshing model detection before chat.")
+            await self.arefresh_detection()
+        self._ensure_model_selected()
+
+        payload = self._build_chat_payload(
+            messages,
+            temperature,
+            stream=True,
+            output_format=output_format,
+            model=model,
+            num_predict=num_predict,
+        )
+        logger.debug(f"Sending streaming chat request to Ollama: {payload}")
+        deadline = time.monotonic() + self.timeout
+        tried: List[OllamaEndpoint] = []
+        async with self.admission.slot(deadline):
+            while True:
+                yielded = False
+                with self.pool.lease(exclude=tried) as endpoint:
+                    try:
+                        async with endpoint.async_client.stream(
+                            "POST",
+                            "/api/chat",
+                            json=self._payload_for(endpoint, payload),
+                            timeout=self.timeout,
+                        ) as response:
+                            if response.is_error:
+                                await response.aread()
+                            response.raise_for_status()
+                            chunks: List[str] = []
+                            async for line in response.aiter_lines():
+                                if not line.strip():
+                                    continue
+                                chunk = json.loads(line)
+                                if "error" in chunk:
+                                    raise OllamaConnectionError(f"Ollama stream error: {chunk['error']}")
+                                content = chunk.get("message", {}).get("content")
+                                if content:
+                                    yielded = True
+                                    chunks.append(content)
+                                    yield content
+                                if chunk.get("done"):
+                                    self._record_model_load(chunk)
+                                    self._report(on_complete, "".join(chunks), chunk)
+                                    break
+                        return
+                    except OllamaConnectionError:
+                        raise
+                    except Exception as e:
+                        error = self._translate_error(e, endpoint)
+                        tried.append(endpoint)
+                        # A refused connection before any output can move to another endpoint.
+                        if yielded or not isinstance(e, httpx.ConnectError) or len(tried) == len(self.pool):
+                            raise error from e
+
+    def _build_embed_payload(self, texts: Sequence[str]) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"model": self.embed_model, "input": list(texts)}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def _extract_embeddings(self, response_data: Dict[str, Any], count: int) -> List[List[float]]:
+        embeddings = response_data.get("embeddings")
+        if not isinstance(embeddings, list) or len(embeddings) != count:
+            raise OllamaConnectionError(f"Unexpected embedding response from Ollama model '{self.embed_model}'.")
+        return embeddings
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embeds texts with OLLAMA_EMBED_MODEL via /api/embed; one vector per text."""
+        response_data = self._request("POST", "/api/embed", json=self._build_embed_payload(texts))
+        return self._extract_embeddings(response_data, len(texts))
+
+    async def aembed(self, texts: Sequence[str]) -> List[List[float]]:
+        # Embedding calls are short and bypass admission control, which is sized for generations.
+        response_data = await self._arequest("POST", "/api/embed", json=self._build_embed_payload(texts))
+        return self._extract_embeddings(response_data, len(texts))
+
+    def single_flight_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.single_flight_enabled,
+            "sync": self._single_flight.stats(),
+            "async": self._async_single_flight.stats(),
+        }
+
+    def detection_age_sec(self) -> Optional[float]:
+        if self.detection_checked_at is None:
+            return None
+        return time.monotonic() - self.detection_checked_at
+
     def get_detection_status(self, refresh: bool = False) -> OllamaModelDetection:
         if refresh:
             return self.refresh_detection()
@@ -158,7 +708,7 @@ ollama_client = OllamaClient()
 if __name__ == '__main__':
     # Example usage (for testing)
     print("--- Ollama Status Check ---")
-    detection = ollama_client.get_detection_status()
+    detection = ollama_client.get_detection_status(refresh=True)
     print(detection)
 
     if detection.ollama_up and detection.model_available:
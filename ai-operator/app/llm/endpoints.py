@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Sequence
+
+import httpx
+
+if TYPE_CHECKING:
+    from app.llm.client import OllamaModelDetection
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaEndpoint:
+    """
+    One Ollama server: its own lazily created HTTP clients, its own model
+    detection, and the counters used for load balancing.
+    """
+
+    def __init__(self, base_url: str, timeout: float, limits: httpx.Limits):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.limits = limits
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self.detection: Optional[OllamaModelDetection] = None
+        self.models: Optional[List[str]] = None
+        self.model: Optional[str] = None
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    @client.setter
+    def client(self, value: httpx.Client) -> None:
+        self._client = value
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+        return self._async_client
+
+    @async_client.setter
+    def async_client(self, value: httpx.AsyncClient) -> None:
+        self._async_client = value
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_at is not None
+
+    @property
+    def available(self) -> bool:
+        """Not ejected, and either not probed yet or serving a usable model."""
+        return not self.ejected and (self.detection is None or self.model is not None)
+
+    def model_for(self, requested_model: Optional[str]) -> Optional[str]:
+        """The model to send here: the requested one if installed, else this endpoint's own selection."""
+        if self.models is None or requested_model in self.models or self.model is None:
+            return requested_model
+        return self.model
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "ollama_up": None if self.detection is None else self.detection.ollama_up,
+            "model": self.model,
+            "available": self.available,
+            "ejected": self.ejected,
+            "ejected_for_sec": None if self.ejected_at is None else time.monotonic() - self.ejected_at,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "last_error": self.last_error,
+        }
+
+
+class EndpointPool:
+    """
+    Least-outstanding-requests balancing over a set of Ollama endpoints.
+
+    Ejected endpoints get no traffic while any other endpoint is available;
+    they come back once a detection probe sees them up again. If every
+    endpoint is ejected, requests are still spread over all of them so that
+    a recovered server is noticed even before the next probe.
+    """
+
+    def __init__(self, endpoints: Sequence[OllamaEndpoint]):
+        if not endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint.")
+        self.endpoints = list(endpoints)
+        self._lock = Lock()
+        # Rotates the scan start so ties do not always go to the first endpoint.
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def acquire(self, exclude: Sequence[OllamaEndpoint] = ()) -> Optional[OllamaEndpoint]:
+        """Picks an endpoint and counts one outstanding request on it; None if all are excluded."""
+        with self._lock:
+            count = len(self.endpoints)
+            rotated = [self.endpoints[(self._next + i) % count] for i in range(count)]
+            self._next = (self._next + 1) % count
+            candidates = [endpoint for endpoint in rotated if endpoint not in exclude]
+            if not candidates:
+                return None
+            preferred = [endpoint for endpoint in candidates if endpoint.available] or candidates
+            endpoint = min(preferred, key=lambda e: e.outstanding)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: OllamaEndpoint) -> None:
+        with self._lock:
+            endpoint.outstanding -= 1
+
+    @contextmanager
+    def lease(self, exclude: Sequence[OllamaEndpoint] = ()) -> Iterator[Optional[OllamaEndpoint]]:
+        endpoint = self.acquire(exclude)
+        try:
+            yield endpoint
+        finally:
+            if endpoint is not None:
+                self.release(endpoint)
+
+    def eject(self, endpoint: OllamaEndpoint, reason: str) -> None:
+        with self._lock:
+            endpoint.failures += 1
+            endpoint.last_error = reason
+            if endpoint.ejected:
+                return
+            endpoint.ejected_at = time.monotonic()
+            endpoint.ejections += 1
+        if len(self.endpoints) > 1:
+            logger.warning(f"Ejected Ollama endpoint {endpoint.base_url}: {reason}")
+
+    def apply_detection(self, endpoint: OllamaEndpoint, detection: OllamaModelDetection) -> None:
+        endpoint.detection = detection
+        endpoint.model = detection.selected_model
+        if not detection.ollama_up:
+            self.eject(endpoint, detection.reason)
+            return
+        if endpoint.ejected:
+            with self._lock:
+                endpoint.ejected_at = None
+            if len(self.endpoints) > 1:
+                logger.info(f"Ollama endpoint {endpoint.base_url} is reachable again; reinstated.")
+
+    def has_ejected(self) -> bool:
+        return any(endpoint.ejected for endpoint in self.endpoints)
+
+    def stats(self) -> List[dict[str, Any]]:
+        with self._lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
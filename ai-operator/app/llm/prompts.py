@@ -88,3 +88,46 @@ User: list files in the current directory
 
 Now, respond to the user's request:
 '''
+
+# JSON schema passed as Ollama's `format` so decoding is constrained to the structure above.
+CLASSIFICATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "enum": [intent.value for intent in Intent]},
+        "plan": {"type": "array", "items": {"type": "string"}},
+        "proposed_command": {"type": ["string", "null"]},
+        "response": {"type": "string"},
+    },
+    "required": ["intent", "plan", "proposed_command", "response"],
+}
+
+# Two-phase mode (LLM_TWO_PHASE=true), phase one: a short, token-capped call that
+# only classifies the request and extracts the command. No plan or answer text.
+CLASSIFY_SYSTEM_PROMPT = f'''
+You classify requests for IRIS, a local AI operator. Reply with one JSON object and nothing else:
+{{"intent": "{Intent.CHAT.value} | {Intent.CODE_HELP.value} | {Intent.SYSTEM_TASK.value}", "proposed_command": "shell command or null"}}
+
+*   **{Intent.SYSTEM_TASK.value}**: the user asks to 'run', 'execute', 'list', 'show' or 'perform' something that needs a shell command.
+    Set proposed_command to the exact command with its arguments, for example "git status", or "dir" to list files (Windows).
+*   **{Intent.CODE_HELP.value}**: code explanation, debugging, refactoring, error analysis or other programming help without executing anything.
+*   **{Intent.CHAT.value}**: everything else.
+proposed_command is null unless the intent is {Intent.SYSTEM_TASK.value}.
+'''
+
+CLASSIFY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "enum": [intent.value for intent in Intent]},
+        "proposed_command": {"type": ["string", "null"]},
+    },
+    "required": ["intent", "proposed_command"],
+}
+
+# Phase two: the natural-language answer, generated only for chat and code help.
+ANSWER_SYSTEM_PROMPT = '''
+You are IRIS, a local AI operator running on the user's machine, created by 김가빈.
+If asked who created you, answer that 김가빈 created you. Do NOT claim to be ChatGPT or say you were created by OpenAI.
+Answer the user's last message directly, in the same language as the message, as plain text (Markdown is fine).
+For programming questions, explain clearly and include short code examples where they help.
+Do not propose or run shell commands.
+'''
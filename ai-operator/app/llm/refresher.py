@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Optional
+
+from app.core.settings import get_settings
+from app.llm.client import OllamaClient, ollama_client
+
+logger = logging.getLogger(__name__)
+
+# Lower bound between two refreshes, so a burst of failing requests causes one probe.
+MIN_REFRESH_INTERVAL_SEC = 1.0
+
+
+class ModelDetectionRefresher:
+    """
+    Background task that keeps OllamaClient's model detection fresh.
+
+    Refreshes every `ttl_sec` while Ollama is up and every `retry_sec` while it
+    (or any endpoint of a multi-endpoint pool) is down. A connection error or
+    timeout on any Ollama request triggers an immediate refresh, which also
+    re-probes ejected endpoints. Health endpoints read the cached result and do
+    no network I/O.
+    """
+
+    def __init__(self, client: OllamaClient, ttl_sec: float = 30.0, retry_sec: float = 5.0):
+        self.client = client
+        self.ttl_sec = ttl_sec
+        self.retry_sec = retry_sec
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stats = {"refreshes": 0, "triggered_refreshes": 0, "failures": 0}
+        client.add_connection_error_listener(self.request_refresh)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, refresh_now: bool = True) -> None:
+        """
+        Starts the refresh loop on the running event loop.
+        Pass refresh_now=False when detection has just run (e.g. during startup).
+        """
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run(refresh_now), name="ollama-detection-refresher")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def request_refresh(self) -> None:
+        """Asks for an immediate refresh. Safe to call from any thread."""
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None or loop.is_closed() or not self.running:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is loop:
+            wake.set()
+        else:
+            loop.call_soon_threadsafe(wake.set)
+
+    async def _run(self, refresh_now: bool = True) -> None:
+        while True:
+            if refresh_now:
+                try:
+                    detection = await self.client.arefresh_detection()
+                    self._stats["refreshes"] += 1
+                except Exception as e:
+                    # arefresh_detection maps HTTP errors to a "down" detection; this is a safety net.
+                    logger.error(f"Background Ollama detection refresh failed: {e}")
+                    self._stats["failures"] += 1
+                    detection = None
+            else:
+                detection = self.client.get_detection_status()
+            refresh_now = True
+
+            # Errors raised by the probe itself must not re-trigger an immediate probe.
+            self._wake.clear()
+            healthy = detection is not None and detection.ollama_up and not self.client.pool.has_ejected()
+            # Ejected endpoints are re-probed on the faster retry schedule.
+            interval = self.ttl_sec if healthy else self.retry_sec
+            await asyncio.sleep(MIN_REFRESH_INTERVAL_SEC)
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(0.0, interval - MIN_REFRESH_INTERVAL_SEC))
+                self._stats["triggered_refreshes"] += 1
+                logger.info("Refreshing Ollama model detection after a connection error.")
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["running"] = self.running
+        stats["detection_age_sec"] = self.client.detection_age_sec()
+        return stats
+
+
+def _build_default_refresher() -> ModelDetectionRefresher:
+    settings = get_settings()
+    return ModelDetectionRefresher(
+        ollama_client,
+        ttl_sec=settings.ollama_detection_ttl_sec,
+        retry_sec=settings.ollama_detection_retry_sec,
+    )
+
+
+detection_refresher = _build_default_refresher()
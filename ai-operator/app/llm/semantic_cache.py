@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional, Sequence
+
+from app.core.memory import MemoryEntry
+from app.core.settings import get_settings
+from app.core.vector_index import BoundedVectorStore
+from app.llm.client import OllamaClient, ollama_client
+from app.models.schemas import Intent
+
+logger = logging.getLogger(__name__)
+
+# Shorter messages are mostly follow-ups ("why?", "show me more") whose meaning depends on the conversation.
+MIN_MESSAGE_CHARS = 16
+# Bucket edges of the best-match similarity histogram in stats().
+SIMILARITY_BUCKETS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95)
+
+Classification = tuple[Intent, list[str], Optional[str], Optional[str]]
+
+
+@dataclass(frozen=True)
+class SemanticEntry:
+    model: str
+    message: str
+    classification: Classification
+    # history_fingerprint() of the conversation the answer was generated in.
+    context: str = ""
+
+
+@dataclass
+class SemanticLookup:
+    """Result of a lookup: the message embedding (reusable for storing) and the cached answer on a hit."""
+    vector: Optional[list[float]] = None
+    classification: Optional[Classification] = None
+    similarity: Optional[float] = None
+    row: Optional[int] = None
+
+
+class SemanticResponseCache:
+    """
+    Serves past chat and code help answers to near-duplicate questions.
+
+    Messages are embedded through Ollama and compared by cosine similarity
+    against a bounded, LRU-evicted vector store. A hit needs a similarity of at
+    least `threshold`, the same generation model, and an intent listed in
+    `intents`. System tasks are never stored or served.
+    """
+
+    def __init__(
+        self,
+        client: OllamaClient,
+        enabled: bool = False,
+        threshold: float = 0.92,
+        max_entries: int = 2048,
+        ttl_sec: float | None = 86400,
+        intents: Sequence[Intent] = (Intent.CHAT, Intent.CODE_HELP),
+    ):
+        self.client = client
+        self.enabled = enabled
+        self.threshold = threshold
+        self.intents = frozenset(intent for intent in intents if intent != Intent.SYSTEM_TASK)
+        self.store = BoundedVectorStore(max_entries, ttl_sec)
+        self._lock = Lock()
+        self._stats = {"lookups": 0, "hits": 0, "misses": 0, "skipped": 0, "stores": 0, "errors": 0}
+        self._hits_by_intent: Counter[str] = Counter()
+        self._similarity_histogram = [0] * (len(SIMILARITY_BUCKETS) + 1)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _should_lookup(self, message: str) -> bool:
+        if not self.enabled or not self.intents or len(message.strip()) < MIN_MESSAGE_CHARS:
+            if self.enabled:
+                self._count("skipped")
+            return False
+        return True
+
+    @staticmethod
+    def history_fingerprint(history: Sequence[MemoryEntry] | None, cwd: str | None) -> str:
+        """Digest of the context an answer depends on; entries from another context are never served."""
+        data = "\x1e".join(f"{entry.role}\x1f{entry.content}" for entry in (history or []))
+        return hashlib.sha256(f"{cwd or ''}\x00{data}".encode("utf-8")).hexdigest()
+
+    def _accept(self, model: str, context: str):
+        return lambda entry: (
+            entry.model == model and entry.context == context and entry.classification[0] in self.intents
+        )
+
+    def _match(self, vector: list[float], context: str, serve: bool) -> SemanticLookup:
+        found = self.store.search(vector, accept=self._accept(self.client.model, context))
+        similarity = found[1] if found else None
+        with self._lock:
+            self._stats["lookups"] += 1
+            if similarity is not None:
+                self._similarity_histogram[bisect_right(SIMILARITY_BUCKETS, similarity)] += 1
+            if not serve or similarity is None or similarity < self.threshold:
+                self._stats["misses"] += 1
+                return SemanticLookup(vector=vector, similarity=similarity, row=found[0] if found else None)
+            row, _, entry = found
+            self._stats["hits"] += 1
+            self._hits_by_intent[entry.classification[0].value] += 1
+        self.store.touch(row)
+        logger.info(f"Semantic cache hit ({similarity:.3f}) for '{entry.message[:60]}'.")
+        return SemanticLookup(vector=vector, classification=entry.classification, similarity=similarity, row=row)
+
+    def embed(self, message: str) -> SemanticLookup:
+        """Embeds the message without searching; the vector is reused by match(), put() and the embedding classifier."""
+        if not self._should_lookup(message):
+            return SemanticLookup()
+        try:
+            return SemanticLookup(vector=self.client.embed([message])[0])
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            self._count("errors")
+            return SemanticLookup()
+
+    async def aembed(self, message: str) -> SemanticLookup:
+        if not self._should_lookup(message):
+            return SemanticLookup()
+        try:
+            return SemanticLookup(vector=(await self.client.aembed([message]))[0])
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            self._count("errors")
+            return SemanticLookup()
+
+    def match(self, lookup: SemanticLookup, context: str = "", serve: bool = True) -> SemanticLookup:
+        """Returns the closest cached answer for an embedded message; `serve=False` only records the similarity."""
+        if lookup.vector is None:
+            return lookup
+        return self._match(lookup.vector, context, serve)
+
+    def lookup(self, message: str, context: str = "", serve: bool = True) -> SemanticLookup:
+        """embed() and match() in one call."""
+        return self.match(self.embed(message), context, serve)
+
+    async def alookup(self, message: str, context: str = "", serve: bool = True) -> SemanticLookup:
+        return self.match(await self.aembed(message), context, serve)
+
+    def put(self, message: str, lookup: SemanticLookup, classification: Classification, context: str = "") -> None:
+        """Stores a fresh answer under the lookup's embedding; a near-identical entry is replaced."""
+        intent, _, _, response_text = classification
+        model = self.client.model
+        if lookup.vector is None or intent not in self.intents or not response_text or not model:
+            return
+        if lookup.similarity is None:
+            # The message was embedded but never matched (its intent was unknown until now).
+            found = self.store.search(lookup.vector, accept=self._accept(model, context))
+            lookup = SemanticLookup(lookup.vector, similarity=found[1], row=found[0]) if found else lookup
+        replace = lookup.row if lookup.similarity is not None and lookup.similarity >= self.threshold else None
+        self.store.add(lookup.vector, SemanticEntry(model, message, classification, context), row=replace)
+        self._count("stores")
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["hits_by_intent"] = dict(self._hits_by_intent)
+            histogram = list(self._similarity_histogram)
+        labels = [f"<{SIMILARITY_BUCKETS[0]}"] + [
+            f"{low}-{high}" for low, high in zip(SIMILARITY_BUCKETS, SIMILARITY_BUCKETS[1:])
+        ] + [f">={SIMILARITY_BUCKETS[-1]}"]
+        stats["similarity_histogram"] = dict(zip(labels, histogram))
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        stats["enabled"] = self.enabled
+        stats["threshold"] = self.threshold
+        stats["intents"] = sorted(intent.value for intent in self.intents)
+        stats.update(self.store.stats())
+        return stats
+
+
+def _build_default_cache() -> SemanticResponseCache:
+    settings = get_settings()
+    return SemanticResponseCache(
+        ollama_client,
+        enabled=settings.semantic_cache_enabled,
+        threshold=settings.semantic_cache_threshold,
+        max_entries=settings.semantic_cache_max_entries,
+        ttl_sec=settings.semantic_cache_ttl_sec,
+        intents=[Intent(value) for value in settings.semantic_cache_intents],
+    )
+
+
+semantic_response_cache = _build_default_cache()
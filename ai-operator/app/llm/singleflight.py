@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from threading import Event, Lock
+from typing import Any, Awaitable, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def payload_key(payload: dict[str, Any]) -> str:
+    """Stable key for a request payload (model, messages, options, ...)."""
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class _FlightStats:
+    def __init__(self):
+        self._lock = Lock()
+        self._stats = {"leaders": 0, "coalesced": 0, "errors": 0}
+
+    def record(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Thread-based single-flight: concurrent do() calls with the same key run fn
+    once; every caller receives the same result or the same exception.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, _Call] = {}
+        self._lock = Lock()
+        self._stats = _FlightStats()
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not is_leader:
+            self._stats.record("coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self._stats.record("leaders")
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            self._stats.record("errors")
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> dict:
+        stats = self._stats.snapshot()
+        with self._lock:
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+
+class AsyncSingleFlight:
+    """
+    asyncio single-flight. The shared call runs as its own task, so one waiter
+    being cancelled does not cancel the upstream request for the others.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+        self._stats = _FlightStats()
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        # A task left behind by a different (e.g. closed) event loop cannot be shared.
+        if task is not None and task.get_loop() is not asyncio.get_running_loop():
+            task = None
+
+        if task is None:
+            self._stats.record("leaders")
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda finished: self._finish(key, finished))
+        else:
+            self._stats.record("coalesced")
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every waiter was cancelled.
+        if not task.cancelled() and task.exception() is not None:
+            self._stats.record("errors")
+
+    def stats(self) -> dict:
+        stats = self._stats.snapshot()
+        stats["in_flight"] = len(self._calls)
+        return stats
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from app.core.settings import get_settings
+from app.llm.client import OllamaClient, ollama_client
+
+logger = logging.getLogger(__name__)
+
+
+class ModelKeepWarm:
+    """
+    Background task that keeps the selected Ollama model loaded.
+
+    With `warmup` enabled the model is preloaded at startup and again whenever
+    model detection selects a different model. With `interval_sec > 0` a
+    load-only request is sent after that many seconds without Ollama traffic,
+    so the model is not unloaded between chats. Pick an interval shorter than
+    Ollama's keep_alive.
+    """
+
+    def __init__(self, client: OllamaClient, warmup: bool = False, interval_sec: float = 0.0):
+        self.client = client
+        self.warmup = warmup
+        self.interval_sec = interval_sec
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._last_attempt_at: Optional[float] = None
+        self._stats = {"warmups": 0, "keep_warm_pings": 0, "failures": 0}
+        client.add_model_change_listener(self._on_model_change)
+
+    @property
+    def enabled(self) -> bool:
+        return self.warmup or self.interval_sec > 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, warm_now: bool = True) -> None:
+        """Starts the scheduler on the running event loop; does nothing if disabled."""
+        if self.running or not self.enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(
+            self._run(warm_now and self.warmup), name="ollama-model-keep-warm"
+        )
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def request_warmup(self) -> None:
+        """Asks for an immediate warm-up. Safe to call from any thread."""
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None or loop.is_closed() or not self.running:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is loop:
+            wake.set()
+        else:
+            loop.call_soon_threadsafe(wake.set)
+
+    def _on_model_change(self, previous_model: Optional[str], new_model: str) -> None:
+        if self.warmup:
+            logger.info(f"Selected Ollama model changed ({previous_model} -> {new_model}); warming it up.")
+            self.request_warmup()
+
+    async def _warm(self, stat: str) -> None:
+        self._last_attempt_at = time.monotonic()
+        if not self.client.model:
+            return
+        load_sec = await self.client.awarm_up()
+        if load_sec is None:
+            self._stats["failures"] += 1
+            return
+        self._stats[stat] += 1
+        logger.info(f"Ollama model '{self.client.model}' is warm (load_duration={load_sec:.2f}s).")
+
+    def _idle_wait_sec(self) -> Optional[float]:
+        if self.interval_sec <= 0:
+            return None
+        # A failed ping records no Ollama traffic; counting it keeps a down server from being spammed.
+        activity = [t for t in (self.client.last_request_at, self._last_attempt_at) if t is not None]
+        if not activity:
+            return 0.0
+        idle = time.monotonic() - max(activity)
+        return max(0.0, self.interval_sec - idle)
+
+    async def _run(self, warm_now: bool) -> None:
+        if warm_now:
+            await self._warm("warmups")
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._idle_wait_sec())
+            except asyncio.TimeoutError:
+                # Traffic may have arrived while we slept; only ping after a full idle interval.
+                if self._idle_wait_sec() == 0.0:
+                    await self._warm("keep_warm_pings")
+                continue
+            self._wake.clear()
+            await self._warm("warmups")
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["running"] = self.running
+        stats["warmup"] = self.warmup
+        stats["interval_sec"] = self.interval_sec
+        return stats
+
+
+def _build_default_keep_warm() -> ModelKeepWarm:
+    settings = get_settings()
+    return ModelKeepWarm(
+        ollama_client,
+        warmup=settings.ollama_warmup,
+        interval_sec=settings.ollama_keep_warm_interval_sec,
+    )
+
+
+model_keep_warm = _build_default_keep_warm()
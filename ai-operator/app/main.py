@@ -1,8 +1,17 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api import health, chat, approvals, runs
+from app.api import health, chat, approvals, runs, metrics, policy
+from app.core.embedding_classifier import embedding_classifier
+from app.core.policy import get_policy_enforcer, policy_rules_watcher
+from app.core.settings import get_settings
+from app.core.summarizer import conversation_summarizer
 from app.db.init_db import init_db
 from app.llm.client import ollama_client
+from app.llm.refresher import detection_refresher
+from app.llm.warmup import model_keep_warm
+from app.tools.shell_pool import shell_pool
 
 # Configure logging
 logging.basicConfig(
@@ -13,28 +22,18 @@ logging.basicConfig(
     ]
 )
 
-app = FastAPI(
-    title="AI Operator",
-    description="A 'Jarvis/Friday style' personal AI Operator server.",
-    version="0.1.0-mvp"
-)
-
-# Include API routers
-app.include_router(health.router)
-app.include_router(chat.router)
-app.include_router(approvals.router)
-app.include_router(runs.router)
-
-@app.on_event("startup")
-def on_startup():
-    logging.info("Application starting up...")
+async def _detect_ollama_model() -> None:
+    settings = get_settings()
     try:
-        init_db()
-    except Exception as e:
-        logging.critical(f"Database initialization failed: {e}")
-        # In a real app, you might want to exit if the DB is not available
-        # For this MVP, we log a critical error and continue.
-    detection = ollama_client.get_detection_status()
+        detection = await asyncio.wait_for(
+            ollama_client.arefresh_detection(), settings.startup_detection_timeout_sec
+        )
+    except asyncio.TimeoutError:
+        logging.warning(
+            "Ollama model detection did not finish within "
+            f"{settings.startup_detection_timeout_sec}s; continuing startup, the background refresher will retry."
+        )
+        return
     logging.info(
         "Ollama selection at startup: "
         f"ollama_up={detection.ollama_up} "
@@ -43,7 +42,64 @@ def on_startup():
         f"fallback_used={detection.fallback_used} "
         f"reason={detection.reason}"
     )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logging.info("Application starting up...")
+    # DB init, policy setup and model detection are independent; run them concurrently.
+    db_error, policy_error, detection_error = await asyncio.gather(
+        asyncio.to_thread(init_db),
+        asyncio.to_thread(get_policy_enforcer),
+        _detect_ollama_model(),
+        return_exceptions=True,
+    )
+    if isinstance(db_error, Exception):
+        logging.critical(f"Database initialization failed: {db_error}")
+        # In a real app, you might want to exit if the DB is not available
+        # For this MVP, we log a critical error and continue.
+    if isinstance(policy_error, Exception):
+        logging.critical(f"Policy enforcer initialization failed: {policy_error}")
+    if isinstance(detection_error, Exception):
+        logging.error(f"Ollama model detection failed at startup: {detection_error}")
+    detection_refresher.start(refresh_now=False)
+    # Warm-up runs in the background so a slow model load does not delay startup.
+    model_keep_warm.start()
+    conversation_summarizer.start()
+    embedding_classifier.start()
+    chat.conversation_memory.start()
+    shell_pool.start()
+    if not isinstance(policy_error, Exception):
+        policy_rules_watcher.start()
     logging.info("Application startup complete.")
+    try:
+        yield
+    finally:
+        # Flushes buffered conversation messages before the process exits.
+        await chat.conversation_memory.stop()
+        await policy_rules_watcher.stop()
+        await shell_pool.stop()
+        await embedding_classifier.stop()
+        await conversation_summarizer.stop()
+        await model_keep_warm.stop()
+        await detection_refresher.stop()
+        await ollama_client.aclose()
+
+
+app = FastAPI(
+    title="AI Operator",
+    description="A 'Jarvis/Friday style' personal AI Operator server.",
+    version="0.1.0-mvp",
+    lifespan=lifespan,
+)
+
+# Include API routers
+app.include_router(health.router)
+app.include_router(chat.router)
+app.include_router(approvals.router)
+app.include_router(runs.router)
+app.include_router(metrics.router)
+app.include_router(policy.router)
 
 @app.get("/", tags=["Root"])
 def read_root():
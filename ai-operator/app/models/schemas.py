@@ -27,6 +27,19 @@ class ChatRequest(BaseModel):
     message: str
     cwd: Optional[str] = None
     session_id: Optional[str] = None
+    # Skip the LLM response cache lookup; the fresh answer replaces the cached one.
+    bypass_cache: bool = False
+
+
+class PolicyCheckItem(BaseModel):
+    command: str
+    # Falls back to the request's cwd when omitted.
+    cwd: Optional[str] = None
+
+
+class PolicyCheckRequest(BaseModel):
+    items: List[PolicyCheckItem]
+    cwd: Optional[str] = None
 
 
 # --- API Response Models ---
@@ -48,6 +61,29 @@ class ExecutionResponse(BaseModel):
     returncode: int
 
 
+class PolicyRuleMatch(BaseModel):
+    kind: str
+    rule: str
+    index: int
+
+
+class PolicyCheckResult(BaseModel):
+    command: str
+    cwd: Optional[str] = None
+    allowed: bool
+    reason: str
+    rule: Optional[PolicyRuleMatch] = None
+
+
+class PolicyCheckResponse(BaseModel):
+    allowed: bool
+    allowed_count: int
+    denied_count: int
+    rules_version: int
+    policy_mode: str
+    results: List[PolicyCheckResult]
+
+
 class HealthResponse(BaseModel):
     status: str = "ok"
 
@@ -59,6 +95,12 @@ class LLMHealthResponse(HealthResponse):
     fallback_used: bool
 
 
+class ReadinessResponse(LLMHealthResponse):
+    ready: bool
+    reason: str
+    detection_age_sec: Optional[float] = None
+
+
 # --- Database Models (Pydantic representation) ---
 
 class Approval(BaseModel):
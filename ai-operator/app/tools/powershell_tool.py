@@ -3,6 +3,8 @@ import logging
 import os
 from pathlib import Path
 
+from app.tools.shell_pool import ShellWorkerPool
+
 logger = logging.getLogger(__name__)
 
 # --- Tool Configuration ---
@@ -10,7 +12,27 @@ DEFAULT_TIMEOUT = 120  # seconds
 MAX_OUTPUT_CHARS = 8000
 
 class PowerShellTool:
-    """A tool for safely executing PowerShell commands."""
+    """
+    A tool for safely executing PowerShell commands.
+    With a ShellWorkerPool, commands run in long-lived shell workers instead of a new powershell.exe each.
+    """
+
+    def __init__(self, pool: ShellWorkerPool | None = None):
+        self.pool = pool
+
+    def _run(self, command: str, cwd: str | Path, timeout: int) -> tuple[int, str, str]:
+        if self.pool is not None:
+            result = self.pool.run(command, cwd, timeout=timeout)
+            return result.returncode, result.stdout, result.stderr
+        process = subprocess.run(
+            ["powershell.exe", "-NoProfile", "-Command", command],
+            capture_output=True,
+            text=True,
+            cwd=str(cwd),
+            timeout=timeout,
+            check=False, # We handle the return code manually
+        )
+        return process.returncode, process.stdout, process.stderr
 
     def _normalize_command(self, command: str) -> str:
         """
@@ -51,17 +73,7 @@ class PowerShellTool:
         normalized_command = self._normalize_command(command)
         logger.info(f"Executing command: '{normalized_command}' in '{cwd}'")
         try:
-            process = subprocess.run(
-                ["powershell.exe", "-NoProfile", "-Command", normalized_command],
-                capture_output=True,
-                text=True,
-                cwd=str(cwd),
-                timeout=timeout,
-                check=False, # We handle the return code manually
-            )
-
-            stdout = process.stdout
-            stderr = process.stderr
+            returncode, stdout, stderr = self._run(normalized_command, cwd, timeout)
 
             if len(stdout) > MAX_OUTPUT_CHARS:
                 stdout = f"[... TRUNCATED ...]\n{stdout[-MAX_OUTPUT_CHARS:]}"
@@ -69,12 +81,12 @@ class PowerShellTool:
             if len(stderr) > MAX_OUTPUT_CHARS:
                 stderr = f"[... TRUNCATED ...]\n{stderr[-MAX_OUTPUT_CHARS:]}"
 
-            ok = process.returncode == 0
+            ok = returncode == 0
             if not ok:
-                 logger.warning(f"Command finished with non-zero exit code {process.returncode}. stderr: {stderr}")
+                 logger.warning(f"Command finished with non-zero exit code {returncode}. stderr: {stderr}")
 
             return {
-                "returncode": process.returncode,
+                "returncode": returncode,
                 "stdout": stdout,
                 "stderr": stderr,
                 "ok": ok,
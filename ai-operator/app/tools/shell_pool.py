@@ -0,0 +1,452 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+import os
+import queue
+import re
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+from app.core.settings import SHELL_POOL_SHELLS, get_settings
+
+logger = logging.getLogger(__name__)
+
+_ENV_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+# How long a recycled worker may take to exit after its stdin is closed.
+WORKER_EXIT_TIMEOUT_SEC = 2.0
+
+
+class ShellWorkerError(RuntimeError):
+    """The worker shell died or broke the framing protocol; it is not reused."""
+
+
+@dataclass(frozen=True)
+class ShellResult:
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+def _ps_quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class BashDialect:
+    """
+    Each command runs in a subshell, so `cd`, `export` and shell variables
+    never outlive it; stdin is /dev/null so the command cannot read the
+    protocol stream. The subshell waits for its background jobs before it
+    exits (also after an `exit`), so their output stays with the command
+    that started them.
+    """
+
+    name = "bash"
+
+    def __init__(self, executable: str = "bash"):
+        self.argv = [executable, "--noprofile", "--norc"]
+
+    def frame(self, command: str, cwd: str, env: Mapping[str, str], token: str) -> str:
+        exports = "".join(f"export {name}={shlex.quote(value)}; " for name, value in env.items())
+        return (
+            f"( trap wait EXIT; cd -- {shlex.quote(cwd)} || exit 1; {exports}eval {shlex.quote(command)} ) </dev/null\n"
+            f"printf '\\n%s %d\\n' {token} \"$?\"\n"
+            f"printf '\\n%s\\n' {token} >&2\n"
+        )
+
+
+class PowerShellDialect:
+    """
+    Each command runs in a child scope created from its text, after which the
+    location and every environment variable are restored. Jobs (Start-Job)
+    and child processes (Start-Process) the command started are waited for
+    and jobs are removed, so nothing it left running reaches the next command.
+    The framed script is sent base64-encoded on one line, so no command text
+    can confuse the reader.
+    """
+
+    name = "powershell"
+
+    def __init__(self, executable: str = "powershell.exe"):
+        self.argv = [executable, "-NoProfile", "-NoLogo", "-NonInteractive", "-Command", "-"]
+
+    def frame(self, command: str, cwd: str, env: Mapping[str, str], token: str) -> str:
+        set_env = "".join(
+            f"Set-Item -LiteralPath {_ps_quote('env:' + name)} -Value {_ps_quote(value)}\n"
+            for name, value in env.items()
+        )
+        script = f"""
+$__location = (Get-Location).Path
+$__saved = @{{}}
+foreach ($__item in Get-ChildItem env:) {{ $__saved[$__item.Name] = $__item.Value }}
+$__errors = $Error.Count
+$__rc = 0
+$__children = {{
+    if (Get-Command Get-CimInstance -ErrorAction SilentlyContinue) {{
+        @(Get-CimInstance Win32_Process -Filter "ParentProcessId=$PID" | ForEach-Object {{ [int]$_.ProcessId }})
+    }} else {{
+        @(Get-Process | Where-Object {{ $_.Parent -and $_.Parent.Id -eq $PID }} | ForEach-Object {{ $_.Id }})
+    }}
+}}
+$__jobs_before = @(Get-Job | ForEach-Object {{ $_.Id }})
+$__children_before = & $__children
+try {{
+    Set-Location -LiteralPath {_ps_quote(cwd)} -ErrorAction Stop
+    {set_env}
+    $global:LASTEXITCODE = 0
+    & ([scriptblock]::Create({_ps_quote(command)})) | Out-Default
+    if ($global:LASTEXITCODE) {{ $__rc = $global:LASTEXITCODE }} elseif ($Error.Count -gt $__errors) {{ $__rc = 1 }}
+}} catch {{
+    [Console]::Error.WriteLine($_.ToString())
+    $__rc = 1
+}} finally {{
+    $__jobs = @(Get-Job | Where-Object {{ $__jobs_before -notcontains $_.Id }})
+    if ($__jobs) {{ $__jobs | Wait-Job | Out-Null; $__jobs | Remove-Job -Force }}
+    $__left = @(& $__children | Where-Object {{ $__children_before -notcontains $_ }})
+    if ($__left) {{ Wait-Process -Id $__left -ErrorAction SilentlyContinue }}
+    Set-Location -LiteralPath $__location
+    foreach ($__item in Get-ChildItem env:) {{
+        if (-not $__saved.ContainsKey($__item.Name)) {{ Remove-Item -LiteralPath ('env:' + $__item.Name) }}
+    }}
+    foreach ($__name in $__saved.Keys) {{ Set-Item -LiteralPath ('env:' + $__name) -Value $__saved[$__name] }}
+}}
+[Console]::Out.WriteLine('')
+[Console]::Out.WriteLine('{token} ' + $__rc)
+[Console]::Out.Flush()
+[Console]::Error.WriteLine('')
+[Console]::Error.WriteLine('{token}')
+[Console]::Error.Flush()
+"""
+        encoded = base64.b64encode(script.encode("utf-8")).decode("ascii")
+        return (
+            "& ([scriptblock]::Create([Text.Encoding]::UTF8.GetString("
+            f"[Convert]::FromBase64String('{encoded}'))))\n"
+        )
+
+
+def resolve_dialect(shell: str = "auto"):
+    """Dialect for a SHELL_POOL_SHELL value; auto is powershell.exe on Windows and bash elsewhere."""
+    if shell == "auto":
+        shell = "powershell" if os.name == "nt" else "bash"
+    if shell == "bash":
+        return BashDialect()
+    if shell == "pwsh":
+        return PowerShellDialect("pwsh")
+    if shell == "powershell":
+        return PowerShellDialect("powershell.exe")
+    raise ValueError(f"Unknown shell '{shell}'. Expected one of: {', '.join(SHELL_POOL_SHELLS)}")
+
+
+class _Tail:
+    """Output lines kept up to a character budget; older lines are dropped first."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.lines: deque[str] = deque()
+        self.size = 0
+
+    def append(self, line: str) -> None:
+        self.lines.append(line)
+        self.size += len(line)
+        # Keep just over the budget, so the caller can still tell the output was cut.
+        while len(self.lines) > 1 and self.size - len(self.lines[0]) > self.max_chars:
+            self.size -= len(self.lines.popleft())
+
+    def text(self) -> str:
+        text = "".join(self.lines)
+        # Drop the newline the frame printed before the token.
+        return text[:-1] if text.endswith("\n") else text
+
+
+class ShellWorker:
+    """One long-lived shell process plus a reader thread per output pipe."""
+
+    def __init__(self, dialect, max_output_chars: int):
+        self.dialect = dialect
+        self.max_output_chars = max_output_chars
+        self.commands = 0
+        self.failed = False
+        kwargs = {"start_new_session": True} if os.name == "posix" else {}
+        self.process = subprocess.Popen(
+            dialect.argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors="replace",
+            bufsize=1,
+            **kwargs,
+        )
+        self._stdout: queue.Queue = queue.Queue()
+        self._stderr: queue.Queue = queue.Queue()
+        for stream, lines in ((self.process.stdout, self._stdout), (self.process.stderr, self._stderr)):
+            threading.Thread(target=self._pump, args=(stream, lines), daemon=True).start()
+
+    @staticmethod
+    def _pump(stream, lines: queue.Queue) -> None:
+        try:
+            for line in iter(stream.readline, ""):
+                lines.put(line)
+        except (OSError, ValueError):
+            pass
+        lines.put(None)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_until(self, lines: queue.Queue, token: str, deadline: float, command: str, timeout: float):
+        tail = _Tail(self.max_output_chars)
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                line = lines.get(timeout=max(0.0, remaining)) if remaining > 0 else lines.get_nowait()
+            except queue.Empty:
+                raise subprocess.TimeoutExpired(command, timeout) from None
+            if line is None:
+                raise ShellWorkerError(f"Shell worker exited with code {self.process.poll()}.")
+            if line.startswith(token):
+                return tail, line[len(token):].strip()
+            tail.append(line)
+
+    def run(self, command: str, cwd: str, env: Mapping[str, str], timeout: float) -> ShellResult:
+        token = f"__shell_pool_{uuid.uuid4().hex}__"
+        deadline = time.monotonic() + timeout
+        self.commands += 1
+        try:
+            self.process.stdin.write(self.dialect.frame(command, cwd, env, token))
+            self.process.stdin.flush()
+            stdout, returncode = self._read_until(self._stdout, token, deadline, command, timeout)
+            stderr, _ = self._read_until(self._stderr, token, deadline, command, timeout)
+            return ShellResult(int(returncode), stdout.text(), stderr.text())
+        except (OSError, ValueError) as e:
+            self.failed = True
+            raise ShellWorkerError(f"Shell worker protocol error: {e}") from e
+        except BaseException:
+            # A timed-out or broken worker may still be running the command; never reuse it.
+            self.failed = True
+            raise
+
+    def close(self) -> None:
+        if self.alive and not self.failed:
+            try:
+                self.process.stdin.close()
+                self.process.wait(WORKER_EXIT_TIMEOUT_SEC)
+                return
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self.kill()
+
+    def kill(self) -> None:
+        """Kills the shell and whatever the current command started."""
+        if self.alive:
+            if os.name == "posix":
+                try:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            else:
+                subprocess.run(
+                    ["taskkill", "/F", "/T", "/PID", str(self.process.pid)], capture_output=True, check=False
+                )
+            self.process.kill()
+        try:
+            self.process.wait(WORKER_EXIT_TIMEOUT_SEC)
+        except subprocess.TimeoutExpired:
+            logger.error(f"Shell worker {self.process.pid} did not exit after being killed.")
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class ShellWorkerPool:
+    """
+    Long-lived shell workers that run approved commands, so each command does
+    not pay for starting powershell.exe. Commands are framed with a random
+    token on stdout and stderr; the dialect isolates the cwd and environment
+    of each command from the next one. A worker is replaced after
+    `max_commands_per_worker` commands, on a timeout and when it breaks the
+    protocol. Workers start lazily, or ahead of time with start().
+    """
+
+    def __init__(
+        self,
+        shell: str = "auto",
+        size: int = 2,
+        max_commands_per_worker: int = 100,
+        max_output_chars: int = 8000,
+        enabled: bool = True,
+    ):
+        self.shell = shell
+        self.size = max(1, size)
+        self.max_commands_per_worker = max_commands_per_worker
+        self.max_output_chars = max_output_chars
+        self.enabled = enabled
+        self._idle: list[ShellWorker] = []
+        self._workers = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"spawned": 0, "recycled": 0, "commands": 0, "timeouts": 0, "worker_errors": 0}
+
+    def _spawn(self) -> ShellWorker:
+        worker = ShellWorker(resolve_dialect(self.shell), self.max_output_chars)
+        with self._condition:
+            self._stats["spawned"] += 1
+        return worker
+
+    def _acquire(self, deadline: float, command: str, timeout: float) -> ShellWorker:
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise ShellWorkerError("Shell worker pool is closed.")
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.alive:
+                        return worker
+                    self._workers -= 1
+                    self._stats["worker_errors"] += 1
+                if self._workers < self.size:
+                    self._workers += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(command, timeout)
+                self._condition.wait(remaining)
+        try:
+            return self._spawn()
+        except BaseException:
+            with self._condition:
+                self._workers -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, worker: ShellWorker) -> None:
+        recycle = worker.failed or not worker.alive or worker.commands >= self.max_commands_per_worker
+        with self._condition:
+            if recycle or self._closed:
+                self._workers -= 1
+                self._stats["recycled"] += 1
+            else:
+                self._idle.append(worker)
+            self._condition.notify()
+        if recycle or self._closed:
+            worker.close()
+
+    def run(
+        self,
+        command: str,
+        cwd: str | os.PathLike,
+        timeout: float = 120,
+        env: Optional[Mapping[str, str]] = None,
+    ) -> ShellResult:
+        """
+        Runs `command` in `cwd` with `env` added to the worker's environment.
+        Raises subprocess.TimeoutExpired when no worker frees up or the command
+        does not finish within `timeout` seconds, FileNotFoundError when `cwd`
+        is not a directory and ShellWorkerError when the worker breaks.
+        """
+        cwd = os.fspath(cwd)
+        if not os.path.isdir(cwd):
+            raise FileNotFoundError(cwd)
+        env = dict(env or {})
+        for name in env:
+            if not _ENV_NAME.match(name):
+                raise ValueError(f"Invalid environment variable name: {name!r}")
+        deadline = time.monotonic() + timeout
+        worker = self._acquire(deadline, command, timeout)
+        try:
+            result = worker.run(command, cwd, env, max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            with self._condition:
+                self._stats["timeouts"] += 1
+            raise
+        except ShellWorkerError:
+            with self._condition:
+                self._stats["worker_errors"] += 1
+            raise
+        finally:
+            self._release(worker)
+        with self._condition:
+            self._stats["commands"] += 1
+        return result
+
+    def warm(self) -> int:
+        """Starts workers until the pool is full; returns how many were started."""
+        started = []
+        with self._condition:
+            missing = 0 if self._closed else self.size - self._workers
+            self._workers += missing
+        try:
+            for _ in range(missing):
+                started.append(self._spawn())
+        finally:
+            with self._condition:
+                self._workers -= missing - len(started)
+                self._idle.extend(started)
+                self._condition.notify_all()
+        return len(started)
+
+    def close(self) -> None:
+        """Stops the idle workers; busy ones stop when their command finishes."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._workers -= len(idle)
+            self._condition.notify_all()
+        for worker in idle:
+            worker.close()
+
+    def start(self) -> None:
+        """Starts the workers in the background so the first command does not wait for them."""
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._warm_in_background(), name="shell-pool-warmup")
+
+    async def _warm_in_background(self) -> None:
+        try:
+            started = await asyncio.to_thread(self.warm)
+            logger.info(f"Shell worker pool ready: shell='{self.shell}' workers={started}")
+        except Exception as e:
+            logger.error(f"Starting shell workers failed; they will be started on first use: {e}")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await asyncio.to_thread(self.close)
+
+    def stats(self) -> dict:
+        with self._condition:
+            stats = dict(self._stats)
+            stats["workers"] = self._workers
+            stats["idle"] = len(self._idle)
+        stats.update(enabled=self.enabled, shell=self.shell, size=self.size)
+        return stats
+
+
+def _build_default_shell_pool() -> ShellWorkerPool:
+    settings = get_settings()
+    return ShellWorkerPool(
+        shell=settings.shell_pool_shell,
+        size=settings.shell_pool_size,
+        max_commands_per_worker=settings.shell_pool_max_commands,
+        enabled=settings.shell_pool_enabled,
+    )
+
+
+shell_pool = _build_default_shell_pool()
@@ -0,0 +1,100 @@
+"""
+Concurrency benchmark: blocking OllamaClient.chat vs pooled OllamaClient.achat.
+
+Ollama is replaced by an in-process stub that sleeps for a fixed "generation"
+latency, so the numbers show how many LLM calls one event loop can keep in
+flight rather than how fast the model is.
+
+Run from the ai-operator directory:
+    python -m benchmarks.bench_async_concurrency --requests 50 --latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.llm.client import OllamaClient
+
+STUB_MODEL = "gpt-oss:20b"
+
+
+def _stub_body() -> dict:
+    return {
+        "model": STUB_MODEL,
+        "message": {"role": "assistant", "content": json.dumps({"intent": "chat", "response": "ok"})},
+        "done": True,
+    }
+
+
+def build_client(latency: float, max_connections: int) -> OllamaClient:
+    def sync_handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(latency)
+        return httpx.Response(200, json=_stub_body())
+
+    async def async_handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json=_stub_body())
+
+    client = OllamaClient()
+    client.model = STUB_MODEL
+    client.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    client.client = httpx.Client(
+        base_url=client.base_url,
+        timeout=client.timeout,
+        transport=httpx.MockTransport(sync_handler),
+    )
+    client.async_client = httpx.AsyncClient(
+        base_url=client.base_url,
+        timeout=client.timeout,
+        limits=client.limits,
+        transport=httpx.MockTransport(async_handler),
+    )
+    return client
+
+
+async def run_blocking(client: OllamaClient, requests: int) -> float:
+    # Mirrors the old /chat handler: a sync call made from inside the event loop.
+    started = time.perf_counter()
+    await asyncio.gather(*[_blocking_call(client, i) for i in range(requests)])
+    return time.perf_counter() - started
+
+
+async def _blocking_call(client: OllamaClient, i: int) -> str:
+    return client.chat([{"role": "user", "content": f"request {i}"}])
+
+
+async def run_async(client: OllamaClient, requests: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        client.achat([{"role": "user", "content": f"request {i}"}])
+        for i in range(requests)
+    ])
+    return time.perf_counter() - started
+
+
+def report(label: str, requests: int, elapsed: float) -> None:
+    print(f"{label:<10} requests={requests:<5} elapsed={elapsed:7.3f}s throughput={requests / elapsed:8.1f} req/s")
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    client = build_client(args.latency, args.max_connections)
+    try:
+        report("blocking", args.requests, await run_blocking(client, args.requests))
+        report("async", args.requests, await run_async(client, args.requests))
+    finally:
+        await client.aclose()
+        client.client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stubbed generation latency in seconds.")
+    parser.add_argument("--max-connections", type=int, default=100)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
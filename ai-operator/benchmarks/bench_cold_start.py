@@ -0,0 +1,82 @@
+"""
+Cold-start benchmark: time to import app.main and to serve the first request.
+
+Each run is a fresh interpreter, so module caches, the DB engine and the
+Ollama client all start cold. The first request goes through TestClient,
+which runs the app lifespan (DB init, policy setup, model detection) first.
+
+Point --ollama-url at an address that never answers (e.g. a blackholed IP)
+to check that a hung Ollama only delays startup by STARTUP_DETECTION_TIMEOUT_SEC
+and never blocks the import itself.
+
+Run from the ai-operator directory:
+    python -m benchmarks.bench_cold_start --runs 5
+    python -m benchmarks.bench_cold_start --runs 3 --ollama-url http://10.255.255.1:11434
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+_CHILD = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    status = client.get("/health/live").status_code
+    first_request = time.perf_counter()
+print(json.dumps({
+    "import_sec": imported - started,
+    "first_request_sec": first_request - started,
+    "status": status,
+}))
+"""
+
+
+def run_once(ollama_url: str, detection_timeout: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({
+            "OLLAMA_BASE_URL": ollama_url,
+            "STARTUP_DETECTION_TIMEOUT_SEC": str(detection_timeout),
+            "DATABASE_URL": f"sqlite:///{Path(tmp) / 'bench.db'}",
+            "SANDBOX_ROOT": str(Path(tmp) / "sandbox"),
+        })
+        completed = subprocess.run(
+            [sys.executable, "-c", _CHILD],
+            cwd=PROJECT_ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ollama-url", default="http://127.0.0.1:9", help="Ollama URL the app should probe.")
+    parser.add_argument("--detection-timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    samples = [run_once(args.ollama_url, args.detection_timeout) for _ in range(args.runs)]
+    for key in ("import_sec", "first_request_sec"):
+        values = [sample[key] for sample in samples]
+        print(
+            f"{key:>18}: median={statistics.median(values) * 1000:8.1f}ms "
+            f"min={min(values) * 1000:8.1f}ms max={max(values) * 1000:8.1f}ms"
+        )
+    print(f"{'status':>18}: {sorted({sample['status'] for sample in samples})}")
+
+
+if __name__ == "__main__":
+    main()
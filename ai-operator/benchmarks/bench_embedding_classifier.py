@@ -0,0 +1,93 @@
+"""
+Embedding classifier benchmark: nearest-neighbour search cost, index load time,
+and (with --live) one embedding call versus one classification generation.
+
+Offline, the exemplar index is filled with random unit vectors of the embed
+model's usual size, saved, memory-mapped back and searched. With --live the
+real index is built through OLLAMA_BASE_URL and both Ollama calls are timed on
+the same messages.
+
+Run from the ai-operator directory:
+    python -m benchmarks.bench_embedding_classifier --vectors 5000 --dim 768
+    python -m benchmarks.bench_embedding_classifier --live
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.core.embedding_classifier import EmbeddingIntentClassifier
+from app.core.vector_index import VectorIndex
+from app.llm.client import ollama_client
+from app.llm.prompts import SYSTEM_PROMPT
+
+MESSAGES = [
+    "what is a python virtual environment?",
+    "tell me something fun about octopuses",
+    "why does my code raise an IndexError?",
+    "run git status",
+    "이 함수가 뭘 하는지 설명해줘",
+]
+
+
+def bench_offline(vectors: int, dim: int, queries: int) -> None:
+    rng = np.random.default_rng(0)
+    index = VectorIndex.build(rng.standard_normal((vectors, dim)), ["chat"] * vectors)
+    with tempfile.TemporaryDirectory() as directory:
+        index.save(directory)
+        started = time.perf_counter()
+        loaded = VectorIndex.load(directory)
+        load_ms = (time.perf_counter() - started) * 1000
+        query_vectors = rng.standard_normal((queries, dim))
+        started = time.perf_counter()
+        for query in query_vectors:
+            loaded.search(query, k=5)
+        per_query = (time.perf_counter() - started) / queries
+    print(f"vectors={vectors} dim={dim} mmap_load={load_ms:.2f}ms search={per_query * 1e6:.1f}us/query")
+
+
+async def bench_live(rounds: int) -> None:
+    await ollama_client.arefresh_detection()
+    classifier = EmbeddingIntentClassifier(ollama_client, enabled=True, index_dir=tempfile.mkdtemp())
+    await classifier.aensure_index()
+    embed_times, generate_times = [], []
+    for _ in range(rounds):
+        for message in MESSAGES:
+            started = time.perf_counter()
+            intent = await classifier.aclassify(message)
+            embed_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            await ollama_client.achat(
+                [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": f"User: {message}"}]
+            )
+            generate_times.append(time.perf_counter() - started)
+            print(f"{message[:40]:<40} -> {intent.value if intent else 'LLM'}")
+    embed_ms = statistics.median(embed_times) * 1000
+    generate_ms = statistics.median(generate_times) * 1000
+    print(
+        f"median embedding classify={embed_ms:.0f}ms generation={generate_ms:.0f}ms "
+        f"speedup={generate_ms / embed_ms:.0f}x"
+    )
+    print(classifier.stats())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--live", action="store_true", help="Time real Ollama embedding and generation calls.")
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+
+    if args.live:
+        asyncio.run(bench_live(args.rounds))
+    else:
+        bench_offline(args.vectors, args.dim, args.queries)
+
+
+if __name__ == "__main__":
+    main()
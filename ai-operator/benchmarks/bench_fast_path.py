@@ -0,0 +1,49 @@
+"""
+Fast-path classifier benchmark: per-message latency and hit rate.
+
+Runs FastPathClassifier.classify() over a mix of explicit commands, identity
+questions and free-form messages (which fall through to the LLM).
+
+Run from the ai-operator directory:
+    python -m benchmarks.bench_fast_path --iterations 20000
+"""
+import argparse
+import time
+
+from app.core.fast_path import FastPathClassifier
+
+MESSAGES = [
+    "run git status",
+    "git diff --stat",
+    "dir",
+    "please execute docker ps",
+    "git status 실행해줘",
+    "Who made you?",
+    "Can you tell me a joke?",
+    "Explain this Python code: def hello(): print('hello')",
+    "list files in the current directory",
+    "why does my test fail with a KeyError in conftest.py?",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    classifier = FastPathClassifier()
+    started = time.perf_counter()
+    for i in range(args.iterations):
+        classifier.classify(MESSAGES[i % len(MESSAGES)])
+    elapsed = time.perf_counter() - started
+
+    stats = classifier.stats()
+    print(f"messages={stats['checked']} per_message={elapsed / stats['checked'] * 1e6:.1f}us")
+    print(
+        f"hit_rate={stats['hit_rate']:.0%} command_hits={stats['command_hits']} "
+        f"identity_hits={stats['identity_hits']} misses={stats['misses']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
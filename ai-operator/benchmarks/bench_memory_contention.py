@@ -0,0 +1,115 @@
+"""
+Conversation memory contention benchmark: many threads reading and writing
+unrelated sessions, as FastAPI's threadpool does under load.
+
+Compares the previous single-lock store (history copied out of a deque while
+holding the lock) with the striped store at one and several stripes. Each
+thread owns its own sessions and does `--reads` history reads per write.
+With --hold-us each read also sleeps while the single-lock store would hold
+its lock, imitating a slow reader (GIL release, page fault, bigger history).
+Without it the GIL serializes the threads anyway, so the numbers mostly show
+the per-call cost of the bounded store's LRU and TTL bookkeeping.
+
+Run from the ai-operator directory:
+    python -m benchmarks.bench_memory_contention --threads 16 --ops 20000
+    python -m benchmarks.bench_memory_contention --threads 16 --ops 2000 --hold-us 50
+"""
+import argparse
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Deque
+
+from app.core.memory import ConversationMemory, MemoryEntry
+
+
+class SingleLockMemory:
+    """The store before lock striping: one lock for every session."""
+
+    def __init__(self, max_messages_per_session: int = 20, hold_sec: float = 0.0):
+        self.max_messages_per_session = max_messages_per_session
+        self.hold_sec = hold_sec
+        self._store: dict[str, Deque[MemoryEntry]] = defaultdict(
+            lambda: deque(maxlen=self.max_messages_per_session)
+        )
+        self._lock = threading.Lock()
+
+    def add_message(self, session_id: str, role: str, content: str) -> None:
+        with self._lock:
+            self._store[session_id].append(MemoryEntry(role=role, content=content))
+
+    def get_history(self, session_id: str) -> list[MemoryEntry]:
+        with self._lock:
+            if self.hold_sec:
+                time.sleep(self.hold_sec)
+            return list(self._store.get(session_id, []))
+
+
+class SlowReadMemory(ConversationMemory):
+    """Striped store with the same artificial read delay, taken outside any lock."""
+
+    def __init__(self, hold_sec: float, **kwargs):
+        super().__init__(**kwargs)
+        self.hold_sec = hold_sec
+
+    def get_history(self, session_id: str) -> list[MemoryEntry]:
+        history = super().get_history(session_id)
+        if self.hold_sec:
+            time.sleep(self.hold_sec)
+        return history
+
+
+def run(memory, threads: int, ops: int, reads: int, sessions_per_thread: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index: int) -> None:
+        session_ids = [f"t{index}-s{i}" for i in range(sessions_per_thread)]
+        barrier.wait()
+        for op in range(ops):
+            session_id = session_ids[op % sessions_per_thread]
+            if op % (reads + 1) == 0:
+                memory.add_message(session_id, "user", "How do I read a file line by line in Python?")
+            else:
+                memory.get_history(session_id)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return threads * ops / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=20000, help="Operations per thread.")
+    parser.add_argument("--reads", type=int, default=4, help="History reads per write.")
+    parser.add_argument("--sessions", type=int, default=32, help="Sessions per thread.")
+    parser.add_argument("--stripes", type=int, default=16)
+    parser.add_argument("--hold-us", type=float, default=0.0, help="Extra time spent per history read.")
+    args = parser.parse_args()
+
+    hold = args.hold_us / 1e6
+
+    def striped(stripes: int) -> ConversationMemory:
+        if hold:
+            return SlowReadMemory(hold, idle_ttl_sec=None, stripes=stripes)
+        return ConversationMemory(idle_ttl_sec=None, stripes=stripes)
+
+    variants = {
+        "single lock (previous)": SingleLockMemory(hold_sec=hold),
+        "striped, 1 stripe": striped(1),
+        f"striped, {args.stripes} stripes": striped(args.stripes),
+    }
+    baseline = None
+    for name, memory in variants.items():
+        throughput = run(memory, args.threads, args.ops, args.reads, args.sessions)
+        baseline = baseline or throughput
+        print(f"{name:<24} {throughput:>12,.0f} ops/s  ({throughput / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
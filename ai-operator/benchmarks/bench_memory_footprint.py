@@ -0,0 +1,157 @@
+"""
+Conversation memory footprint benchmark: bytes allocated per stored session,
+measured with tracemalloc over synthetic but realistic transcripts.
+
+Each session alternates short user questions with assistant answers; about a
+third of the answers are long code help replies with a code block, the rest
+short chat replies. The same transcripts are stored in the previous layout (a
+deque of plain frozen dataclasses) and in ConversationMemory with and without
+compression. Reading every history back is timed to show the cost of lazy
+decompression.
+
+Run from the ai-operator directory:
+    python -m benchmarks.bench_memory_footprint --sessions 2000
+    python -m benchmarks.bench_memory_footprint --sessions 2000 --compress-min-bytes 2048
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass
+
+from app.core.memory import ConversationMemory
+
+QUESTIONS = [
+    "How do I read a CSV file with pandas and skip the first two rows?",
+    "Why does my FastAPI endpoint return 422 when I post JSON?",
+    "What is the difference between a list and a tuple?",
+    "Thanks! Can you make it async?",
+    "git rebase or git merge for a feature branch?",
+]
+CHAT_ANSWERS = [
+    "Sure, happy to help with that.",
+    "A tuple is immutable and hashable, a list is not; use tuples for fixed records.",
+    "Both work; rebase keeps history linear, merge keeps the branch structure.",
+]
+CODE_ANSWER = """Here is a version that handles the edge cases you mentioned:
+
+```python
+import csv
+from pathlib import Path
+
+
+def load_rows(path: Path, skip: int = 2) -> list[dict[str, str]]:
+    with path.open(newline="", encoding="utf-8") as f:
+        for _ in range({skip}):
+            next(f, None)
+        reader = csv.DictReader(f)
+        return [row for row in reader if any(value.strip() for value in row.values())]
+
+
+if __name__ == "__main__":
+    for row in load_rows(Path("data.csv")):
+        print(row["{column}"])
+```
+
+`DictReader` uses the first remaining line as the header, so skipping happens
+before it is created. Empty lines are dropped by the comprehension. If the file
+is large, return a generator instead of a list so rows are processed one at a
+time, and pass `errors="replace"` to `open()` when the encoding is uncertain.
+"""
+
+
+@dataclass(frozen=True)
+class PlainEntry:
+    """MemoryEntry as it was stored before: no slots, full role string."""
+    role: str
+    content: str
+
+
+def transcripts(sessions: int, turns: int, seed: int = 0) -> list[list[tuple[str, str]]]:
+    rng = random.Random(seed)
+    result = []
+    for _ in range(sessions):
+        messages = []
+        for _ in range(turns):
+            messages.append(("user", rng.choice(QUESTIONS)))
+            if rng.random() < 0.35:
+                answer = CODE_ANSWER.format(skip=rng.randint(1, 9), column=f"col_{rng.randint(0, 999)}")
+            else:
+                answer = rng.choice(CHAT_ANSWERS) + f" (ref {rng.randint(0, 10**6)})"
+            messages.append(("assistant", answer))
+        result.append(messages)
+    return result
+
+
+def measure(build) -> tuple[int, object]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=10, help="User/assistant pairs per session.")
+    parser.add_argument("--compress-min-bytes", type=int, default=512)
+    args = parser.parse_args()
+
+    text_bytes = sum(
+        len(content.encode("utf-8")) for messages in transcripts(args.sessions, args.turns) for _, content in messages
+    )
+
+    # Each variant generates the same transcripts inside the measurement, so the
+    # strings it keeps are counted and the ones it replaces are freed.
+    def plain():
+        store = {}
+        for index, messages in enumerate(transcripts(args.sessions, args.turns)):
+            history = store.setdefault(f"s{index}", deque(maxlen=args.turns * 2))
+            for role, content in messages:
+                history.append(PlainEntry(role, content))
+        return store
+
+    def compact(compress_min_bytes):
+        def build():
+            memory = ConversationMemory(
+                max_messages_per_session=args.turns * 2,
+                max_sessions=args.sessions,
+                idle_ttl_sec=None,
+                compress_min_bytes=compress_min_bytes,
+            )
+            for index, messages in enumerate(transcripts(args.sessions, args.turns)):
+                for role, content in messages:
+                    memory.add_message(f"s{index}", role, content)
+            return memory
+        return build
+
+    print(f"sessions={args.sessions} messages/session={args.turns * 2} message text={text_bytes / 2**20:.1f}MB")
+    variants = {
+        "previous (dataclass, deque)": plain,
+        "compact": compact(None),
+        f"compact + zlib >= {args.compress_min_bytes}B": compact(args.compress_min_bytes),
+    }
+    baseline = None
+    for name, build in variants.items():
+        allocated, store = measure(build)
+        baseline = baseline or allocated
+        read = ""
+        if isinstance(store, ConversationMemory):
+            started = time.perf_counter()
+            for index in range(args.sessions):
+                store.get_history(f"s{index}")
+            read = f"  get_history={(time.perf_counter() - started) / args.sessions * 1e6:.1f}us"
+        print(
+            f"{name:<30} {allocated / 2**20:>8.2f}MB  {allocated / args.sessions:>8,.0f}B/session  "
+            f"({allocated / baseline:.2f}x){read}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Conversation memory soak test: resident memory while many one-off sessions
+come and go, as when every CLI launch opens a new session id.
+
+Each synthetic session stores one user message and one assistant reply. RSS is
+printed at regular checkpoints; with the session cap it should level off once
+the cap is reached, while --unbounded shows the growth without eviction.
+
+Run from the ai-operator directory:
+    python -m benchmarks.bench_memory_soak --sessions 1000000
+    python -m benchmarks.bench_memory_soak --sessions 200000 --unbounded
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import uuid
+
+from app.core.memory import ConversationMemory
+
+QUESTION = "What is a Python generator and when should I use one instead of a list?"
+ANSWER = "A generator yields items lazily, so it suits large or infinite sequences. " * 3
+
+
+def rss_mb() -> float | None:
+    """Current resident set size, or None where it cannot be read without extra packages."""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--max-bytes", type=int, default=0, help="Byte budget for message text (0 disables).")
+    parser.add_argument("--checkpoints", type=int, default=10)
+    parser.add_argument("--unbounded", action="store_true", help="Disable the session cap for comparison.")
+    args = parser.parse_args()
+
+    memory = ConversationMemory(
+        max_sessions=sys.maxsize if args.unbounded else args.max_sessions,
+        idle_ttl_sec=None,
+        max_bytes=args.max_bytes,
+    )
+    every = max(1, args.sessions // args.checkpoints)
+    readings = []
+    started = time.perf_counter()
+    for i in range(1, args.sessions + 1):
+        session_id = str(uuid.uuid4())
+        memory.add_message(session_id, "user", QUESTION)
+        memory.add_message(session_id, "assistant", ANSWER)
+        if i % every == 0:
+            gc.collect()
+            rss = rss_mb()
+            readings.append(rss)
+            stats = memory.stats()
+            print(
+                f"sessions_seen={i:>9} stored={stats['sessions']:>9} evictions={stats['evictions']:>9} "
+                f"rss={'n/a' if rss is None else f'{rss:.1f}MB'}"
+            )
+    elapsed = time.perf_counter() - started
+    print(f"{args.sessions / elapsed:,.0f} sessions/s")
+    if len(readings) >= 2 and None not in readings:
+        # Compare the second half of the run with its midpoint: flat means no leak.
+        midpoint = readings[len(readings) // 2 - 1]
+        print(f"rss growth over the second half: {readings[-1] - midpoint:+.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Policy check benchmark: full PolicyEnforcer.check_all calls on a realistic mix
+of commands and working directories.
+
+Compares the previous path checks (Path.resolve() on the cwd and on every
+absolute path in the command, expandvars on every command) with the lexical
+checks, with and without the decision cache. A second pass over the same
+commands shows the cache hit path. Stage timings are printed for the
+uncached run.
+
+Run from the ai-operator directory:
+    python -m benchmarks.bench_policy_checks
+    python -m benchmarks.bench_policy_checks --commands 5000 --distinct 200
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app.core.policy import PolicyEnforcer
+
+COMMANDS = [
+    "git status",
+    "git diff --stat",
+    "python -m pytest -q tests",
+    "ls -la",
+    "echo hello > notes.txt",
+    "echo data > {sandbox}{sep}out{sep}result.txt",
+    "pytest -k policy",
+    "docker ps",
+    "make build",
+]
+
+
+class ResolvingPolicyEnforcer(PolicyEnforcer):
+    """The path checks as they were before the lexical fast path."""
+
+    @staticmethod
+    def _expand(command: str) -> str:
+        return os.path.expandvars(command.strip())
+
+    def is_path_in_sandbox(self, cwd) -> bool:
+        try:
+            return Path(cwd).resolve().is_relative_to(self.sandbox_root)
+        except Exception:
+            return False
+
+
+def build_checks(sandbox: Path, count: int, distinct: int, seed: int = 0) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    dirs = [sandbox / f"project{i}" / "src" for i in range(8)]
+    for directory in dirs:
+        directory.mkdir(parents=True, exist_ok=True)
+    pool = []
+    for i in range(distinct):
+        command = rng.choice(COMMANDS).format(sandbox=sandbox, sep=os.sep)
+        pool.append((f"{command} # {i}", str(rng.choice(dirs))))
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def time_checks(policy: PolicyEnforcer, checks: list[tuple[str, str]]) -> float:
+    started = time.perf_counter()
+    for command, cwd in checks:
+        policy.check_all(command, cwd)
+    return (time.perf_counter() - started) / len(checks) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=5000)
+    parser.add_argument("--distinct", type=int, default=200, help="Distinct (command, cwd) pairs.")
+    args = parser.parse_args()
+    # Denied commands log a warning each; keep the output readable.
+    logging.getLogger("app.core.policy").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as root:
+        sandbox = Path(root).resolve() / "sandbox"
+        checks = build_checks(sandbox, args.commands, args.distinct)
+        variants = {
+            "resolve (previous)": ResolvingPolicyEnforcer(str(sandbox), decision_cache_size=0),
+            "lexical + symlink cache": PolicyEnforcer(str(sandbox), decision_cache_size=0),
+            "lexical, no symlinks": PolicyEnforcer(str(sandbox), decision_cache_size=0, resolve_symlinks=False),
+            "lexical + decision cache": PolicyEnforcer(str(sandbox)),
+        }
+        baseline = None
+        for name, policy in variants.items():
+            first = time_checks(policy, checks)
+            second = time_checks(policy, checks)
+            baseline = baseline or second
+            print(f"{name:<26} first pass {first:>7.2f}us  second pass {second:>7.2f}us  ({baseline / second:.1f}x)")
+
+        print("\nstage timings (lexical + symlink cache, uncached checks):")
+        for stage, timing in variants["lexical + symlink cache"].check_stats()["stages"].items():
+            print(f"  {stage:<14} {timing['avg_us']:>7.2f}us avg  {timing['max_us']:>8.1f}us max")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Policy matcher benchmark: allowlist and deny-pattern checks at 10, 1k and 10k rules.
+
+Compares the previous linear checks (lowercase every prefix and call every
+regex on each command) with the compiled RuleMatcher (prefix trie plus one
+combined deny regex). Rules look like team-specific command prefixes and
+flag patterns; the commands mix allowed, unknown and denied ones.
+
+Run from the ai-operator directory:
+    python -m benchmarks.bench_policy_matcher
+    python -m benchmarks.bench_policy_matcher --sizes 10 1000 10000 --commands 2000
+"""
+import argparse
+import random
+import re
+import time
+
+from app.core.policy_matcher import RuleMatcher
+
+
+def build_rules(count: int) -> tuple[list[str], list[str]]:
+    prefixes = [f"team{i:05d} tool{i % 97} run" for i in range(count)]
+    patterns = [rf"--{'secret' if i % 2 else 'token'}-{i}\b" for i in range(count)]
+    return prefixes, patterns
+
+
+def build_commands(count: int, rules: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    commands = []
+    for _ in range(count):
+        team = rng.randrange(rules * 2)  # half of them are not allowlisted
+        denied = rng.randrange(rules)
+        flag = f" --{'secret' if denied % 2 else 'token'}-{denied}" if rng.random() < 0.1 else " --verbose"
+        commands.append(f"TEAM{team:05d} tool{team % 97} run build --target prod{flag}")
+    return commands
+
+
+class LinearMatcher:
+    """The checks as PolicyEnforcer ran them before the compiled matcher."""
+
+    def __init__(self, prefixes: list[str], patterns: list[str]):
+        self.prefixes = prefixes
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+
+    def match_allow(self, command: str):
+        normalized_command = command.strip().lower()
+        for prefix in self.prefixes:
+            if normalized_command.startswith(prefix.lower()):
+                return prefix
+        return None
+
+    def match_deny(self, command: str):
+        for pattern in self.patterns:
+            if pattern.search(command):
+                return pattern.pattern
+        return None
+
+
+def time_checks(matcher, commands: list[str]) -> tuple[float, float]:
+    started = time.perf_counter()
+    for command in commands:
+        matcher.match_allow(command)
+    allow_us = (time.perf_counter() - started) / len(commands) * 1e6
+    started = time.perf_counter()
+    for command in commands:
+        matcher.match_deny(command)
+    deny_us = (time.perf_counter() - started) / len(commands) * 1e6
+    return allow_us, deny_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--commands", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'rules':>6} {'matcher':<9} {'build':>9} {'allow':>10} {'deny':>10}")
+    for size in args.sizes:
+        prefixes, patterns = build_rules(size)
+        commands = build_commands(args.commands, size)
+        for name, factory in (("linear", LinearMatcher), ("compiled", RuleMatcher)):
+            started = time.perf_counter()
+            matcher = factory(prefixes, patterns)
+            build_ms = (time.perf_counter() - started) * 1000
+            allow_us, deny_us = time_checks(matcher, commands)
+            print(f"{size:>6} {name:<9} {build_ms:>7.1f}ms {allow_us:>8.2f}us {deny_us:>8.2f}us")
+
+
+if __name__ == "__main__":
+    main()
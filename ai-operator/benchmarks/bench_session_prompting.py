@@ -0,0 +1,127 @@
+"""
+Session prompting benchmark: prompt tokens Ollama must evaluate per turn.
+
+Compares the legacy prompt (history flattened into one user message) with
+session prompting (history sent as chat messages that only ever get appended).
+
+By default Ollama is replaced by a stub that mimics its prompt cache: it keeps
+the previous prompt plus generated output, and only counts prompt tokens after
+the common prefix (about 4 characters per token). Pass --live to run the same
+conversation against the Ollama server from OLLAMA_BASE_URL and read its real
+prompt_eval_count instead.
+
+Run from the ai-operator directory:
+    python -m benchmarks.bench_session_prompting --turns 12
+    python -m benchmarks.bench_session_prompting --turns 12 --live
+"""
+import argparse
+import json
+import os
+import statistics
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("FAST_PATH_ENABLED", "false")
+
+import httpx  # noqa: E402
+
+from app.core.memory import ConversationMemory  # noqa: E402
+from app.core.router import IntentRouter  # noqa: E402
+from app.llm.client import ollama_client  # noqa: E402
+from app.models.schemas import ChatRequest, Intent  # noqa: E402
+
+CHARS_PER_TOKEN = 4
+QUESTIONS = [
+    "What is a Python generator?",
+    "How is it different from a list comprehension?",
+    "Can you show a short example?",
+    "What happens if I call next() after it is exhausted?",
+    "How would I type-annotate that function?",
+    "Does asyncio have something similar?",
+]
+
+
+class PromptCacheStub:
+    """Single-slot imitation of Ollama's prompt cache."""
+
+    def __init__(self):
+        self.cached_text = ""
+        self.turn = 0
+
+    @staticmethod
+    def _render(messages: list[dict]) -> str:
+        return "".join(f"<|{message['role']}|>{message['content']}" for message in messages)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        prompt = self._render(payload["messages"])
+        common = 0
+        for a, b in zip(prompt, self.cached_text):
+            if a != b:
+                break
+            common += 1
+        self.turn += 1
+        content = json.dumps(
+            {
+                "intent": "chat",
+                "plan": ["Answer the question."],
+                "proposed_command": None,
+                "response": f"Answer number {self.turn}, with a few sentences of explanation.",
+            }
+        )
+        self.cached_text = prompt + f"<|assistant|>{content}"
+        return httpx.Response(
+            200,
+            json={
+                "model": payload["model"],
+                "message": {"role": "assistant", "content": content},
+                "done": True,
+                "prompt_eval_count": -(-(len(prompt) - common) // CHARS_PER_TOKEN),
+            },
+        )
+
+
+def run_conversation(router: IntentRouter, turns: int) -> list[int]:
+    memory = ConversationMemory()
+    counts = []
+    for turn in range(turns):
+        request = ChatRequest(message=QUESTIONS[turn % len(QUESTIONS)], session_id="bench")
+        history = memory.get_history("bench")
+        result = []
+        messages = router._build_messages(request, history)
+        content = ollama_client.chat(messages, on_complete=result.append)
+        reply = json.loads(content)
+        router._remember_turn(request, Intent(reply["intent"]), content)
+        memory.add_message("bench", "user", request.message)
+        memory.add_message("bench", "assistant", reply["response"])
+        counts.append(result[0].prompt_eval_count or 0)
+    return counts
+
+
+def configure_client(live: bool) -> None:
+    if live:
+        ollama_client.refresh_detection()
+        return
+    stub = PromptCacheStub()
+    ollama_client.model = "gpt-oss:20b"
+    ollama_client.client = httpx.Client(base_url=ollama_client.base_url, transport=httpx.MockTransport(stub.handle))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--live", action="store_true", help="Use the real Ollama server instead of the stub.")
+    args = parser.parse_args()
+
+    for session_prompting in (False, True):
+        configure_client(args.live)
+        router = IntentRouter(session_prompting=session_prompting)
+        counts = run_conversation(router, args.turns)
+        label = "session" if session_prompting else "legacy"
+        print(
+            f"{label:>8}: total_prompt_eval={sum(counts):7d} "
+            f"median_per_turn={statistics.median(counts):7.0f} last_turn={counts[-1]:6d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Shell worker pool benchmark: latency of short commands when every command
+starts a new shell (as PowerShellTool did with powershell.exe) versus running
+them in long-lived pooled workers.
+
+On Windows the default shell is powershell.exe, whose startup dominates
+commands like `git status`; elsewhere bash stands in, so the gap is smaller
+but the shape is the same. Pass --shell pwsh to measure PowerShell 7.
+
+Run from the ai-operator directory:
+    python -m benchmarks.bench_shell_pool --commands 200
+    python -m benchmarks.bench_shell_pool --shell pwsh --commands 50
+"""
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+
+from app.tools.shell_pool import ShellWorkerPool, resolve_dialect
+
+COMMANDS = {
+    "bash": ["echo hello", "pwd", "ls", "git --version"],
+    "powershell": ["Write-Output hello", "Get-Location", "Get-ChildItem", "git --version"],
+}
+
+
+def spawn_argv(shell: str, command: str) -> list[str]:
+    dialect = resolve_dialect(shell)
+    if dialect.name == "bash":
+        return [dialect.argv[0], "--noprofile", "--norc", "-c", command]
+    return [dialect.argv[0], "-NoProfile", "-Command", command]
+
+
+def measure(run, commands: list[str], count: int) -> list[float]:
+    latencies = []
+    for i in range(count):
+        started = time.perf_counter()
+        run(commands[i % len(commands)])
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: list[float], baseline: float | None) -> float:
+    median = statistics.median(latencies)
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    speedup = f"  ({baseline / median:.1f}x)" if baseline else ""
+    print(f"{name:<28} median {median:>8.2f}ms  p95 {p95:>8.2f}ms{speedup}")
+    return median
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shell", default="auto", choices=["auto", "powershell", "pwsh", "bash"])
+    parser.add_argument("--commands", type=int, default=200)
+    parser.add_argument("--max-commands-per-worker", type=int, default=100)
+    args = parser.parse_args()
+
+    dialect = resolve_dialect(args.shell)
+    commands = COMMANDS[dialect.name]
+    with tempfile.TemporaryDirectory() as cwd:
+        spawned = measure(
+            lambda command: subprocess.run(
+                spawn_argv(args.shell, command), cwd=cwd, capture_output=True, text=True, check=False
+            ),
+            commands,
+            args.commands,
+        )
+        baseline = report("new shell per command", spawned, None)
+
+        pool = ShellWorkerPool(shell=args.shell, size=1, max_commands_per_worker=args.max_commands_per_worker)
+        try:
+            started = time.perf_counter()
+            pool.warm()
+            print(f"{'pool warm-up':<28} {(time.perf_counter() - started) * 1000:>15.2f}ms")
+            pooled = measure(lambda command: pool.run(command, cwd), commands, args.commands)
+            report("pooled worker", pooled, baseline)
+            print(f"pool stats: {pool.stats()}")
+        finally:
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
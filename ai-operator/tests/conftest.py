@@ -0,0 +1,19 @@
+import os
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database before any app module creates its engine.
+_TEST_DB_DIR = tempfile.mkdtemp(prefix="ai-operator-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DB_DIR, 'test.db')}"
+
+from app.db.init_db import init_db  # noqa: E402
+from app.llm.cache import llm_response_cache  # noqa: E402
+
+init_db()
+
+
+@pytest.fixture(autouse=True)
+def reset_llm_response_cache():
+    llm_response_cache.clear()
+    yield
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import chat
+from app.core.fast_path import FastPathClassifier
+from app.core.router import IntentRouter
+from app.llm.admission import AdmissionController, OllamaOverloadedError
+from app.llm.client import ollama_client
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_limits_concurrency_and_queues_in_order():
+    controller = AdmissionController(max_concurrency=2, max_queue=10, initial_service_time_sec=0.01)
+    running = 0
+    peak = 0
+    order = []
+
+    async def job(i):
+        nonlocal running, peak
+        async with controller.slot():
+            running += 1
+            peak = max(peak, running)
+            order.append(i)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+    async def run():
+        await asyncio.gather(*[job(i) for i in range(6)])
+
+    asyncio.run(run())
+    stats = controller.stats()
+    assert peak == 2
+    assert order == list(range(6))
+    assert stats["admitted"] == 6
+    assert stats["queued"] == 4
+    assert stats["active"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["max_wait_sec"] > 0
+
+
+def test_rejects_when_queue_is_full_with_retry_after():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, initial_service_time_sec=3.0)
+
+    async def hold(release: asyncio.Event):
+        async with controller.slot():
+            await release.wait()
+
+    async def run():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold(release))
+        queued = asyncio.ensure_future(hold(release))
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(OllamaOverloadedError) as excinfo:
+                await controller.acquire()
+        finally:
+            release.set()
+            await asyncio.gather(holder, queued)
+        return excinfo.value
+
+    error = asyncio.run(run())
+    assert error.retry_after_header == "6"
+    assert controller.stats()["rejected_queue_full"] == 1
+
+
+def test_rejects_requests_that_cannot_meet_deadline():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, initial_service_time_sec=10.0)
+
+    async def run():
+        await controller.acquire()
+        try:
+            with pytest.raises(OllamaOverloadedError):
+                await controller.acquire(deadline=time.monotonic() + 5)
+        finally:
+            controller.release(0.01)
+
+    asyncio.run(run())
+    assert controller.stats()["rejected_deadline"] == 1
+
+
+def test_drops_queued_request_when_deadline_passes():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, initial_service_time_sec=0.05)
+
+    async def run():
+        await controller.acquire()
+        try:
+            with pytest.raises(OllamaOverloadedError, match="could no longer finish in time"):
+                await controller.acquire(deadline=time.monotonic() + 0.15)
+        finally:
+            controller.release(0.05)
+
+    asyncio.run(run())
+    stats = controller.stats()
+    assert stats["dropped_deadline"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["active"] == 0
+
+
+def test_chat_returns_429_when_overloaded(monkeypatch):
+    async def overloaded(*args, **kwargs):
+        raise OllamaOverloadedError("Ollama request queue is full (32 waiting).", retry_after_sec=12.2)
+
+    monkeypatch.setattr(ollama_client, "model", "gpt-oss:20b")
+    monkeypatch.setattr(ollama_client, "achat", overloaded)
+
+    response = client.post("/chat", json={"message": "hello while busy"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "13"
+    assert "queue is full" in response.json()["detail"]
+
+
+def test_stream_rejected_after_the_intent_event_ends_with_done(monkeypatch):
+    async def phase_one(*args, **kwargs):
+        return json.dumps({"intent": "chat", "proposed_command": None})
+
+    async def phase_two_overloaded(*args, **kwargs):
+        raise OllamaOverloadedError("Ollama request queue is full (32 waiting).", retry_after_sec=4.5)
+        yield  # pragma: no cover - makes this an async generator
+
+    monkeypatch.setattr(ollama_client, "model", "gpt-oss:20b")
+    monkeypatch.setattr(ollama_client, "achat", phase_one)
+    monkeypatch.setattr(ollama_client, "achat_stream", phase_two_overloaded)
+    monkeypatch.setattr(
+        chat, "intent_router", IntentRouter(fast_path=FastPathClassifier(enabled=False), two_phase=True)
+    )
+
+    response = client.post("/chat/stream", json={"message": "tell me a story while busy"})
+
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["event"] for event in events] == ["intent", "done"]
+    assert events[-1]["result"]["plan"] == ["LLM is busy."]
+    assert "try again in 5 seconds" in events[-1]["result"]["response"]
+
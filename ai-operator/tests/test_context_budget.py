@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import httpx
+import respx
+
+from app.core.fast_path import FastPathClassifier
+from app.core.memory import MemoryEntry
+from app.core.router import SUMMARY_PREFIX, IntentRouter
+from app.core.summarizer import ConversationSummarizer
+from app.core.tokens import ContextBudget, estimate_message_tokens, estimate_tokens
+from app.llm.client import OllamaClient, ollama_client
+from app.models.schemas import ChatRequest, Intent
+
+
+def _router(summarizer, session_prompting, history_tokens=200, num_ctx=4096):
+    return IntentRouter(
+        fast_path=FastPathClassifier(enabled=False),
+        session_prompting=session_prompting,
+        context_budget=ContextBudget(num_ctx=num_ctx, history_tokens=history_tokens),
+        summarizer=summarizer,
+    )
+
+
+def test_token_estimate_and_history_budget():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("안녕") == 2  # 6 UTF-8 bytes
+
+    budget = ContextBudget(num_ctx=2048, history_tokens=1536, response_reserve_tokens=1024)
+    assert budget.history_budget(fixed_tokens=24) == 1000
+    assert budget.history_budget(fixed_tokens=5000) == 0
+
+    older, recent = ContextBudget.split_recent([5, 5, 5, 5], 12, lambda item: item)
+    assert (older, recent) == ([5, 5], [5, 5])
+
+
+def test_legacy_history_is_budgeted_and_older_turns_are_folded():
+    summarizer = ConversationSummarizer(ollama_client)
+    router = _router(summarizer, session_prompting=False, history_tokens=60)
+    trace = "Traceback (most recent call last):\n" + "  File \"app.py\", line 1, in <module>\n" * 20
+    history = [
+        MemoryEntry("user", trace),
+        MemoryEntry("assistant", "That is a NameError."),
+        MemoryEntry("user", "thanks"),
+        MemoryEntry("assistant", "You're welcome."),
+    ]
+
+    messages = router._build_messages(ChatRequest(message="next", session_id="legacy"), history)
+
+    assert "Traceback" not in messages[1]["content"]
+    assert "User: thanks\nAssistant: You're welcome." in messages[1]["content"]
+    stats = summarizer.stats()
+    assert stats["folded_turns"] == 1
+    assert stats["pending_turns"] == 1
+
+    # Re-sending the same overflow does not queue it again.
+    router._build_messages(ChatRequest(message="again", session_id="legacy"), history)
+    assert summarizer.stats()["pending_turns"] == 1
+
+
+@respx.mock
+def test_background_summary_is_added_to_the_prompt():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    summary_route = respx.post("http://localhost:11434/api/chat").mock(
+        return_value=httpx.Response(200, json={"message": {"content": "User debugged a NameError in app.py."}})
+    )
+    client = OllamaClient()
+    client.refresh_detection()
+    summarizer = ConversationSummarizer(client, max_summary_tokens=64)
+    router = _router(summarizer, session_prompting=True, history_tokens=40)
+
+    async def scenario():
+        summarizer.start()
+        router._build_messages(ChatRequest(message="hi", session_id="s"), [])
+        for turn in range(4):
+            router._remember_turn(
+                ChatRequest(message=f"question {turn}", session_id="s"),
+                Intent.CHAT,
+                json.dumps({"intent": "chat", "response": f"answer {turn}"}),
+            )
+        for _ in range(100):
+            if summarizer.get("s"):
+                break
+            await asyncio.sleep(0.01)
+        await summarizer.stop()
+
+    asyncio.run(scenario())
+
+    assert summarizer.get("s") == "User debugged a NameError in app.py."
+    summary_prompt = json.loads(summary_route.calls[0].request.content)["messages"][1]["content"]
+    assert "User: question 0\nAssistant: answer 0" in summary_prompt
+
+    history = [MemoryEntry("user", "question 3"), MemoryEntry("assistant", "answer 3")]
+    messages = router._build_messages(ChatRequest(message="and now?", session_id="s"), history)
+    assert messages[1] == {"role": "system", "content": SUMMARY_PREFIX + "User debugged a NameError in app.py."}
+    assert messages[-1] == {"role": "user", "content": "User: and now?"}
+
+
+def test_oversized_message_trims_history_for_that_request_only():
+    summarizer = ConversationSummarizer(ollama_client, enabled=False)
+    router = _router(summarizer, session_prompting=True, history_tokens=400, num_ctx=2600)
+    history = [MemoryEntry("user", "u" * 200), MemoryEntry("assistant", "a" * 200)] * 2
+    router._build_messages(ChatRequest(message="seed", session_id="big"), history)
+
+    messages = router._build_messages(ChatRequest(message="x" * 2000, session_id="big"), history)
+
+    assert estimate_message_tokens(messages) <= 2600 - router.context_budget.response_reserve_tokens
+    assert len(messages) == 4  # system, one user/assistant pair, the huge message
+    assert len(router.session_prompts.get("big")) == 4
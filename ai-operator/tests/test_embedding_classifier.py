@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import httpx
+import numpy as np
+import respx
+
+from app.core.embedding_classifier import EmbeddingIntentClassifier
+from app.core.fast_path import FastPathClassifier
+from app.core.router import IntentRouter
+from app.core.vector_index import VectorIndex
+from app.llm.client import OllamaClient, ollama_client
+from app.llm.prompts import ANSWER_SYSTEM_PROMPT
+from app.models.schemas import ChatRequest, Intent
+
+EXEMPLARS = (
+    ("hello there", Intent.CHAT),
+    ("good morning", Intent.CHAT),
+    ("explain python code", Intent.CODE_HELP),
+    ("debug python error", Intent.CODE_HELP),
+    ("run git status", Intent.SYSTEM_TASK),
+    ("run the tests", Intent.SYSTEM_TASK),
+)
+
+
+def _vector(text):
+    # Toy embedding: one axis per topic, so similarity follows the keywords.
+    return [
+        float(any(word in text for word in ("hello", "morning", "hi"))),
+        float(any(word in text for word in ("python", "code", "error"))),
+        float("run" in text),
+        0.1,
+    ]
+
+
+def _embed_handler(request):
+    texts = json.loads(request.content)["input"]
+    return httpx.Response(200, json={"embeddings": [_vector(text) for text in texts]})
+
+
+def _classifier(tmp_path, client=None):
+    return EmbeddingIntentClassifier(
+        client or ollama_client, enabled=True, index_dir=tmp_path, k=2, threshold=0.8, exemplars=EXEMPLARS
+    )
+
+
+def test_vector_index_round_trips_through_mmap(tmp_path):
+    index = VectorIndex.build([[3, 4], [1, 0], [0, 2]], ["a", "b", "c"], meta={"fingerprint": "x"})
+    index.save(tmp_path)
+
+    loaded = VectorIndex.load(tmp_path)
+
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.meta == {"fingerprint": "x"}
+    assert [label for label, _ in loaded.search([0, 1], k=2)] == ["c", "a"]
+    assert loaded.search([0, 1], k=1)[0][1] == 1.0
+    assert VectorIndex.load(tmp_path / "missing") is None
+
+
+@respx.mock
+def test_index_is_built_once_then_loaded_from_disk(tmp_path):
+    embed_route = respx.post("http://localhost:11434/api/embed").mock(side_effect=_embed_handler)
+    client = OllamaClient()
+
+    first = _classifier(tmp_path, client)
+    assert first.classify("hello, how are you") == Intent.CHAT
+    assert first.classify("please run git status") is None  # system tasks need command extraction
+    assert first.classify("python error in my code") == Intent.CODE_HELP
+    assert json.loads(embed_route.calls[0].request.content)["model"] == client.embed_model
+    assert first.stats()["index_source"] == "built"
+
+    second = _classifier(tmp_path, client)
+    asyncio.run(second.aensure_index())
+    assert second.stats()["index_source"] == "disk"
+    assert embed_route.call_count == 4  # one exemplar batch + three queries
+
+    stats = first.stats()
+    assert (stats["checked"], stats["hits"], stats["needs_command"]) == (3, 2, 1)
+    assert stats["hits_by_intent"] == {"chat": 1, "code_help": 1}
+
+
+@respx.mock
+def test_router_skips_the_classification_call_for_a_confident_match(tmp_path):
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    ollama_client.refresh_detection()
+    respx.post("http://localhost:11434/api/embed").mock(side_effect=_embed_handler)
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(
+        return_value=httpx.Response(200, json={"message": {"content": "Hello! How can I help?"}, "done": True})
+    )
+    router = IntentRouter(
+        fast_path=FastPathClassifier(enabled=False), two_phase=False, embeddings=_classifier(tmp_path)
+    )
+
+    result = asyncio.run(router.classify_intent_async(ChatRequest(message="hello friend", bypass_cache=True)))
+
+    assert result == (Intent.CHAT, ["Answer the message."], None, "Hello! How can I help?")
+    assert chat_route.call_count == 1
+    assert json.loads(chat_route.calls[0].request.content)["messages"][0]["content"] == ANSWER_SYSTEM_PROMPT
+
+
+@respx.mock
+def test_classifier_falls_back_when_ollama_cannot_embed(tmp_path):
+    respx.post("http://localhost:11434/api/embed").mock(return_value=httpx.Response(404, text="model not found"))
+    classifier = _classifier(tmp_path, OllamaClient())
+
+    assert classifier.classify("hello") is None
+    assert classifier.classify("hello again") is None
+
+    # The failed build is not retried on every message.
+    assert respx.calls.call_count == 1
+    assert classifier.stats()["index_size"] == 0
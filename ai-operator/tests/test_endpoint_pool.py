@@ -0,0 +1,154 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import respx
+
+from app.llm.client import OllamaClient, OllamaConnectionError
+
+URL_A = "http://ollama-a:11434"
+URL_B = "http://ollama-b:11434"
+
+
+def _tags(*names):
+    return httpx.Response(200, json={"models": [{"name": name} for name in names]})
+
+
+def _reply(content):
+    return httpx.Response(200, json={"message": {"role": "assistant", "content": content}, "done": True})
+
+
+@pytest.fixture
+def pool_client(monkeypatch):
+    monkeypatch.setenv("OLLAMA_BASE_URLS", f"{URL_A}, {URL_B}")
+    monkeypatch.setenv("OLLAMA_SINGLE_FLIGHT", "false")
+    return OllamaClient()
+
+
+@respx.mock
+def test_detection_runs_per_endpoint(pool_client):
+    respx.get(f"{URL_A}/api/tags").mock(return_value=_tags("llama3.1:8b"))
+    respx.get(f"{URL_B}/api/tags").mock(return_value=_tags("gpt-oss:20b", "llama3.1:8b"))
+
+    detection = pool_client.refresh_detection()
+
+    assert detection.ollama_up is True
+    assert detection.selected_model == "gpt-oss:20b"
+    assert detection.fallback_used is False
+    assert "2/2 Ollama endpoints usable" in detection.reason
+    assert [endpoint.model for endpoint in pool_client.endpoints] == ["llama3.1:8b", "gpt-oss:20b"]
+    assert pool_client.admission.max_concurrency == 8
+
+
+@respx.mock
+def test_endpoint_without_selected_model_gets_its_own_model(pool_client):
+    respx.get(f"{URL_A}/api/tags").mock(return_value=_tags("llama3.1:8b"))
+    respx.get(f"{URL_B}/api/tags").mock(return_value=_tags("gpt-oss:20b"))
+    route_a = respx.post(f"{URL_A}/api/chat").mock(return_value=_reply("from a"))
+    route_b = respx.post(f"{URL_B}/api/chat").mock(return_value=_reply("from b"))
+    pool_client.refresh_detection()
+
+    answers = {pool_client.chat([{"role": "user", "content": f"q{i}"}]) for i in range(4)}
+
+    assert answers == {"from a", "from b"}
+    assert json.loads(route_a.calls[0].request.content)["model"] == "llama3.1:8b"
+    assert json.loads(route_b.calls[0].request.content)["model"] == "gpt-oss:20b"
+
+
+@respx.mock
+def test_requests_go_to_least_outstanding_endpoint(pool_client):
+    respx.get(f"{URL_A}/api/tags").mock(return_value=_tags("gpt-oss:20b"))
+    respx.get(f"{URL_B}/api/tags").mock(return_value=_tags("gpt-oss:20b"))
+
+    async def slow(request):
+        await asyncio.sleep(0.1)
+        return _reply("slow")
+
+    async def fast(request):
+        await asyncio.sleep(0.01)
+        return _reply("fast")
+
+    route_a = respx.post(f"{URL_A}/api/chat").mock(side_effect=slow)
+    route_b = respx.post(f"{URL_B}/api/chat").mock(side_effect=fast)
+
+    async def run():
+        await pool_client.arefresh_detection()
+        try:
+            # The first two requests split across both endpoints; while A is still busy,
+            # the later ones all land on B.
+            first = [asyncio.ensure_future(pool_client.achat([{"role": "user", "content": f"q{i}"}])) for i in range(2)]
+            await asyncio.sleep(0.03)
+            for i in range(3):
+                await pool_client.achat([{"role": "user", "content": f"later{i}"}])
+            await asyncio.gather(*first)
+        finally:
+            await pool_client.aclose()
+
+    asyncio.run(run())
+    assert route_a.call_count == 1
+    assert route_b.call_count == 4
+    assert all(endpoint["outstanding"] == 0 for endpoint in pool_client.pool.stats())
+
+
+@respx.mock
+def test_refused_endpoint_is_ejected_and_reinstated_after_probe(pool_client):
+    tags_a = respx.get(f"{URL_A}/api/tags").mock(return_value=_tags("gpt-oss:20b"))
+    respx.get(f"{URL_B}/api/tags").mock(return_value=_tags("gpt-oss:20b"))
+    route_a = respx.post(f"{URL_A}/api/chat").mock(side_effect=httpx.ConnectError("Connection refused"))
+    route_b = respx.post(f"{URL_B}/api/chat").mock(return_value=_reply("from b"))
+    pool_client.refresh_detection()
+
+    answers = [pool_client.chat([{"role": "user", "content": f"q{i}"}]) for i in range(4)]
+
+    assert answers == ["from b"] * 4
+    assert route_a.call_count == 1
+    endpoint_a = pool_client.pool.stats()[0]
+    assert endpoint_a["ejected"] is True
+    assert endpoint_a["ejections"] == 1
+
+    tags_a.mock(side_effect=httpx.ConnectError("Connection refused"))
+    pool_client.refresh_detection()
+    assert pool_client.endpoints[0].ejected is True
+
+    tags_a.mock(return_value=_tags("gpt-oss:20b"))
+    route_a.mock(return_value=_reply("from a"))
+    pool_client.refresh_detection()
+    assert pool_client.endpoints[0].ejected is False
+
+    answers = {pool_client.chat([{"role": "user", "content": f"again{i}"}]) for i in range(2)}
+    assert answers == {"from a", "from b"}
+
+
+@respx.mock
+def test_error_when_every_endpoint_is_down(pool_client):
+    respx.post(f"{URL_A}/api/chat").mock(side_effect=httpx.ConnectError("Connection refused"))
+    respx.post(f"{URL_B}/api/chat").mock(side_effect=httpx.ConnectError("Connection refused"))
+    pool_client.model = "gpt-oss:20b"
+
+    with pytest.raises(OllamaConnectionError):
+        pool_client.chat([{"role": "user", "content": "hi"}])
+    assert all(endpoint.ejected for endpoint in pool_client.endpoints)
+
+
+@respx.mock
+def test_stream_fails_over_before_first_chunk(pool_client):
+    respx.post(f"{URL_A}/api/chat").mock(side_effect=httpx.ConnectError("Connection refused"))
+    respx.post(f"{URL_B}/api/chat").mock(
+        return_value=httpx.Response(
+            200,
+            content=b'{"message":{"content":"he"}}\n{"message":{"content":"llo"},"done":true}\n',
+        )
+    )
+    pool_client.model = "gpt-oss:20b"
+    # Make sure the refused endpoint is tried first.
+    pool_client.endpoints[1].outstanding = 1
+
+    async def run():
+        try:
+            return [chunk async for chunk in pool_client.achat_stream([{"role": "user", "content": "hi"}])]
+        finally:
+            await pool_client.aclose()
+
+    assert asyncio.run(run()) == ["he", "llo"]
+    assert pool_client.endpoints[0].ejected is True
@@ -0,0 +1,135 @@
+import json
+import os
+
+import httpx
+import pytest
+import respx
+from fastapi.testclient import TestClient
+
+from app.api.chat import intent_router
+from app.core.fast_path import IDENTITY_RESPONSE, FastPathClassifier
+from app.core import policy as policy_module
+from app.core.policy import PolicyEnforcer, get_policy_enforcer
+from app.main import app
+from app.models.schemas import Intent
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "message, command",
+    [
+        ("run git status", "git status"),
+        ("Run git status.", "git status"),
+        ("git diff", "git diff"),
+        ("git diff --stat", "git diff --stat"),
+        ("dir", "dir"),
+        ("please execute docker ps", "docker ps"),
+        ("Can you run git status for me?", "git status"),
+        ("ls -la", "ls -la"),
+        ("python -m pytest tests/test_policy.py", "python -m pytest tests/test_policy.py"),
+        ("git status 실행해줘", "git status"),
+        ("run pytest -k now", "pytest -k now"),
+        ("pytest ./tests/unit please", "pytest ./tests/unit"),
+        ("git status now", "git status"),
+    ],
+)
+def test_explicit_commands_skip_the_llm(message, command):
+    intent, plan, proposed_command, response_text = FastPathClassifier().classify(message)
+
+    assert intent == Intent.SYSTEM_TASK
+    assert proposed_command == command
+    assert f"Propose executing the command: '{command}'." in plan
+    assert response_text == f"I can run '{command}'. Please approve execution."
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "list files in the current directory",
+        "run rm -rf /",
+        "run echo hello > notes.txt",
+        "git status | more",
+        "git diff HEAD~1",
+        "lsblk",
+        "what does git status do?",
+        "run git status\nand then git diff",
+        "pytest keeps failing",
+        "git diff is confusing",
+        "dir listing is slow",
+        "ls is empty",
+        "pytest -k now",
+    ],
+)
+def test_ambiguous_or_unlisted_messages_go_to_the_llm(message):
+    assert FastPathClassifier().classify(message) is None
+
+
+def test_identity_questions_are_answered_directly():
+    intent, _, proposed_command, response_text = FastPathClassifier().classify("Who made you?")
+
+    assert intent == Intent.CHAT
+    assert proposed_command is None
+    assert response_text == IDENTITY_RESPONSE
+
+
+def test_stats_and_switch():
+    fast_path = FastPathClassifier()
+    fast_path.classify("run git status")
+    fast_path.classify("누가 만들었어?")
+    fast_path.classify("tell me a joke")
+    fast_path.classify("explain closures")
+
+    stats = fast_path.stats()
+    assert stats["checked"] == 4
+    assert stats["command_hits"] == 1
+    assert stats["identity_hits"] == 1
+    assert stats["hit_rate"] == 0.5
+
+    disabled = FastPathClassifier(enabled=False)
+    assert disabled.classify("run git status") is None
+    assert disabled.stats()["checked"] == 0
+
+
+@respx.mock
+def test_chat_endpoint_creates_approval_without_calling_ollama(monkeypatch):
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(
+        return_value=httpx.Response(500, json={"error": "should not be called"})
+    )
+    monkeypatch.setattr(intent_router.fast_path, "enabled", True)
+    before = intent_router.fast_path.stats()["command_hits"]
+
+    response = client.post(
+        "/chat",
+        json={"message": "run git status", "cwd": str(get_policy_enforcer().sandbox_root)},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["intent"] == Intent.SYSTEM_TASK
+    assert body["proposed_command"] == "git status"
+    assert body["requires_approval"] is True
+    assert body["approval_id"] is not None
+    assert chat_route.call_count == 0
+    assert intent_router.fast_path.stats()["command_hits"] == before + 1
+    assert client.get("/metrics").json()["fast_path"]["command_hits"] == before + 1
+
+
+def test_fast_path_follows_reloaded_policy_rules(tmp_path, monkeypatch):
+    sandbox = tmp_path / "sandbox"
+    sandbox.mkdir()
+    rules_file = tmp_path / "policy.json"
+    rules_file.write_text(json.dumps({"allowed_prefixes": ["git status"]}), encoding="utf-8")
+    os.utime(rules_file, ns=(10**18, 10**18))
+    policy = PolicyEnforcer(sandbox_root=str(sandbox), rules_file=str(rules_file))
+    monkeypatch.setattr(policy_module, "_policy_enforcer", policy)
+    fast_path = FastPathClassifier()
+
+    assert fast_path.classify("run make test") is None
+    assert fast_path.classify("run git status")[2] == "git status"
+
+    rules_file.write_text(json.dumps({"allowed_prefixes": ["make test"]}), encoding="utf-8")
+    os.utime(rules_file, ns=(10**18 + 1, 10**18 + 1))
+    assert policy.reload_rules() is True
+    assert fast_path.classify("run make test")[2] == "make test"
+    assert fast_path.classify("run git status") is None
@@ -1,7 +1,11 @@
+import asyncio
+
 import httpx
 import respx
 from fastapi.testclient import TestClient
 from app.main import app
+from app.llm.client import OllamaClient, ollama_client
+from app.llm.refresher import ModelDetectionRefresher
 
 client = TestClient(app)
 
@@ -10,6 +14,7 @@ def test_health_check_base_status():
     respx.get("http://localhost:11434/api/tags").mock(
         return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
     )
+    ollama_client.refresh_detection()
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json()["status"] == "ok"
@@ -18,3 +23,93 @@ def test_health_check_base_status():
     assert "model_available" in response.json()
     assert "fallback_used" in response.json()
 
+
+@respx.mock
+def test_health_endpoints_do_not_call_ollama():
+    tags_route = respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    ollama_client.refresh_detection()
+    calls_after_refresh = tags_route.call_count
+
+    assert client.get("/health").status_code == 200
+    assert client.get("/health/live").json() == {"status": "ok"}
+    ready = client.get("/health/ready")
+
+    assert ready.status_code == 200
+    assert ready.json()["ready"] is True
+    assert ready.json()["model"] == "gpt-oss:20b"
+    assert tags_route.call_count == calls_after_refresh
+
+
+@respx.mock
+def test_readiness_is_503_when_ollama_down():
+    respx.get("http://localhost:11434/api/tags").mock(side_effect=httpx.ConnectError("Connection refused"))
+    ollama_client.refresh_detection()
+
+    response = client.get("/health/ready")
+
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
+    assert response.json()["ollama"] == "down"
+    assert client.get("/health/live").status_code == 200
+
+
+@respx.mock
+def test_refresher_refreshes_immediately_after_connection_error():
+    tags_route = respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    respx.post("http://localhost:11434/api/chat").mock(side_effect=httpx.ConnectError("Connection refused"))
+    ollama = OllamaClient()
+    refresher = ModelDetectionRefresher(ollama, ttl_sec=60, retry_sec=60)
+
+    probes = []
+
+    async def run():
+        refresher.start()
+        try:
+            await asyncio.sleep(0.05)
+            probes.append(tags_route.call_count)
+            try:
+                await ollama.achat([{"role": "user", "content": "hi"}])
+            except Exception:
+                pass
+            # The first triggered refresh waits out the minimum refresh interval.
+            await asyncio.sleep(1.2)
+        finally:
+            await refresher.stop()
+            await ollama.aclose()
+
+    asyncio.run(run())
+    assert tags_route.call_count == probes[0] + 1
+    assert refresher.stats()["triggered_refreshes"] == 1
+    assert refresher.running is False
+
+
+@respx.mock
+def test_client_construction_does_no_network_io():
+    tags_route = respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    fresh = OllamaClient()
+
+    assert tags_route.call_count == 0
+    assert fresh.model is None
+    assert fresh.detection_age_sec() is None
+    assert fresh.get_detection_status().ollama_up is False
+
+
+@respx.mock
+def test_lifespan_runs_model_detection_at_startup(monkeypatch):
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    monkeypatch.setattr(ollama_client, "model", None)
+    monkeypatch.setattr(ollama_client, "detection_checked_at", None)
+
+    with TestClient(app) as started_client:
+        ready = started_client.get("/health/ready")
+
+    assert ready.status_code == 200
+    assert ollama_client.model == "gpt-oss:20b"
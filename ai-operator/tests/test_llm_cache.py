@@ -0,0 +1,171 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import respx
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.fast_path import FastPathClassifier
+from app.core.memory import MemoryEntry
+from app.core.router import IntentRouter
+from app.core.summarizer import ConversationSummarizer
+from app.core.tokens import ContextBudget
+from app.llm.cache import LLMResponseCache, llm_response_cache
+from app.llm.client import ollama_client
+from app.main import app
+from app.models.schemas import ChatRequest, Intent
+
+client = TestClient(app)
+
+
+def _session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}", connect_args={"check_same_thread": False})
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def test_key_depends_on_model_messages_and_variant():
+    messages = [{"role": "system", "content": "prompt"}, {"role": "user", "content": "User: run dir"}]
+    base = LLMResponseCache.build_key("m1", [messages])
+    assert base == LLMResponseCache.build_key("m1", [list(messages)])
+    assert base != LLMResponseCache.build_key("m2", [messages])
+    assert base != LLMResponseCache.build_key("m1", [messages[1:]])
+    assert base != LLMResponseCache.build_key("m1", [messages], "classify\nanswer")
+    assert base != LLMResponseCache.build_key("m1", [messages, messages])
+
+
+def test_router_key_follows_the_messages_actually_sent(monkeypatch):
+    summarizer = ConversationSummarizer(ollama_client, enabled=False)
+    router = IntentRouter(
+        fast_path=FastPathClassifier(enabled=False),
+        session_prompting=False,
+        context_budget=ContextBudget(num_ctx=4096, history_tokens=1536),
+        summarizer=summarizer,
+    )
+    request = ChatRequest(message="and now?", session_id="key")
+    history = [MemoryEntry(role="user", content=f"question {turn}") for turn in range(12)]
+
+    def key(history):
+        return LLMResponseCache.build_key("m", router._build_prompts(request, history))
+
+    base = key(history)
+    # Older turns that still fit in the token budget are part of the prompt, and so of the key.
+    assert base != key([MemoryEntry(role="user", content="something else"), *history[1:]])
+    monkeypatch.setattr(summarizer, "get", lambda session_id: "User asked twelve questions.")
+    assert base != key(history)
+
+
+def test_memory_tier_lru_eviction_and_ttl(tmp_path):
+    cache = LLMResponseCache(max_entries=2, ttl_sec=60, persist=False)
+    cache.put("a", "m", "A")
+    cache.put("b", "m", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "m", "C")  # evicts "b", the least recently used
+
+    assert cache.get("b") is None
+    assert cache.get("c") == "C"
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 1
+
+    expired = LLMResponseCache(ttl_sec=0, persist=False)
+    expired.put("a", "m", "A")
+    assert expired.get("a") is None
+    assert expired.stats()["expirations"] == 1
+
+
+def test_persistent_tier_survives_restart(tmp_path):
+    factory = _session_factory(tmp_path)
+    LLMResponseCache(session_factory=factory).put("key", "gpt-oss:20b", "cached content")
+
+    restarted = LLMResponseCache(session_factory=factory)
+    assert restarted.get("key") == "cached content"
+    assert restarted.get("key") == "cached content"
+    stats = restarted.stats()
+    assert stats["persistent_hits"] == 1
+    assert stats["memory_hits"] == 1
+
+
+def test_model_change_invalidates_other_models(tmp_path):
+    factory = _session_factory(tmp_path)
+    cache = LLMResponseCache(session_factory=factory)
+    cache.put("old", "llama3.1:8b", "old answer")
+    cache.put("new", "gpt-oss:20b", "new answer")
+
+    cache.invalidate_for_model_change("llama3.1:8b", "gpt-oss:20b")
+
+    assert cache.stats()["memory_entries"] == 0
+    assert cache.get("old") is None
+    assert cache.get("new") == "new answer"
+
+
+def test_model_change_on_the_event_loop_deletes_in_a_worker_thread(tmp_path):
+    factory = _session_factory(tmp_path)
+    opened_in = []
+
+    def recording_factory():
+        opened_in.append(threading.get_ident())
+        return factory()
+
+    cache = LLMResponseCache(session_factory=recording_factory)
+    cache.put("old", "llama3.1:8b", "old answer")
+    cache.put("new", "gpt-oss:20b", "new answer")
+    opened_in.clear()
+
+    async def run():
+        cache.invalidate_for_model_change("llama3.1:8b", "gpt-oss:20b")
+        # The listener returns before touching SQLite.
+        assert opened_in == []
+        assert cache.stats()["memory_entries"] == 0
+        await asyncio.gather(*cache._pending_invalidations)
+
+    asyncio.run(run())
+
+    assert opened_in and threading.get_ident() not in opened_in
+    assert cache.get("old") is None
+    assert cache.get("new") == "new answer"
+
+
+@respx.mock
+def test_refresh_detection_with_new_model_notifies_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(llm_response_cache, "invalidate_for_model_change", lambda *args: calls.append(args))
+    monkeypatch.setattr(ollama_client, "_model_change_listeners", [llm_response_cache.invalidate_for_model_change])
+    monkeypatch.setattr(ollama_client, "_last_selected_model", "gpt-oss:20b")
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "llama3.1:8b"}]})
+    )
+
+    ollama_client.refresh_detection()
+    assert calls == [("gpt-oss:20b", "llama3.1:8b")]
+
+
+@respx.mock
+def test_chat_uses_cache_and_honours_bypass_flag():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    ollama_client.refresh_detection()
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(return_value=httpx.Response(200, json={
+        "message": {"content": json.dumps({
+            "intent": Intent.CHAT.value,
+            "plan": ["Reply."],
+            "proposed_command": None,
+            "response": "cached hello",
+        })}
+    }))
+    payload = {"message": "cache me please", "cwd": "."}
+    hits_before = client.get("/metrics").json()["llm_cache"]["memory_hits"]
+
+    first = client.post("/chat", json={**payload, "session_id": "cache-a"})
+    second = client.post("/chat", json={**payload, "session_id": "cache-b"})
+    bypassed = client.post("/chat", json={**payload, "session_id": "cache-c", "bypass_cache": True})
+
+    assert first.json()["response"] == second.json()["response"] == "cached hello"
+    assert bypassed.json()["response"] == "cached hello"
+    assert chat_route.call_count == 2
+    metrics = client.get("/metrics").json()["llm_cache"]
+    assert metrics["memory_hits"] == hits_before + 1
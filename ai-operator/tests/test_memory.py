@@ -0,0 +1,241 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.memory import ConversationMemory, MemoryBackend
+from app.core.memory_backends import SQLiteMemoryBackend
+
+
+def test_least_recently_used_session_is_evicted_past_the_cap():
+    memory = ConversationMemory(max_sessions=2, idle_ttl_sec=None, stripes=1)
+    memory.add_message("a", "user", "first")
+    memory.add_message("b", "user", "second")
+    memory.get_history("a")  # "b" is now the least recently used
+    memory.add_message("c", "user", "third")
+
+    assert [entry.content for entry in memory.get_history("a")] == ["first"]
+    assert memory.get_history("b") == []
+    assert memory.stats()["evictions"] == 1
+    assert len(memory) == 2
+
+
+def test_idle_sessions_expire():
+    memory = ConversationMemory(idle_ttl_sec=0.01)
+    memory.add_message("old", "user", "hello")
+    time.sleep(0.02)
+    memory.add_message("new", "user", "hello")
+
+    assert memory.get_history("old") == []
+    stats = memory.stats()
+    assert (stats["sessions"], stats["expirations"]) == (1, 1)
+
+
+def test_byte_budget_evicts_oldest_sessions_and_tracks_trimmed_messages():
+    memory = ConversationMemory(max_messages_per_session=2, idle_ttl_sec=None, max_bytes=10, stripes=1)
+    memory.add_message("a", "user", "aaaa")
+    memory.add_message("a", "assistant", "bbbb")
+    memory.add_message("a", "user", "cc")  # "aaaa" falls out of the session
+    assert memory.stats()["bytes"] == 6
+
+    memory.add_message("b", "user", "ddddd")
+
+    assert memory.get_history("a") == []
+    stats = memory.stats()
+    assert (stats["sessions"], stats["bytes"], stats["byte_evictions"]) == (1, 5, 1)
+
+    # A single session larger than the budget is kept.
+    memory.add_message("b", "assistant", "x" * 20)
+    assert len(memory.get_history("b")) == 2
+
+
+def _sqlite_backend(tmp_path, keep=4):
+    engine = create_engine(f"sqlite:///{tmp_path / 'memory.db'}", connect_args={"check_same_thread": False})
+    return SQLiteMemoryBackend(keep, session_factory=sessionmaker(autocommit=False, autoflush=False, bind=engine))
+
+
+def test_sqlite_backend_survives_a_restart_and_trims_sessions(tmp_path):
+    backend = _sqlite_backend(tmp_path)
+    memory = ConversationMemory(max_messages_per_session=4, backend=backend)
+    for i in range(6):
+        memory.add_message("s1", "user", f"message {i}")  # no writer running: written through
+
+    restarted = ConversationMemory(max_messages_per_session=4, backend=_sqlite_backend(tmp_path))
+
+    assert [entry.content for entry in restarted.get_history("s1")] == [f"message {i}" for i in range(2, 6)]
+    assert len(backend.load("s1", 100)) == 4
+    assert restarted.stats()["cold_loads"] == 1
+
+
+def test_background_writer_batches_and_cold_reads_include_unflushed_messages(tmp_path):
+    backend = _sqlite_backend(tmp_path)
+    writes = []
+    original_write = backend.write
+    backend.write = lambda rows: (writes.append(len(rows)), original_write(rows))
+
+    async def scenario():
+        memory = ConversationMemory(max_sessions=1, backend=backend, flush_interval_sec=60, flush_batch_size=100)
+        memory.start()
+        memory.add_message("s1", "user", "hello")
+        memory.add_message("s1", "assistant", "hi there")
+        memory.add_message("s2", "user", "evicts s1 from the warm tail")
+        assert writes == []  # buffered, not written on the request path
+        history = await memory.aget_history("s1")
+        await memory.stop()
+        return memory, history
+
+    memory, history = asyncio.run(scenario())
+
+    assert [entry.content for entry in history] == ["hello", "hi there"]
+    assert writes == [3]
+    stats = memory.stats()
+    assert (stats["flushed_messages"], stats["flush_batches"], stats["pending_writes"]) == (3, 1, 0)
+
+
+def test_workers_sharing_a_backend_see_each_others_messages_after_the_refresh_interval(tmp_path):
+    worker_a = ConversationMemory(backend=_sqlite_backend(tmp_path))
+    worker_b = ConversationMemory(backend=_sqlite_backend(tmp_path), refresh_sec=0.3)
+
+    assert worker_b.get_history("s1") == []  # nothing stored yet; cached as empty for now
+    worker_a.add_message("s1", "user", "asked on worker a")
+    worker_a.add_message("s1", "assistant", "answered on worker a")
+    assert worker_b.get_history("s1") == []
+
+    time.sleep(0.35)
+    assert [entry.content for entry in worker_b.get_history("s1")] == ["asked on worker a", "answered on worker a"]
+    worker_b.add_message("s1", "user", "follow-up on worker b")
+    assert len(worker_b.get_history("s1")) == 3
+
+    time.sleep(0.35)
+    worker_a.add_message("s1", "assistant", "another answer on worker a")
+    contents = [entry.content for entry in worker_b.get_history("s1")]
+    assert contents[-2:] == ["follow-up on worker b", "another answer on worker a"]
+    stats = worker_b.stats()
+    assert (stats["cold_loads"], stats["refreshes"]) == (1, 2)
+
+
+class _ListBackend(MemoryBackend):
+    """In-process backend whose writes can be held open to test reads racing a flush."""
+
+    def __init__(self):
+        self.rows = []
+        self.loads = []
+        self.write_started = threading.Event()
+        self.release_write = threading.Event()
+        self.release_write.set()
+
+    def load(self, session_id, limit):
+        self.loads.append(session_id)
+        return [entry for stored_id, entry in self.rows if stored_id == session_id][-limit:]
+
+    def write(self, rows):
+        self.write_started.set()
+        self.release_write.wait(5)
+        self.rows.extend(rows)
+
+
+def test_backend_must_implement_load_and_write():
+    class Incomplete(MemoryBackend):
+        def load(self, session_id, limit):
+            return []
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_sessions_without_stored_rows_are_looked_up_once():
+    backend = _ListBackend()
+    memory = ConversationMemory(backend=backend, refresh_sec=60)
+
+    assert memory.get_history("new") == []
+    assert memory.get_history("new") == []
+    memory.add_message("new", "user", "hello")
+
+    assert [entry.content for entry in memory.get_history("new")] == ["hello"]
+    assert backend.loads == ["new"]
+    assert memory.stats()["cold_loads"] == 1
+
+
+def test_cold_loads_do_not_wait_for_an_unrelated_batch_write():
+    backend = _ListBackend()
+    memory = ConversationMemory(max_sessions=1, stripes=1, backend=backend)
+    backend.release_write.clear()
+    # Without a background writer, add_message writes through; this one blocks in backend.write().
+    writer = threading.Thread(target=memory.add_message, args=("busy", "user", "being written"))
+    writer.start()
+    try:
+        assert backend.write_started.wait(5)
+        loaded = []
+        reader = threading.Thread(target=lambda: loaded.append(memory.get_history("other")))
+        reader.start()
+        reader.join(2)
+        # The read of another session finished while the batch was still being written,
+        # and its (empty) session evicted "busy" from the warm tail.
+        assert not reader.is_alive() and loaded == [[]]
+        busy = []
+        waiting = threading.Thread(target=lambda: busy.append(memory.get_history("busy")))
+        waiting.start()
+        waiting.join(0.1)
+        assert waiting.is_alive()  # its rows are in flight; it waits for the batch
+    finally:
+        backend.release_write.set()
+        writer.join()
+    waiting.join(5)
+    assert [entry.content for entry in busy[0]] == ["being written"]
+
+
+def test_readers_get_a_stable_snapshot_while_writers_append():
+    memory = ConversationMemory(max_messages_per_session=3)
+    memory.add_message("s1", "user", "one")
+    snapshot = memory.get_history("s1")
+    memory.add_message("s1", "assistant", "two")
+
+    assert [entry.content for entry in snapshot] == ["one"]
+    assert [entry.content for entry in memory.get_history("s1")] == ["one", "two"]
+
+
+def test_sessions_on_different_stripes_evict_independently_and_stats_are_summed():
+    memory = ConversationMemory(max_sessions=64, idle_ttl_sec=None, stripes=4)
+    errors = []
+
+    def worker(prefix):
+        try:
+            for i in range(200):
+                session_id = f"{prefix}-{i}"
+                memory.add_message(session_id, "user", "hello")
+                memory.get_history(session_id)
+        except Exception as e:  # pragma: no cover - surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in "abcd"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = memory.stats()
+    assert errors == []
+    assert stats["stripes"] == 4
+    assert stats["sessions"] <= 64
+    assert stats["sessions"] + stats["evictions"] == 800
+    assert stats["bytes"] == stats["sessions"] * len("hello")
+
+
+def test_large_messages_are_compressed_and_read_back_unchanged():
+    answer = "def read_lines(path):\n    with open(path) as f:\n        return f.readlines()\n" * 40
+    memory = ConversationMemory(compress_min_bytes=256, stripes=1)
+    memory.add_message("s1", "user", "short question")
+    memory.add_message("s1", "assistant", answer)
+    memory.add_message("s1", "tool", "custom role")
+
+    history = memory.get_history("s1")
+
+    assert [(entry.role, entry.content) for entry in history] == [
+        ("user", "short question"),
+        ("assistant", answer),
+        ("tool", "custom role"),
+    ]
+    assert memory.stats()["bytes"] < len(answer) // 4
@@ -1,9 +1,12 @@
+import asyncio
 import pytest
 import httpx
 import respx
 import json
+from app.llm.admission import AdmissionController
 from app.llm.client import OllamaClient, OllamaConnectionError, ollama_client
-from app.models.schemas import Intent
+from app.core.router import IntentRouter
+from app.models.schemas import ChatRequest, Intent
 from app.main import app
 from fastapi.testclient import TestClient
 
@@ -16,6 +19,16 @@ def ollama_client_fixture():
     client.client = httpx.Client(base_url=client.base_url, timeout=client.timeout)
     return client
 
+@pytest.fixture
+def admission_limit(monkeypatch):
+    # The async calls below go through ollama_client's admission controller; pin its limit for the test.
+    def configure(max_concurrency, max_queue=32):
+        controller = AdmissionController(max_concurrency, max_queue, initial_service_time_sec=0.01)
+        monkeypatch.setattr(ollama_client, "admission", controller)
+        return controller
+
+    return configure
+
 @respx.mock
 def test_ollama_client_chat_success(ollama_client_fixture):
     respx.get("http://localhost:11434/api/tags").mock(
@@ -63,7 +76,9 @@ def test_health_endpoint_llm_ok():
     respx.get("http://localhost:11434/api/tags").mock(
         return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
     )
-    
+    # /health serves cached detection; refresh it the way the background refresher would.
+    ollama_client.refresh_detection()
+
     response = test_client.get("/health")
     assert response.status_code == 200
     assert response.json()["status"] == "ok"
@@ -75,7 +90,8 @@ def test_health_endpoint_llm_ok():
 @respx.mock
 def test_health_endpoint_llm_unavailable():
     respx.get("http://localhost:11434/api/tags").mock(side_effect=httpx.ConnectError("Connection refused"))
-    
+    ollama_client.refresh_detection()
+
     response = test_client.get("/health")
     assert response.status_code == 200
     assert response.json()["status"] == "ok" # Main app is still OK
@@ -92,7 +108,7 @@ def test_chat_fallback_on_ollama_error():
     ollama_client.refresh_detection()
     respx.post("http://localhost:11434/api/chat").mock(side_effect=httpx.ConnectError("Connection refused"))
 
-    chat_payload = {"message": "Run git status", "cwd": "."}
+    chat_payload = {"message": "What changed in my repo today?", "cwd": "."}
     response = test_client.post("/chat", json=chat_payload)
     
     assert response.status_code == 200
@@ -109,7 +125,7 @@ def test_chat_fallback_on_model_missing():
     )
     ollama_client.refresh_detection()
 
-    chat_payload = {"message": "Run git status", "cwd": "."}
+    chat_payload = {"message": "What changed in my repo today?", "cwd": "."}
     response = test_client.post("/chat", json=chat_payload)
 
     assert response.status_code == 200
@@ -118,3 +134,97 @@ def test_chat_fallback_on_model_missing():
     assert chat_response["requires_approval"] is False
     assert "required Ollama model is not installed" in chat_response["response"]
 
+
+
+@respx.mock
+def test_ollama_client_achat_success(ollama_client_fixture):
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    respx.post("http://localhost:11434/api/chat").mock(return_value=httpx.Response(200, json={
+        "message": {"role": "assistant", "content": "Hello from the async client."},
+        "done": True
+    }))
+
+    async def run():
+        await ollama_client_fixture.arefresh_detection()
+        try:
+            return await ollama_client_fixture.achat([{"role": "user", "content": "Hi"}])
+        finally:
+            await ollama_client_fixture.aclose()
+
+    assert asyncio.run(run()) == "Hello from the async client."
+
+
+@respx.mock
+def test_ollama_client_achat_connection_error(ollama_client_fixture):
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    respx.post("http://localhost:11434/api/chat").mock(side_effect=httpx.ConnectError("Connection refused"))
+
+    async def run():
+        await ollama_client_fixture.arefresh_detection()
+        try:
+            await ollama_client_fixture.achat([{"role": "user", "content": "Hi"}])
+        finally:
+            await ollama_client_fixture.aclose()
+
+    with pytest.raises(OllamaConnectionError, match="Could not connect to Ollama server"):
+        asyncio.run(run())
+
+
+def _run_concurrent_classifications(count):
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    ollama_client.refresh_detection()
+
+    in_flight = 0
+    peak_in_flight = 0
+
+    async def slow_chat(request):
+        nonlocal in_flight, peak_in_flight
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return httpx.Response(200, json={"message": {"content": json.dumps({
+            "intent": Intent.CHAT.value,
+            "plan": ["Reply."],
+            "proposed_command": None,
+            "response": "hi"
+        })}})
+
+    respx.post("http://localhost:11434/api/chat").mock(side_effect=slow_chat)
+    router = IntentRouter()
+
+    async def run():
+        try:
+            return await asyncio.gather(*[
+                router.classify_intent_async(ChatRequest(message=f"hello {i}"))
+                for i in range(count)
+            ])
+        finally:
+            await ollama_client.aclose()
+
+    results = asyncio.run(run())
+    assert [result[0] for result in results] == [Intent.CHAT] * count
+    return peak_in_flight
+
+
+@respx.mock
+def test_classify_intent_async_keeps_many_calls_in_flight(admission_limit):
+    admission_limit(max_concurrency=5)
+
+    assert _run_concurrent_classifications(5) == 5
+
+
+@respx.mock
+def test_classify_intent_async_queues_calls_beyond_the_admission_limit(admission_limit):
+    controller = admission_limit(max_concurrency=2)
+
+    assert _run_concurrent_classifications(5) == 2
+    stats = controller.stats()
+    assert (stats["admitted"], stats["queued"], stats["completed"]) == (5, 3, 5)
+    assert (stats["active"], stats["queue_depth"]) == (0, 0)
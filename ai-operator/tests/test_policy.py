@@ -1,6 +1,11 @@
+import asyncio
+import json
+import os
+import re
 import pytest
 from pathlib import Path
 from app.core.policy import PolicyEnforcer
+from app.core.policy_rules import PolicyRulesWatcher
 
 @pytest.fixture
 def policy_enforcer(tmp_path):
@@ -111,3 +116,145 @@ def test_dev_mode_allows_outside_sandbox_path(tmp_path):
     is_allowed, reason = policy.check_all("echo hi > C:\\Users\\someone\\Desktop\\a.txt", outside)
     assert is_allowed is True
     assert "dev mode" in reason
+
+
+def test_evaluate_reports_the_matching_rule(policy_enforcer):
+    decision = policy_enforcer.evaluate("GIT STATUS --short", policy_enforcer.sandbox_root)
+    assert decision.allowed is True
+    assert (decision.rule.kind, decision.rule.rule) == ("allow_prefix", "git status")
+
+    decision = policy_enforcer.evaluate(r"echo hi > ..\out.txt", policy_enforcer.sandbox_root)
+    assert decision.allowed is False
+    assert (decision.rule.kind, decision.rule.rule) == ("deny_pattern", r"\.\.")
+
+
+def test_compiled_matcher_with_thousands_of_rules(tmp_path):
+    sandbox = tmp_path / "sandbox"
+    sandbox.mkdir()
+    prefixes = [f"team{i} deploy" for i in range(5000)] + ["team42 deploy --canary"]
+    patterns = [rf"--secret-{i}\b" for i in range(2000)] + [re.compile("DROP TABLE", re.IGNORECASE)]
+    policy = PolicyEnforcer(sandbox_root=str(sandbox), allowed_prefixes=prefixes, deny_patterns=patterns)
+
+    assert policy.match_allowed_prefix("team42 deploy --canary now").rule == "team42 deploy --canary"
+    assert policy.match_allowed_prefix("team4999 deploy").index == 4999
+    assert policy.match_allowed_prefix("team5000 deploy") is None
+    assert policy.match_disallowed_pattern("team1 deploy --secret-1999").index == 1999
+    assert policy.match_disallowed_pattern("team1 deploy --secret-19990") is None
+    assert policy.match_disallowed_pattern("team1 deploy; drop table users").index == 2000
+
+
+def _write_rules(path, text, mtime_ns):
+    path.write_text(text, encoding="utf-8")
+    # Explicit mtimes, so the test does not depend on the filesystem's timestamp resolution.
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_rules_file_hot_reload_keeps_last_good_rules(tmp_path):
+    sandbox = tmp_path / "sandbox"
+    sandbox.mkdir()
+    rules_file = tmp_path / "policy.json"
+    _write_rules(rules_file, json.dumps({"allowed_prefixes": ["git status"], "deny_patterns": ["--force"]}), 10**18)
+    policy = PolicyEnforcer(sandbox_root=str(sandbox), rules_file=str(rules_file))
+    before = policy.rules
+
+    assert policy.check_all("git status", sandbox)[0] is True
+    assert policy.check_all("make test", sandbox)[0] is False
+    assert policy.reload_rules() is False  # unchanged file
+
+    _write_rules(rules_file, json.dumps({"allowed_prefixes": ["make test"]}), 10**18 + 1)
+    assert policy.reload_rules() is True
+    assert policy.check_all("make test", sandbox)[0] is True
+    assert policy.check_all("git status", sandbox)[0] is False
+    assert before.allowed_prefixes == ("git status",)  # an old snapshot is never modified
+
+    _write_rules(rules_file, '{"allowed_prefixes": ["unclosed', 10**18 + 2)
+    assert policy.reload_rules() is False
+    assert policy.reload_rules() is False
+    assert policy.check_all("make test", sandbox)[0] is True
+    stats = policy.rules_stats()
+    assert (stats["version"], stats["reloads"], stats["reload_errors"]) == (1, 1, 1)
+
+
+def test_rules_file_formats_and_errors_at_startup(tmp_path):
+    sandbox = tmp_path / "sandbox"
+    sandbox.mkdir()
+    yaml_file = tmp_path / "policy.yaml"
+    yaml_file.write_text("allowed_prefixes:\n  - make test\ndeny_patterns:\n  - '--force\\b'\n", encoding="utf-8")
+    policy = PolicyEnforcer(sandbox_root=str(sandbox), rules_file=str(yaml_file))
+    assert policy.check_all("make test", sandbox)[0] is True
+    assert policy.evaluate("make test --force", sandbox).rule.rule == r"--force\b"
+
+    rules_file = tmp_path / "policy.json"
+    rules_file.write_text(json.dumps({"allowed_prefixes": ["ls"], "deny_patterns": ["("]}), encoding="utf-8")
+    with pytest.raises(ValueError, match="Invalid deny pattern"):
+        PolicyEnforcer(sandbox_root=str(sandbox), rules_file=str(rules_file))
+    rules_file.write_text(json.dumps({"allow": ["ls"]}), encoding="utf-8")
+    with pytest.raises(ValueError, match="Unknown keys"):
+        PolicyEnforcer(sandbox_root=str(sandbox), rules_file=str(rules_file))
+
+
+def test_rules_watcher_swaps_rules_in_background(tmp_path):
+    sandbox = tmp_path / "sandbox"
+    sandbox.mkdir()
+    rules_file = tmp_path / "policy.json"
+    _write_rules(rules_file, json.dumps({"allowed_prefixes": ["ls"]}), 10**18)
+    policy = PolicyEnforcer(sandbox_root=str(sandbox), rules_file=str(rules_file))
+    watcher = PolicyRulesWatcher(policy.reload_rules, str(rules_file), interval_sec=0.01)
+
+    async def scenario():
+        watcher.start()
+        _write_rules(rules_file, json.dumps({"allowed_prefixes": ["ls", "pytest"]}), 10**18 + 1)
+        for _ in range(200):
+            if policy.rules.version == 1:
+                break
+            await asyncio.sleep(0.01)
+        await watcher.stop()
+
+    asyncio.run(scenario())
+    assert watcher.running is False
+    assert policy.check_all("pytest -q", sandbox)[0] is True
+
+
+def test_sandbox_paths_are_lexical_with_cached_symlink_checks(tmp_path):
+    sandbox = tmp_path / "sandbox"
+    (sandbox / "work").mkdir(parents=True)
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (sandbox / "escape").symlink_to(outside, target_is_directory=True)
+    policy = PolicyEnforcer(sandbox_root=str(sandbox), resolve_symlinks=True)
+
+    assert policy.is_path_in_sandbox(sandbox / "work" / ".." / "work") is True
+    assert policy.is_path_in_sandbox(sandbox / "work" / "." / "..") is True
+    assert policy.is_path_in_sandbox(sandbox / ".." / "outside") is False
+    assert policy.is_path_in_sandbox(sandbox / "escape") is False
+    assert policy.is_path_in_sandbox(sandbox / "work") is True
+    # Lexically outside paths are rejected without resolving; the rest are resolved once per path.
+    assert (policy.paths.stats()["resolve_misses"], policy.paths.stats()["resolve_hits"]) == (3, 1)
+
+    lexical = PolicyEnforcer(sandbox_root=str(sandbox), resolve_symlinks=False)
+    assert lexical.is_path_in_sandbox(sandbox / "escape") is True
+    assert lexical.paths.stats()["resolve_misses"] == 0
+
+
+def test_decision_cache_is_keyed_by_rules_version(tmp_path):
+    sandbox = tmp_path / "sandbox"
+    sandbox.mkdir()
+    rules_file = tmp_path / "policy.json"
+    _write_rules(rules_file, json.dumps({"allowed_prefixes": ["ls"]}), 10**18)
+    policy = PolicyEnforcer(sandbox_root=str(sandbox), rules_file=str(rules_file), decision_cache_size=2)
+
+    for _ in range(3):
+        assert policy.check_all("ls -la", sandbox)[0] is True
+    assert policy.check_all("pytest", sandbox)[0] is False
+    stats = policy.check_stats()
+    assert (stats["decision_cache"]["hits"], stats["decision_cache"]["misses"]) == (2, 2)
+    assert stats["stages"]["total"]["checks"] == 2
+    assert stats["stages"]["allow_prefix"]["checks"] == 2
+    assert stats["stages"]["command_paths"]["checks"] == 1
+
+    _write_rules(rules_file, json.dumps({"allowed_prefixes": ["ls", "pytest"]}), 10**18 + 1)
+    assert policy.reload_rules() is True
+    assert policy.check_all("pytest", sandbox)[0] is True
+    policy.check_all("dir", sandbox)
+    policy.check_all("git status", sandbox)
+    assert policy.check_stats()["decision_cache"]["entries"] == 2
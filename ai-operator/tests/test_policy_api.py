@@ -0,0 +1,50 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import policy as policy_module
+from app.core.policy import PolicyEnforcer
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def sandbox(tmp_path, monkeypatch):
+    sandbox = tmp_path / "sandbox"
+    (sandbox / "repo").mkdir(parents=True)
+    monkeypatch.setattr(policy_module, "_policy_enforcer", PolicyEnforcer(sandbox_root=str(sandbox)))
+    return sandbox
+
+
+def test_policy_check_reports_each_verdict_and_rule(sandbox):
+    response = client.post(
+        "/policy/check",
+        json={
+            "cwd": str(sandbox / "repo"),
+            "items": [
+                {"command": "git status"},
+                {"command": "rm -rf /"},
+                {"command": r"echo hi > ..\out.txt"},
+                {"command": "pytest -q", "cwd": str(sandbox.parent)},
+                {"command": "git status"},
+            ],
+        },
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["allowed"], body["allowed_count"], body["denied_count"]) == (False, 2, 3)
+    assert body["rules_version"] == 0
+    results = body["results"]
+    assert results[0]["rule"] == {"kind": "allow_prefix", "rule": "git status", "index": 0}
+    assert results[1]["allowed"] is False and results[1]["rule"] is None
+    assert results[2]["rule"]["kind"] == "deny_pattern"
+    assert results[3]["cwd"] == str(sandbox.parent)
+    assert "outside the security sandbox" in results[3]["reason"]
+    assert results[4] == results[0]
+
+
+def test_policy_check_rejects_oversized_batches(sandbox, monkeypatch):
+    monkeypatch.setenv("POLICY_CHECK_MAX_ITEMS", "2")
+    response = client.post("/policy/check", json={"cwd": str(sandbox), "items": [{"command": "ls"}] * 3})
+    assert response.status_code == 413
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+import respx
+
+from app.core.embedding_classifier import EmbeddingIntentClassifier
+from app.core.fast_path import FastPathClassifier
+from app.core.memory import MemoryEntry
+from app.core.router import IntentRouter
+from app.core.vector_index import BoundedVectorStore
+from app.llm.client import OllamaClient, ollama_client
+from app.llm.semantic_cache import SemanticResponseCache
+from app.models.schemas import ChatRequest, Intent
+
+
+def _vector(text):
+    # Toy embedding: one axis per topic, so paraphrases land on the same point.
+    return [
+        float("virtual" in text or "venv" in text),
+        float("list" in text),
+        float("run" in text),
+        0.05 * len(text.split()),
+    ]
+
+
+def _embed_handler(request):
+    texts = json.loads(request.content)["input"]
+    return httpx.Response(200, json={"embeddings": [_vector(text) for text in texts]})
+
+
+def _chat_response(intent, response):
+    content = json.dumps({"intent": intent, "plan": ["Answer."], "proposed_command": None, "response": response})
+    return httpx.Response(200, json={"message": {"content": content}, "done": True})
+
+
+def _phase_one(intent, proposed_command=None):
+    content = json.dumps({"intent": intent, "proposed_command": proposed_command})
+    return httpx.Response(200, json={"message": {"content": content}, "done": True})
+
+
+def _answer(text):
+    return httpx.Response(200, json={"message": {"content": text}, "done": True})
+
+
+def _router(cache, two_phase=True):
+    return IntentRouter(
+        fast_path=FastPathClassifier(enabled=False),
+        two_phase=two_phase,
+        embeddings=EmbeddingIntentClassifier(ollama_client, enabled=False),
+        semantic_cache=cache,
+    )
+
+
+def _mock_ollama():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    ollama_client.refresh_detection()
+    return respx.post("http://localhost:11434/api/embed").mock(side_effect=_embed_handler)
+
+
+def test_bounded_store_evicts_least_recently_used_and_expires():
+    store = BoundedVectorStore(capacity=2, ttl_sec=None)
+    first = store.add([1, 0], "a")
+    store.add([0, 1], "b")
+    store.touch(first)
+    store.add([1, 1], "c")  # evicts "b", the least recently used
+
+    assert store.search([0, 1], candidates=2)[2] in ("a", "c")
+    assert store.search([1, 0], accept=lambda payload: payload == "a")[:2] == (first, 1.0)
+    assert store.stats() == {"evictions": 1, "expirations": 0, "resets": 0, "size": 2, "capacity": 2}
+
+    expiring = BoundedVectorStore(capacity=2, ttl_sec=0.01)
+    expiring.add([1, 0], "a")
+    time.sleep(0.02)
+    assert expiring.search([1, 0]) is None
+    assert expiring.stats()["expirations"] == 1
+
+
+@respx.mock
+def test_near_duplicate_question_is_served_from_the_semantic_cache():
+    embed_route = _mock_ollama()
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(
+        side_effect=[
+            _phase_one("code_help"),
+            _answer("A venv isolates packages."),
+            _phase_one("code_help"),
+        ]
+    )
+    cache = SemanticResponseCache(ollama_client, enabled=True, threshold=0.9)
+    router = _router(cache)
+
+    first = asyncio.run(router.classify_intent_async(ChatRequest(message="what is a python virtual environment?")))
+    second = router.classify_intent(ChatRequest(message="what's a virtual environment in python?"))
+
+    assert first == second
+    assert first[0] == Intent.CODE_HELP and first[3] == "A venv isolates packages."
+    assert chat_route.call_count == 3  # the second answer generation is skipped
+    assert embed_route.call_count == 2
+    stats = cache.stats()
+    assert (stats["lookups"], stats["hits"], stats["stores"], stats["size"]) == (2, 1, 1, 1)
+    assert stats["hits_by_intent"] == {"code_help": 1}
+    assert stats["similarity_histogram"][">=0.95"] == 1
+
+
+@respx.mock
+def test_system_tasks_short_messages_and_dissimilar_questions_miss():
+    embed_route = _mock_ollama()
+    respx.post("http://localhost:11434/api/chat").mock(
+        side_effect=[
+            _phase_one("system_task", "ls"),
+            _phase_one("chat"),
+            _answer("Sure."),
+            _phase_one("code_help"),
+            _answer("Use a list comprehension."),
+        ]
+    )
+    cache = SemanticResponseCache(ollama_client, enabled=True, threshold=0.9)
+    router = _router(cache)
+
+    router.classify_intent(ChatRequest(message="please run the listing of files"))
+    router.classify_intent(ChatRequest(message="why?"))
+    result = router.classify_intent(ChatRequest(message="how do I filter a list quickly"))
+
+    assert result[3] == "Use a list comprehension."
+    assert embed_route.call_count == 2  # "why?" is too short to embed
+    stats = cache.stats()
+    assert (stats["lookups"], stats["hits"], stats["skipped"], stats["stores"]) == (1, 0, 1, 1)
+
+
+@respx.mock
+def test_system_task_reworded_like_a_cached_question_is_classified_afresh():
+    _mock_ollama()
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(
+        side_effect=[
+            _phase_one("code_help"),
+            _answer("Use os.listdir()."),
+            _phase_one("system_task", "ls"),
+        ]
+    )
+    cache = SemanticResponseCache(ollama_client, enabled=True, threshold=0.9)
+    router = _router(cache)
+
+    router.classify_intent(ChatRequest(message="how would I list files in python"))
+    result = router.classify_intent(ChatRequest(message="list files in python here"))
+
+    assert result[0] == Intent.SYSTEM_TASK and result[2] == "ls"
+    assert chat_route.call_count == 3
+    assert cache.stats()["lookups"] == 1
+
+
+@respx.mock
+def test_without_a_known_intent_the_semantic_cache_is_not_consulted(caplog):
+    embed_route = _mock_ollama()
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(
+        return_value=_chat_response("code_help", "A venv isolates packages.")
+    )
+    cache = SemanticResponseCache(ollama_client, enabled=True, threshold=0.9)
+    with caplog.at_level(logging.WARNING, logger="app.core.router"):
+        router = _router(cache, two_phase=False)
+    assert "LLM_TWO_PHASE" in caplog.text
+
+    router.classify_intent(ChatRequest(message="what is a python virtual environment?"))
+    router.classify_intent(ChatRequest(message="what's a virtual environment in python?"))
+
+    # Single-phase mode without the embedding classifier learns the intent only from the full answer.
+    assert chat_route.call_count == 2
+    assert embed_route.call_count == 0
+    assert cache.stats()["lookups"] == 0
+
+
+@respx.mock
+def test_answers_are_only_served_within_the_same_conversation_context():
+    _mock_ollama()
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(
+        side_effect=[
+            _phase_one("chat"),
+            _answer("It was added in 3.8."),
+            _phase_one("chat"),
+            _answer("It was added in 2.5."),
+            _phase_one("chat"),
+        ]
+    )
+    cache = SemanticResponseCache(ollama_client, enabled=True, threshold=0.9)
+    router = _router(cache)
+    walrus = [MemoryEntry(role="user", content="tell me about the walrus operator")]
+    ternary = [MemoryEntry(role="user", content="tell me about conditional expressions")]
+
+    first = router.classify_intent(ChatRequest(message="which python version added it?"), walrus)
+    second = router.classify_intent(ChatRequest(message="which python version added it?"), ternary)
+    third = router.classify_intent(ChatRequest(message="which version of python added it?"), walrus)
+
+    assert (first[3], second[3], third[3]) == ("It was added in 3.8.", "It was added in 2.5.", "It was added in 3.8.")
+    assert chat_route.call_count == 5
+    assert cache.stats()["hits"] == 1
+
+
+def test_disabled_cache_never_embeds():
+    cache = SemanticResponseCache(OllamaClient(), enabled=False)
+
+    lookup = cache.lookup("what is a python virtual environment?")
+
+    assert lookup.vector is None and lookup.classification is None
+    assert cache.stats()["lookups"] == 0
@@ -0,0 +1,141 @@
+import json
+
+import httpx
+import respx
+
+from app.core.fast_path import FastPathClassifier
+from app.core.memory import MemoryEntry
+from app.core.router import IntentRouter
+from app.core.session_prompts import SessionPromptCache
+from app.llm.client import ollama_client
+from app.llm.prompts import SYSTEM_PROMPT
+from app.models.schemas import ChatRequest
+
+
+def _llm_reply(response_text, prompt_eval_count):
+    content = json.dumps({"intent": "chat", "plan": ["Reply."], "proposed_command": None, "response": response_text})
+    return httpx.Response(
+        200,
+        json={
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "prompt_eval_count": prompt_eval_count,
+            "prompt_eval_duration": 25_000_000,
+            "eval_count": 12,
+            "eval_duration": 80_000_000,
+        },
+    )
+
+
+def _router(session_prompting=True):
+    return IntentRouter(fast_path=FastPathClassifier(enabled=False), session_prompting=session_prompting)
+
+
+@respx.mock
+def test_each_turn_extends_the_previous_prompt():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    ollama_client.refresh_detection()
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(
+        side_effect=[_llm_reply("first answer", 900), _llm_reply("second answer", 40)]
+    )
+    router = _router()
+
+    router.classify_intent(ChatRequest(message="hello", session_id="s1"), history=[])
+    history = [MemoryEntry("user", "hello"), MemoryEntry("assistant", "first answer")]
+    router.classify_intent(ChatRequest(message="and then?", session_id="s1", cwd="proj"), history=history)
+
+    first = json.loads(chat_route.calls[0].request.content)["messages"]
+    second = json.loads(chat_route.calls[1].request.content)["messages"]
+    assert first == [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": "User: hello"}]
+    # The previous prompt plus the model's own raw output form the new prompt's prefix.
+    assert second[:2] == first
+    assert second[2] == {"role": "assistant", "content": chat_route.calls[0].response.json()["message"]["content"]}
+    assert second[3] == {"role": "user", "content": "User: and then?\nCurrent Working Directory: proj"}
+
+    stats = router.session_stats()
+    assert stats["sessions"] == 1
+    assert stats["prompt_eval"]["turns"] == 2
+    assert [turn["prompt_eval_count"] for turn in stats["prompt_eval"]["recent_turns"]] == [900, 40]
+    assert stats["prompt_eval"]["recent_turns"][1]["history_messages"] == 2
+    assert stats["prompt_eval"]["avg_prompt_eval_ms"] == 25.0
+
+
+@respx.mock
+def test_system_task_turns_are_not_remembered():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    ollama_client.refresh_detection()
+    system_task = json.dumps(
+        {"intent": "system_task", "plan": ["Run it."], "proposed_command": "git log", "response": None}
+    )
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(
+        side_effect=[
+            _llm_reply("first answer", 900),
+            httpx.Response(200, json={"message": {"role": "assistant", "content": system_task}, "done": True}),
+            _llm_reply("third answer", 40),
+        ]
+    )
+    router = _router()
+    history = [MemoryEntry("user", "hello"), MemoryEntry("assistant", "first answer")]
+
+    router.classify_intent(ChatRequest(message="hello", session_id="s3"), history=[])
+    router.classify_intent(ChatRequest(message="show the git log", session_id="s3"), history=history)
+    # ConversationMemory does not store the system task either.
+    router.classify_intent(ChatRequest(message="thanks", session_id="s3"), history=history)
+
+    third = json.loads(chat_route.calls[2].request.content)["messages"]
+    assert [message["content"] for message in third[1:] if message["role"] == "user"] == [
+        "User: hello",
+        "User: thanks",
+    ]
+    assert router.session_stats()["appended_turns"] == 2
+
+
+def test_session_prompting_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("LLM_SESSION_PROMPTING", raising=False)
+    monkeypatch.delenv("LLM_TWO_PHASE", raising=False)
+
+    assert IntentRouter(fast_path=FastPathClassifier(enabled=False)).session_prompting is False
+
+
+def test_session_is_seeded_from_memory_and_reset_with_it():
+    router = _router()
+    history = [MemoryEntry("user", "hi"), MemoryEntry("assistant", "hello!")]
+
+    messages = router._build_messages(ChatRequest(message="next", session_id="s2"), history)
+    assert messages[1:] == [
+        {"role": "user", "content": "User: hi"},
+        {"role": "assistant", "content": "hello!"},
+        {"role": "user", "content": "User: next"},
+    ]
+
+    router._build_messages(ChatRequest(message="fresh start", session_id="s2"), [])
+    assert router.session_prompts.get("s2") is None
+
+
+def test_history_is_truncated_in_one_step():
+    # Each message costs 5 tokens ("uN" is one token plus the per-message overhead).
+    cache = SessionPromptCache(max_tokens=40)
+    for turn in range(4):
+        assert cache.append_turn("s", f"u{turn}", f"a{turn}") == []
+    assert len(cache.get("s")) == 8
+
+    dropped = cache.append_turn("s", "u4", "a4")
+    messages = cache.get("s")
+    assert [message["content"] for message in messages] == ["u3", "a3", "u4", "a4"]
+    assert [message["content"] for message in dropped] == ["u0", "a0", "u1", "a1", "u2", "a2"]
+    assert messages[0]["role"] == "user"
+    assert cache.stats()["truncations"] == 1
+
+
+def test_legacy_mode_flattens_history_into_one_message():
+    router = _router(session_prompting=False)
+    history = [MemoryEntry("user", "hi"), MemoryEntry("assistant", "hello!")]
+
+    messages = router._build_messages(ChatRequest(message="next"), history)
+
+    assert len(messages) == 2
+    assert messages[1]["content"] == "Conversation history:\nUser: hi\nAssistant: hello!\n\nUser: next"
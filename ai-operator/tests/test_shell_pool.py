@@ -0,0 +1,89 @@
+import base64
+import shutil
+import subprocess
+
+import pytest
+
+from app.tools.powershell_tool import PowerShellTool
+from app.tools.shell_pool import PowerShellDialect, ShellWorkerPool
+
+requires_bash = pytest.mark.skipif(shutil.which("bash") is None, reason="bash is the stand-in shell for the pool")
+
+
+@pytest.fixture
+def pool():
+    pool = ShellWorkerPool(shell="bash", size=1, max_commands_per_worker=100)
+    yield pool
+    pool.close()
+
+
+@requires_bash
+def test_pool_reuses_one_worker_and_frames_output_exactly(pool, tmp_path):
+    first = pool.run("printf 'no newline'; echo oops >&2; exit 3", tmp_path)
+    second = pool.run("printf 'a\\n\\nb\\n'", tmp_path)
+
+    assert (first.returncode, first.stdout, first.stderr) == (3, "no newline", "oops\n")
+    assert (second.returncode, second.stdout, second.stderr) == (0, "a\n\nb\n", "")
+    assert pool.stats()["spawned"] == 1
+
+
+@requires_bash
+def test_pool_isolates_cwd_and_env_between_commands(pool, tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+
+    assert pool.run("cd ..; export LEAKED=1; pwd", tmp_path / "a").stdout.strip() == str(tmp_path)
+    result = pool.run('pwd; echo "${LEAKED:-unset} $GREETING"', tmp_path / "b", env={"GREETING": "hi there"})
+    assert result.stdout.splitlines() == [str(tmp_path / "b"), "unset hi there"]
+    assert pool.run('echo "${GREETING:-unset}"', tmp_path).stdout == "unset\n"
+    with pytest.raises(FileNotFoundError):
+        pool.run("pwd", tmp_path / "missing")
+
+
+@requires_bash
+def test_background_jobs_finish_before_the_command_returns(pool, tmp_path):
+    first = pool.run("(sleep 0.3; echo LEAK) & echo first", tmp_path)
+    second = pool.run("echo second", tmp_path)
+    third = pool.run("(sleep 0.2; echo LATE >&2) & exit 4", tmp_path)
+
+    assert first.stdout == "first\nLEAK\n"
+    assert second.stdout == "second\n"
+    assert (third.returncode, third.stderr) == (4, "LATE\n")
+    assert pool.run("echo fourth", tmp_path).stderr == ""
+
+
+@requires_bash
+def test_pool_recycles_workers_after_n_commands_and_on_timeout(tmp_path):
+    pool = ShellWorkerPool(shell="bash", size=1, max_commands_per_worker=2)
+    try:
+        pids = [pool.run("echo $$", tmp_path).stdout for _ in range(4)]
+        assert pids[0] == pids[1] != pids[2] == pids[3]
+
+        with pytest.raises(subprocess.TimeoutExpired):
+            pool.run("sleep 5", tmp_path, timeout=0.2)
+        assert pool.run("echo ok", tmp_path).stdout == "ok\n"
+        stats = pool.stats()
+        assert (stats["timeouts"], stats["recycled"], stats["spawned"]) == (1, 3, 4)
+    finally:
+        pool.close()
+
+
+@requires_bash
+def test_powershell_tool_runs_through_the_pool(pool, tmp_path):
+    tool = PowerShellTool(pool=pool)
+
+    result = tool.execute("echo hello", tmp_path)
+    assert result == {"returncode": 0, "stdout": "hello\n", "stderr": "", "ok": True}
+    assert tool.execute("sleep 5", tmp_path, timeout=0.2)["stderr"].startswith("Error: Command timed out")
+    assert "does not exist" in tool.execute("echo hi", tmp_path / "missing")["stderr"]
+
+
+def test_powershell_frame_is_one_line_with_quoted_command():
+    frame = PowerShellDialect().frame("Write-Output 'it''s'", "C:\\ai-sandbox", {"NAME": "o'k"}, "TOKEN")
+    assert frame.count("\n") == 1
+    script = base64.b64decode(frame.split("'")[1]).decode("utf-8")
+    assert "[scriptblock]::Create('Write-Output ''it''''s''')" in script
+    assert "Set-Item -LiteralPath 'env:NAME' -Value 'o''k'" in script
+    assert "Set-Location -LiteralPath 'C:\\ai-sandbox'" in script
+    # Jobs and child processes the command started are waited for before the end marker.
+    assert script.index("Wait-Job") < script.index("Wait-Process") < script.index("'TOKEN ' + $__rc")
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import respx
+
+from app.llm.client import OllamaClient, OllamaConnectionError
+from app.llm.singleflight import AsyncSingleFlight, SingleFlight, payload_key
+
+
+def test_payload_key_ignores_dict_ordering():
+    a = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "options": {"temperature": 0.2}}
+    b = {"options": {"temperature": 0.2}, "messages": [{"content": "hi", "role": "user"}], "model": "m"}
+    assert payload_key(a) == payload_key(b)
+    assert payload_key(a) != payload_key({**a, "model": "other"})
+
+
+def test_async_single_flight_shares_result_and_errors():
+    flight = AsyncSingleFlight()
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return {"answer": 42}
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        raise OllamaConnectionError("boom")
+
+    async def run():
+        results = await asyncio.gather(*[flight.do("same", upstream) for _ in range(5)])
+        errors = await asyncio.gather(*[flight.do("bad", failing) for _ in range(3)], return_exceptions=True)
+        return results, errors
+
+    results, errors = asyncio.run(run())
+    assert results == [{"answer": 42}] * 5
+    assert all(isinstance(error, OllamaConnectionError) for error in errors)
+    assert calls == 2
+    assert flight.stats() == {"leaders": 2, "coalesced": 6, "errors": 1, "in_flight": 0}
+
+
+def test_async_single_flight_survives_cancelled_waiter():
+    flight = AsyncSingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("k", upstream))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", upstream))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_thread_single_flight_shares_result():
+    flight = SingleFlight()
+    calls = 0
+    started = threading.Barrier(4)
+
+    def upstream():
+        nonlocal calls
+        calls += 1
+        time.sleep(0.05)
+        return "shared"
+
+    results = []
+
+    def worker():
+        started.wait()
+        results.append(flight.do("k", upstream))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["shared"] * 4
+    assert calls == 1
+
+
+@respx.mock
+def test_achat_coalesces_identical_payloads():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+
+    async def slow_chat(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": "one generation"}})
+
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(side_effect=slow_chat)
+    client = OllamaClient()
+
+    async def run():
+        await client.arefresh_detection()
+        try:
+            same = await asyncio.gather(*[client.achat([{"role": "user", "content": "hi"}]) for _ in range(4)])
+            different = await client.achat([{"role": "user", "content": "something else"}])
+            return same, different
+        finally:
+            await client.aclose()
+
+    same, different = asyncio.run(run())
+    assert same == ["one generation"] * 4
+    assert different == "one generation"
+    assert chat_route.call_count == 2
+    assert client.single_flight_stats()["async"]["coalesced"] == 3
+
+
+@respx.mock
+def test_achat_error_reaches_every_waiter():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+
+    async def refused(request):
+        await asyncio.sleep(0.02)
+        raise httpx.ConnectError("Connection refused")
+
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(side_effect=refused)
+    client = OllamaClient()
+
+    async def run():
+        await client.arefresh_detection()
+        try:
+            return await asyncio.gather(
+                *[client.achat([{"role": "user", "content": "hi"}]) for _ in range(3)],
+                return_exceptions=True,
+            )
+        finally:
+            await client.aclose()
+
+    errors = asyncio.run(run())
+    assert chat_route.call_count == 1
+    assert len(errors) == 3
+    for error in errors:
+        assert isinstance(error, OllamaConnectionError)
@@ -0,0 +1,126 @@
+import json
+
+import httpx
+import respx
+from fastapi.testclient import TestClient
+
+from app.core.policy import get_policy_enforcer
+from app.core.streaming import JsonFieldStreamParser
+from app.llm.client import ollama_client
+from app.main import app
+from app.models.schemas import Intent
+
+client = TestClient(app)
+
+
+def _ollama_stream_body(text: str, chunk_size: int = 7) -> str:
+    lines = []
+    for i in range(0, len(text), chunk_size):
+        lines.append(json.dumps({"message": {"role": "assistant", "content": text[i:i + chunk_size]}, "done": False}))
+    lines.append(json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}))
+    return "\n".join(lines) + "\n"
+
+
+def _read_events(response) -> list[dict]:
+    return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+def test_parser_streams_fields_across_chunk_boundaries():
+    payload = json.dumps({
+        "intent": "chat",
+        "plan": ["say \"hi\""],
+        "proposed_command": None,
+        "response": "Hello \"friend\" éè \U0001F600\nbye",
+    })
+    text = "```json\n" + payload + "\n```"
+    parser = JsonFieldStreamParser(["intent", "proposed_command", "response"])
+
+    streamed = []
+    for char in text:
+        streamed.extend(delta.text for delta in parser.feed(char) if delta.field == "response")
+
+    assert parser.finished is True
+    assert parser.values["intent"] == "chat"
+    assert "proposed_command" not in parser.values
+    assert "".join(streamed) == "Hello \"friend\" éè \U0001F600\nbye"
+    assert parser.values["response"] == "".join(streamed)
+    assert parser.completed == {"intent", "response"}
+
+
+def test_parser_ignores_nested_keys():
+    parser = JsonFieldStreamParser(["response"])
+    parser.feed('{"plan": [{"response": "nested"}], "response": "top"}')
+    assert parser.values == {"response": "top"}
+
+
+@respx.mock
+def test_chat_stream_forwards_response_deltas_before_done():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    ollama_client.refresh_detection()
+    llm_text = json.dumps({
+        "intent": Intent.CHAT.value,
+        "plan": ["Reply."],
+        "proposed_command": None,
+        "response": "Streaming works nicely.",
+    })
+    respx.post("http://localhost:11434/api/chat").mock(
+        return_value=httpx.Response(200, text=_ollama_stream_body(llm_text))
+    )
+
+    response = client.post("/chat/stream", json={"message": "say something", "session_id": "stream-test"})
+
+    assert response.status_code == 200
+    events = _read_events(response)
+    assert events[0] == {"event": "intent", "intent": "chat"}
+    deltas = [event["delta"] for event in events if event["event"] == "response"]
+    assert len(deltas) > 1
+    assert "".join(deltas) == "Streaming works nicely."
+    assert events[-1]["event"] == "done"
+    assert events[-1]["result"]["response"] == "Streaming works nicely."
+
+
+@respx.mock
+def test_chat_stream_creates_approval_after_stream_finishes():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    ollama_client.refresh_detection()
+    llm_text = json.dumps({
+        "intent": Intent.SYSTEM_TASK.value,
+        "plan": ["Propose git status."],
+        "proposed_command": "git status",
+        "response": "I will run git status.",
+    })
+    respx.post("http://localhost:11434/api/chat").mock(
+        return_value=httpx.Response(200, text=_ollama_stream_body(llm_text))
+    )
+
+    response = client.post(
+        "/chat/stream",
+        json={"message": "check my repo please", "cwd": str(get_policy_enforcer().sandbox_root)},
+    )
+
+    events = _read_events(response)
+    assert not [event for event in events if event["event"] == "response"]
+    result = events[-1]["result"]
+    assert result["intent"] == Intent.SYSTEM_TASK.value
+    assert result["requires_approval"] is True
+    assert result["approval_id"]
+    assert result["proposed_command"] == "git status"
+
+
+@respx.mock
+def test_chat_stream_reports_connection_error():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    ollama_client.refresh_detection()
+    respx.post("http://localhost:11434/api/chat").mock(side_effect=httpx.ConnectError("Connection refused"))
+
+    response = client.post("/chat/stream", json={"message": "hello"})
+
+    events = _read_events(response)
+    assert events == [{"event": "done", "result": events[-1]["result"]}]
+    assert "cannot connect to the local LLM" in events[-1]["result"]["response"]
@@ -0,0 +1,77 @@
+import json
+
+import httpx
+import respx
+
+from app.core.fast_path import FastPathClassifier
+from app.core.router import IntentRouter
+from app.llm.client import ollama_client
+from app.llm.prompts import CLASSIFICATION_SCHEMA
+from app.models.schemas import ChatRequest, Intent
+
+
+def _reply(content):
+    return httpx.Response(200, json={"message": {"role": "assistant", "content": content}, "done": True})
+
+
+def _router(output_format="schema"):
+    router = IntentRouter(fast_path=FastPathClassifier(enabled=False), session_prompting=False)
+    router.output_format = output_format
+    return router
+
+
+@respx.mock
+def test_classification_request_carries_schema_and_parses_strictly():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    ollama_client.refresh_detection()
+    content = json.dumps(
+        {"intent": "system_task", "plan": ["Run it."], "proposed_command": "git status", "response": "Approve?"}
+    )
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(return_value=_reply(content))
+    router = _router()
+
+    result = router.classify_intent(ChatRequest(message="show me the state of the repo", bypass_cache=True))
+
+    assert result == (Intent.SYSTEM_TASK, ["Run it."], "git status", "Approve?")
+    payload = json.loads(chat_route.calls[0].request.content)
+    assert payload["format"] == CLASSIFICATION_SCHEMA
+    assert payload["format"]["properties"]["intent"]["enum"] == ["chat", "code_help", "system_task"]
+    stats = router.output_stats()
+    assert (stats["parsed"], stats["strict"], stats["parse_failures"], stats["fallbacks"]) == (1, 1, 0, 0)
+
+
+@respx.mock
+def test_json_format_and_off_mode():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}]})
+    )
+    ollama_client.refresh_detection()
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(
+        return_value=_reply('{"intent": "chat", "plan": [], "proposed_command": null, "response": "hi"}')
+    )
+
+    _router("json").classify_intent(ChatRequest(message="say hi", bypass_cache=True))
+    _router("off").classify_intent(ChatRequest(message="say hi again", bypass_cache=True))
+
+    assert json.loads(chat_route.calls[0].request.content)["format"] == "json"
+    assert "format" not in json.loads(chat_route.calls[1].request.content)
+
+
+def test_recovered_and_fallback_outcomes_are_counted():
+    router = _router("off")
+    fenced = '```json\n{"intent": "chat", "plan": [], "proposed_command": null, "response": "ok"}\n```'
+
+    classification, parsed_ok = router._parse_classification(fenced)
+    assert parsed_ok and classification[3] == "ok"
+    assert router._parse_classification("Sorry, I cannot do that.")[1] is False
+    assert router._parse_classification('{"intent": "dance"}')[1] is False
+    router._parse_classification(fenced, record=False)
+
+    stats = router.output_stats()
+    assert stats["parsed"] == 3
+    assert stats["recovered"] == 1
+    assert stats["fallbacks"] == 2
+    assert stats["parse_failures"] == 3
+    assert stats["wasted_generation_rate"] == 2 / 3
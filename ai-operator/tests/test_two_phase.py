@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import httpx
+import respx
+
+from app.core.fast_path import FastPathClassifier
+from app.core.router import IntentRouter
+from app.core.streaming import FieldDelta
+from app.llm.client import ollama_client
+from app.llm.prompts import ANSWER_SYSTEM_PROMPT, CLASSIFY_SCHEMA, CLASSIFY_SYSTEM_PROMPT
+from app.models.schemas import ChatRequest, Intent
+
+
+def _reply(content):
+    return httpx.Response(200, json={"message": {"role": "assistant", "content": content}, "done": True})
+
+
+def _stream(*chunks):
+    lines = [json.dumps({"message": {"content": chunk}, "done": False}) for chunk in chunks]
+    lines.append(json.dumps({"message": {"content": ""}, "done": True}))
+    return httpx.Response(200, text="\n".join(lines) + "\n")
+
+
+def _router():
+    router = IntentRouter(fast_path=FastPathClassifier(enabled=False), two_phase=True)
+    router.classify_model = "qwen2.5:1.5b"
+    router.classify_num_predict = 48
+    router.answer_num_predict = 512
+    return router
+
+
+def _detect():
+    respx.get("http://localhost:11434/api/tags").mock(
+        return_value=httpx.Response(200, json={"models": [{"name": "gpt-oss:20b"}, {"name": "qwen2.5:1.5b"}]})
+    )
+    ollama_client.refresh_detection()
+
+
+@respx.mock
+def test_system_task_needs_only_the_short_classification_call():
+    _detect()
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(
+        return_value=_reply('{"intent": "system_task", "proposed_command": "git status"}')
+    )
+    router = _router()
+
+    intent, plan, command, response_text = router.classify_intent(
+        ChatRequest(message="what is the state of my repository", bypass_cache=True)
+    )
+
+    assert (intent, command, response_text) == (Intent.SYSTEM_TASK, "git status", None)
+    assert plan[0] == "Propose executing the command: 'git status'."
+    assert chat_route.call_count == 1
+    payload = json.loads(chat_route.calls[0].request.content)
+    assert payload["model"] == "qwen2.5:1.5b"
+    assert payload["options"] == {"temperature": 0.0, "num_predict": 48}
+    assert payload["format"] == CLASSIFY_SCHEMA
+    assert payload["messages"][0]["content"] == CLASSIFY_SYSTEM_PROMPT
+    assert router.session_prompting is False
+
+
+@respx.mock
+def test_chat_gets_a_plain_text_answer_from_phase_two():
+    _detect()
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(
+        side_effect=[
+            _reply('{"intent": "code_help", "proposed_command": "rm -rf /"}'),
+            _reply("A generator yields values lazily."),
+        ]
+    )
+
+    result = asyncio.run(
+        _router().classify_intent_async(ChatRequest(message="what is a generator?", bypass_cache=True))
+    )
+
+    assert result[0] == Intent.CODE_HELP
+    assert result[2] is None  # commands are ignored outside system tasks
+    assert result[3] == "A generator yields values lazily."
+    answer_payload = json.loads(chat_route.calls[1].request.content)
+    assert answer_payload["model"] == "gpt-oss:20b"
+    assert answer_payload["options"]["num_predict"] == 512
+    assert "format" not in answer_payload
+    assert answer_payload["messages"][0]["content"] == ANSWER_SYSTEM_PROMPT
+
+
+@respx.mock
+def test_stream_yields_intent_then_answer_deltas():
+    _detect()
+    respx.post("http://localhost:11434/api/chat").mock(
+        side_effect=[_reply("not json at all"), _stream("Hel", "lo!")]
+    )
+    router = _router()
+
+    async def collect():
+        return [item async for item in router.classify_intent_stream(ChatRequest(message="hey", bypass_cache=True))]
+
+    items = asyncio.run(collect())
+
+    # An unparseable classification is answered as chat instead of failing the request.
+    assert items[0] == FieldDelta("intent", "chat", complete=True)
+    assert [item.text for item in items[1:-1]] == ["Hel", "lo!"]
+    assert items[-1] == (Intent.CHAT, ["Answer the message."], None, "Hello!")
+    assert router.output_stats()["fallbacks"] == 1
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import httpx
+import respx
+
+from app.llm.client import OllamaClient
+from app.llm.warmup import ModelKeepWarm
+
+
+def _tags(*names):
+    return httpx.Response(200, json={"models": [{"name": name} for name in names]})
+
+
+@respx.mock
+def test_chat_sends_keep_alive_and_records_load_duration():
+    respx.get("http://localhost:11434/api/tags").mock(return_value=_tags("gpt-oss:20b"))
+    chat_route = respx.post("http://localhost:11434/api/chat").mock(
+        side_effect=[
+            httpx.Response(200, json={"message": {"content": "cold"}, "load_duration": 3_200_000_000}),
+            httpx.Response(200, json={"message": {"content": "warm"}, "load_duration": 40_000_000}),
+        ]
+    )
+    client = OllamaClient()
+    client.keep_alive = "30m"
+    client.refresh_detection()
+
+    assert client.chat([{"role": "user", "content": "first"}]) == "cold"
+    assert client.chat([{"role": "user", "content": "second"}]) == "warm"
+
+    assert json.loads(chat_route.calls[0].request.content)["keep_alive"] == "30m"
+    stats = client.model_load_stats()
+    assert stats["samples"] == 2
+    assert stats["cold_loads"] == 1
+    assert stats["max_load_sec"] == 3.2
+    assert stats["last_load_sec"] == 0.04
+    assert stats["idle_sec"] is not None
+
+
+@respx.mock
+def test_warm_up_loads_model_with_empty_prompt():
+    generate_route = respx.post("http://localhost:11434/api/generate").mock(
+        return_value=httpx.Response(200, json={"model": "gpt-oss:20b", "done": True, "load_duration": 2_000_000_000})
+    )
+    client = OllamaClient()
+    client.model = "gpt-oss:20b"
+    client.keep_alive = "-1"
+
+    assert client.warm_up() == 2.0
+
+    body = json.loads(generate_route.calls[0].request.content)
+    assert body == {"model": "gpt-oss:20b", "prompt": "", "stream": False, "keep_alive": "-1"}
+    assert client.model_load_stats()["warmups"] == 1
+
+
+@respx.mock
+def test_warm_up_failure_is_counted_not_raised():
+    respx.post("http://localhost:11434/api/generate").mock(side_effect=httpx.ConnectError("refused"))
+    client = OllamaClient()
+    client.model = "gpt-oss:20b"
+
+    assert client.warm_up() is None
+    assert client.model_load_stats()["warmup_failures"] == 1
+
+
+@respx.mock
+def test_keep_warm_rewarms_after_model_change_and_pings_when_idle():
+    tags_route = respx.get("http://localhost:11434/api/tags").mock(return_value=_tags("gpt-oss:20b"))
+    generate_route = respx.post("http://localhost:11434/api/generate").mock(
+        return_value=httpx.Response(200, json={"done": True, "load_duration": 1_000_000})
+    )
+    client = OllamaClient()
+    keep_warm = ModelKeepWarm(client, warmup=True, interval_sec=0.1)
+
+    async def run():
+        await client.arefresh_detection()
+        keep_warm.start()
+        try:
+            await asyncio.sleep(0.02)
+            warmed_models = [json.loads(call.request.content)["model"] for call in generate_route.calls]
+
+            tags_route.mock(return_value=_tags("llama3.1:8b"))
+            await client.arefresh_detection()
+            await asyncio.sleep(0.02)
+            warmed_models.extend(json.loads(call.request.content)["model"] for call in generate_route.calls[1:])
+
+            await asyncio.sleep(0.2)
+            return warmed_models
+        finally:
+            await keep_warm.stop()
+            await client.aclose()
+
+    warmed_models = asyncio.run(run())
+    assert warmed_models[:2] == ["gpt-oss:20b", "llama3.1:8b"]
+    stats = keep_warm.stats()
+    assert stats["warmups"] == 2
+    assert stats["keep_warm_pings"] >= 1
+    assert stats["running"] is False